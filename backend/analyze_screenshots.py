@@ -1,101 +1,118 @@
 
 import os
 import sys
-import re
+import json
+import time
+import hashlib
 import argparse
-import phonenumbers
-from ocr_engine import ocr_engine
+import queue
+import signal
+import mmap
+import multiprocessing
+from watcher import make_watcher, list_files
+# ocr_engine is imported lazily: in --batch mode each worker process loads its own reader
+# and the parent process should not hold one.
 # We can reuse extractor regexes but normalization logic is custom
 from extractor import extractor 
+from layout import Layout
+from phone_normalizer import get_normalizer, POLICIES
+from archives import ArchiveReader, ArchiveError, is_archive_name
 
-def custom_normalize(phone_str):
+# Normalization applied to extracted numbers (--region / --policy), per process: set by main()
+# and, in --batch/--watch workers, by _init_worker
+normalize_region = None
+normalize_policy = 'national'
+
+def configure_normalization(region=None, policy='national'):
+    global normalize_region, normalize_policy
+    # Fails early (ValueError) on an unknown region or policy
+    get_normalizer(region, policy)
+    normalize_region, normalize_policy = region, policy
+
+def custom_normalize(phone_str, region=None, policy='national'):
     """
-    Normalizes a phone number string according to strict rules:
+    Normalizes a phone number string according to strict rules ('national' policy, see phone_normalizer.py):
     - Digits only.
     - No country code unless explicitly shown in the original string.
-    - If valid US number without explicit country code, return 10 digits.
-    - If valid US number WITH explicit country code (+1), return 11 digits (1 + 10 digits).
+    - If valid number of the default region without explicit country code, return the national number
+      (10 digits for US).
+    - If valid number of the default region WITH explicit country code (+1), return country code + national
+      number (11 digits for US).
     - If valid International number, return full digits including country code.
     """
-    if not phone_str:
-        return ""
-        
-    original_str = str(phone_str).strip()
-    
-    # Check for explicit country code indicators in the original string
-    has_explicit_plus = original_str.startswith('+')
-    has_explicit_00 = original_str.startswith('00')
-    
-    # Basic cleanup for parsing (phonenumbers lib handles formats well)
-    # specific fix for '00' as '+' 
-    cleaned_for_parsing = original_str
-    if has_explicit_00:
-        cleaned_for_parsing = '+' + original_str[2:]
+    return get_normalizer(region, policy).normalize(phone_str)
+
+IMAGE_EXTENSIONS = {'.png', '.jpg', '.jpeg', '.bmp', '.tiff', '.webp'}
+
+def extract_phones(image_bytes):
+    """
+    Runs OCR on one image (all its pages) and returns the set of custom-normalized phone numbers found.
+    """
+    from ocr_engine import ocr_engine
+
+    # Use 'original' strategy for speed, maybe 'enhanced' if needed. 
+    # The backend tries multiple, we can simplify or be robust.
+    # For this script, let's just use 'original' and 'enhanced' combined results to be safe.
+    strategies = ['original', 'enhanced']
+    file_phones = set()
     
-    try:
-        # Parse with 'US' as default region
-        parsed_number = phonenumbers.parse(cleaned_for_parsing, "US")
-        
-        if phonenumbers.is_valid_number(parsed_number):
-            # Get E164 format (e.g. +14155552671)
-            e164_format = phonenumbers.format_number(parsed_number, phonenumbers.PhoneNumberFormat.E164)
-            # Remove the '+'
-            digits_only = e164_format[1:]
-            
-            # Logic for stripping implicit country code
-            # If the number is from the default region (US, country code 1)
-            if parsed_number.country_code == 1:
-                # If the original string did NOT have an explicit country code indicator
-                # We strip the leading '1'
-                # How to detect "explicit country code"?
-                # If original had '+1' or '001' -> Explicit.
-                # If original had '1-...' at start? ambiguous, but usually in US '1' is the trunk prefix, not country code.
-                # However, E.164 standardization adds '1'.
-                
-                # Let's look at the original string again.
-                # If the user wrote "1 (555) 123..." that's usually just trunk prefix in domestic dialing.
-                # If the user wrote "+1 (555)..." that's explicit country code.
-                
-                # The requirement: "no country codes unless explicitly shown".
-                # If image has "(555) 123-4567", distinct from "+1 (555) 123-4567"?
-                # Standardizing:
-                # (555) 123-4567 -> 5551234567
-                # +1 (555) 123-4567 -> 15551234567
-                
-                if has_explicit_plus or has_explicit_00:
-                    return digits_only # Return full with country code (e.g. 1555...)
-                else:
-                    return digits_only[1:] # Strip the leading '1' (e.g. 555...)
-            else:
-                # Non-US numbers: usually implied to have country code if valid?
-                # Actually, if I parse "0412 345 678" (AU) with default region US, it might fail or parse differently.
-                # If it parsed successfully as a valid number, it likely has a country code or we guessed region.
-                # Users usually have US numbers or Int numbers with +.
-                return digits_only
-        else:
-            # Invalid but maybe just digits?
-            return re.sub(r'\D', '', original_str)
-            
-    except phonenumbers.NumberParseException:
-        # Fallback
-        return re.sub(r'\D', '', original_str)
+    # Every page of multi-page TIFFs / animations, decoded one at a time
+    for frame in range(ocr_engine.frame_count(image_bytes)):
+        frame_kwargs = {'frame': frame} if frame else {}
+        for strategy in strategies:
+            ocr_results = ocr_engine.process_image_with_strategy(image_bytes, strategy=strategy, **frame_kwargs)
+
+            # Extract using extractor's regex but our custom normalization
+            # Reuse extractor's logic for finding candidates: every number on each line (see layout.py)
+            regex = extractor.simple_phone_pattern
+
+            for line in Layout(ocr_results).lines:
+                for phone_match in regex.finditer(line.text):
+                    raw_phone = phone_match.group(0).strip()
+                    normalized = custom_normalize(raw_phone, normalize_region, normalize_policy)
+                    if normalized and len(normalized) >= 7: # Basic length filter
+                        file_phones.add(normalized)
+    return file_phones
+
+def iter_archive(path):
+    """
+    Yields the image members (ArchiveMember, see archives.py) of a ZIP/TAR archive on disk,
+    decompressed one at a time from a memory map of the file. Raises ArchiveError.
+    """
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            raise ArchiveError(f"'{path}' is empty")
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            members = ArchiveReader(data, path).members()
+            try:
+                yield from members
+            finally:
+                # Releases the archive's view of the memory map before it is closed
+                members.close()
 
 def process_folder(folder_path):
-    if not os.path.isdir(folder_path):
+    # --dir may also be a single archive
+    if os.path.isfile(folder_path) and is_archive_name(folder_path):
+        folder_path, names = os.path.dirname(folder_path), [os.path.basename(folder_path)]
+    elif os.path.isdir(folder_path):
+        names = os.listdir(folder_path)
+    else:
         print(f"Error: Folder '{folder_path}' not found.")
         return []
 
     print(f"Scanning folder: {folder_path}")
-    image_extensions = {'.png', '.jpg', '.jpeg', '.bmp', '.tiff', '.webp'}
-    files = [f for f in os.listdir(folder_path) if os.path.splitext(f.lower())[1] in image_extensions]
-    
-    if not files:
+    files = [f for f in names if os.path.splitext(f.lower())[1] in IMAGE_EXTENSIONS]
+    # ZIP/TAR archives of screenshots are read member by member
+    archives = [f for f in names if is_archive_name(f)]
+
+    if not files and not archives:
         print("No image files found in the folder.")
         return []
 
     all_phones = []
     
     # Initialize OCR (lazy load)
+    from ocr_engine import ocr_engine
     if not ocr_engine.reader:
         print("Initializing OCR engine (this simulates startup)...")
         # Accessing reader property triggers init
@@ -109,29 +126,7 @@ def process_folder(folder_path):
             with open(file_path, 'rb') as f:
                 image_bytes = f.read()
                 
-            # Use 'original' strategy for speed, maybe 'enhanced' if needed. 
-            # The backend tries multiple, we can simplify or be robust.
-            # Let's try 'original' then 'enhanced' if nothing found?
-            # For this script, let's just use 'original' and 'enhanced' combined results to be safe.
-            
-            strategies = ['original', 'enhanced']
-            file_phones = set()
-            
-            for strategy in strategies:
-                ocr_results = ocr_engine.process_image_with_strategy(image_bytes, strategy=strategy)
-                
-                # Extract using extractor's regex but our custom normalization
-                # Reuse extractor's logic for finding candidates
-                regex = extractor.simple_phone_pattern
-                
-                for _, text, _ in ocr_results:
-                     # Check for phone number
-                    phone_match = regex.search(text)
-                    if phone_match:
-                        raw_phone = phone_match.group(0).strip()
-                        normalized = custom_normalize(raw_phone)
-                        if normalized and len(normalized) >= 7: # Basic length filter
-                            file_phones.add(normalized)
+            file_phones = extract_phones(image_bytes)
             
             if file_phones:
                 print(f"  Found: {', '.join(file_phones)}")
@@ -142,18 +137,415 @@ def process_folder(folder_path):
         except Exception as e:
             print(f"  Error processing {filename}: {e}")
 
+    for archive_name in archives:
+        try:
+            for member in iter_archive(os.path.join(folder_path, archive_name)):
+                print(f"Processing: {archive_name}/{member.name}...")
+                image_bytes = member.read()
+                try:
+                    file_phones = extract_phones(image_bytes)
+                except Exception as e:
+                    print(f"  Error processing {archive_name}/{member.name}: {e}")
+                    continue
+                if file_phones:
+                    print(f"  Found: {', '.join(file_phones)}")
+                    all_phones.extend(file_phones)
+                else:
+                    print("  No phones found.")
+        except (ArchiveError, OSError) as e:
+            print(f"  Error processing {archive_name}: {e}")
+
     return all_phones
 
+# --- Batch mode -------------------------------------------------------------
+# Parallel (one OCR reader per worker process) and resumable: a manifest records every
+# processed file so reruns only OCR new or changed files, and phones are appended to the
+# output file as each file completes instead of being written once at the end.
+
+class Manifest:
+    """
+    Append-only JSON Lines record of processed files: path, size, mtime_ns, sha256.
+    The last line for a path wins, so a crash at any point leaves a usable manifest.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue # Torn last line after a crash
+                    self.entries[entry['path']] = entry
+        self._file = open(path, 'a')
+
+    def is_unchanged(self, path, size, mtime_ns):
+        entry = self.entries.get(path)
+        return entry is not None and entry['size'] == size and entry['mtime_ns'] == mtime_ns
+
+    def known_hash(self, path):
+        entry = self.entries.get(path)
+        return entry['sha256'] if entry else None
+
+    def record(self, path, size, mtime_ns, sha256):
+        entry = {"path": path, "size": size, "mtime_ns": mtime_ns, "sha256": sha256}
+        self.entries[path] = entry
+        self._file.write(json.dumps(entry) + "\n")
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+def _init_worker(threads, region=None, policy='national'):
+    # Each worker owns one OCR reader. Cap intra-op threads so N workers don't each
+    # spin up a thread per core and oversubscribe the CPU (applied by OCREngine, see concurrency.py).
+    import config
+    config.OCR_THREADS = threads
+    configure_normalization(region, policy)
+    from ocr_engine import ocr_engine # Loads the reader once for this worker
+    if not ocr_engine.reader:
+        print(f"Worker {os.getpid()}: OCR engine failed to initialize")
+
+def _process_file(task):
+    """
+    Worker entry point. Returns (path, sha256, phones, error).
+    phones is None when the content hash matches the manifest (only metadata changed).
+    """
+    path, known_hash = task
+    try:
+        with open(path, 'rb') as f:
+            image_bytes = f.read()
+    except OSError as e:
+        return path, None, [], str(e)
+    return _process_image(path, image_bytes, known_hash)
+
+def _process_image(path, image_bytes, known_hash):
+    """
+    Worker entry point for images already read (archive members). Same result as _process_file.
+    """
+    digest = hashlib.sha256(image_bytes).hexdigest()
+    if digest == known_hash:
+        return path, digest, None, None
+    try:
+        return path, digest, sorted(extract_phones(image_bytes)), None
+    except Exception as e:
+        return path, digest, [], str(e)
+
+def _failure_callback(results, path):
+    # A task that raised outside _process_image's own handling (e.g. MemoryError in the worker, or
+    # a result that can't be sent back) still reports a failure, so it doesn't stay in flight
+    return lambda e: results.put((path, None, [], f"{type(e).__name__}: {e}"))
+
+class ResultSink:
+    """
+    Appends newly seen phones to the output file and records files in the manifest.
+    Shared by --batch and --watch.
+    """
+    def __init__(self, output_file, manifest):
+        self.manifest = manifest
+        # Unique phones only (not every occurrence), needed to keep the output file free of duplicates
+        self.seen = set()
+        if os.path.exists(output_file):
+            with open(output_file) as f:
+                self.seen = {line.strip() for line in f if line.strip()}
+        self._out = open(output_file, 'a')
+        self.stats = {"skipped": 0, "processed": 0, "unchanged": 0, "failed": 0, "new_phones": 0}
+
+    def handle(self, path, size, mtime_ns, digest, phones, error):
+        """
+        Returns the list of phones from this file that were not seen before.
+        """
+        if error:
+            # Not recorded in the manifest, so the next run retries it
+            self.stats["failed"] += 1
+            print(f"  Error processing {os.path.basename(path)}: {error}")
+            return []
+
+        new_phones = []
+        if phones is None:
+            self.stats["unchanged"] += 1
+        else:
+            self.stats["processed"] += 1
+            new_phones = [p for p in phones if p not in self.seen]
+            if new_phones:
+                self.seen.update(new_phones)
+                self._out.write("".join(p + "\n" for p in new_phones))
+                self._out.flush()
+                self.stats["new_phones"] += len(new_phones)
+        # Record only after the phones are safely in the output file
+        self.manifest.record(path, size, mtime_ns, digest)
+        return new_phones
+
+    @property
+    def done(self):
+        return self.stats["processed"] + self.stats["unchanged"] + self.stats["failed"]
+
+    def close(self):
+        self._out.close()
+        self.manifest.close()
+
+def _make_pool(workers):
+    if workers <= 1:
+        return None
+    # spawn: torch is not fork-safe once its thread pools exist
+    ctx = multiprocessing.get_context('spawn')
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    return ctx.Pool(workers, initializer=_init_worker, initargs=(threads, normalize_region, normalize_policy))
+
+def process_folder_batch(folder_path, output_file, manifest_path, workers=None):
+    """
+    Processes new/changed images in folder_path, appending newly seen phones to output_file.
+    Returns a stats dict.
+    """
+    if os.path.isfile(folder_path) and is_archive_name(folder_path):
+        archive_only = True # --dir is a single archive
+    elif os.path.isdir(folder_path):
+        archive_only = False
+    else:
+        print(f"Error: Folder '{folder_path}' not found.")
+        return None
+
+    workers = workers or os.cpu_count() or 1
+    sink = ResultSink(output_file, Manifest(manifest_path))
+    manifest = sink.manifest
+    pending = {} # path -> (size, mtime_ns) at scan time
+
+    archives = [os.path.abspath(folder_path)] if archive_only else [] # Processed after the loose images
+
+    def tasks():
+        if archive_only:
+            return
+        with os.scandir(folder_path) as it:
+            for entry in it:
+                if is_archive_name(entry.name) and entry.is_file():
+                    archives.append(os.path.abspath(entry.path))
+                    continue
+                if os.path.splitext(entry.name.lower())[1] not in IMAGE_EXTENSIONS or not entry.is_file():
+                    continue
+                path = os.path.abspath(entry.path)
+                st = entry.stat()
+                if manifest.is_unchanged(path, st.st_size, st.st_mtime_ns):
+                    sink.stats["skipped"] += 1
+                    continue
+                pending[path] = (st.st_size, st.st_mtime_ns)
+                yield path, manifest.known_hash(path)
+
+    print(f"Scanning folder: {folder_path} ({workers} worker(s), manifest: {manifest_path})")
+    pool = _make_pool(workers)
+    if pool is not None:
+        results = pool.imap_unordered(_process_file, tasks())
+    else:
+        results = map(_process_file, tasks())
+
+    started = time.monotonic()
+    try:
+        for path, digest, phones, error in results:
+            size, mtime_ns = pending.pop(path)
+            sink.handle(path, size, mtime_ns, digest, phones, error)
+            if sink.done % 100 == 0:
+                rate = sink.done / max(time.monotonic() - started, 1e-9)
+                print(f"  {sink.done} files done ({rate:.1f}/s), {sink.stats['new_phones']} new phones")
+        for archive_path in archives:
+            process_archive_batch(archive_path, sink, pool, max_in_flight=workers * 2)
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+        sink.close()
+
+    return sink.stats
+
+def process_archive_batch(archive_path, sink, pool, max_in_flight):
+    """
+    Processes the new/changed image members of an archive. Members are decompressed one at a time
+    in this process and at most max_in_flight of them are queued in the pool, so memory stays
+    bounded however large the archive. Members are recorded in the manifest as
+    "<archive path>/<member name>", with the member size and the archive's mtime.
+    """
+    try:
+        archive_mtime_ns = os.stat(archive_path).st_mtime_ns
+    except OSError as e:
+        sink.handle(archive_path, 0, 0, None, [], str(e))
+        return
+    results = queue.Queue()
+    in_flight = {} # member path -> size
+
+    def handle_result(block):
+        path, digest, phones, error = results.get(block=block)
+        sink.handle(path, in_flight.pop(path), archive_mtime_ns, digest, phones, error)
+
+    try:
+        for member in iter_archive(archive_path):
+            path = f"{archive_path}/{member.name}"
+            if sink.manifest.is_unchanged(path, member.size, archive_mtime_ns):
+                sink.stats["skipped"] += 1
+                continue
+            # Back-pressure: wait for a result before decompressing more
+            while len(in_flight) >= max_in_flight:
+                handle_result(block=True)
+            in_flight[path] = member.size
+            task = (path, member.read(), sink.manifest.known_hash(path))
+            if pool is not None:
+                pool.apply_async(_process_image, task, callback=results.put,
+                                 error_callback=_failure_callback(results, path))
+            else:
+                results.put(_process_image(*task))
+            while not results.empty():
+                handle_result(block=False)
+    except (ArchiveError, OSError) as e:
+        # Not recorded in the manifest, so the next run retries the remaining members
+        sink.stats["failed"] += 1
+        print(f"  Error processing {os.path.basename(archive_path)}: {e}")
+    finally:
+        while in_flight:
+            handle_result(block=True)
+
+# --- Watch (daemon) mode ----------------------------------------------------
+# Long-running: watches the folder (inotify, or polling as fallback), waits until a new file
+# has been quiet for `debounce` seconds (so half-written files are not read), then queues it
+# into a bounded worker pool. New unique numbers are printed and appended as they are found.
+
+def watch_folder(folder_path, output_file, manifest_path, workers=None, debounce=1.0,
+                 max_in_flight=None, stats_interval=60.0, polling=False, poll_interval=2.0,
+                 stop_event=None):
+    if not os.path.isdir(folder_path):
+        print(f"Error: Folder '{folder_path}' not found.")
+        return None
+
+    workers = workers or os.cpu_count() or 1
+    max_in_flight = max_in_flight or workers * 2
+    sink = ResultSink(output_file, Manifest(manifest_path))
+    watcher = make_watcher(folder_path, polling=polling, interval=poll_interval)
+    pool = _make_pool(workers)
+    results = queue.Queue()
+
+    debouncing = {} # path -> monotonic time of last event
+    in_flight = {} # path -> (size, mtime_ns) at submit time
+
+    def note(path):
+        path = os.path.abspath(path)
+        if os.path.splitext(path.lower())[1] in IMAGE_EXTENSIONS:
+            debouncing[path] = time.monotonic()
+
+    # Files already in the folder when we start (the manifest skips the ones done before)
+    for path in list_files(folder_path):
+        note(path)
+
+    print(f"Watching {folder_path} with {type(watcher).__name__} ({workers} worker(s), "
+          f"debounce {debounce}s, max {max_in_flight} in flight)")
+    started = last_stats = time.monotonic()
+    done_at_last_stats = 0
+    try:
+        while not (stop_event is not None and stop_event.is_set()):
+            for path in watcher.poll(min(debounce, 0.5) or 0.1):
+                note(path)
+
+            # Submit files that have been quiet long enough, up to the in-flight bound.
+            # The rest stay queued in `debouncing` (back-pressure instead of unbounded memory).
+            now = time.monotonic()
+            for path, last_event in list(debouncing.items()):
+                if len(in_flight) >= max_in_flight:
+                    break
+                if now - last_event < debounce or path in in_flight:
+                    continue
+                del debouncing[path]
+                try:
+                    st = os.stat(path)
+                except FileNotFoundError:
+                    continue # Deleted before we got to it
+                if sink.manifest.is_unchanged(path, st.st_size, st.st_mtime_ns):
+                    sink.stats["skipped"] += 1
+                    continue
+                in_flight[path] = (st.st_size, st.st_mtime_ns)
+                task = (path, sink.manifest.known_hash(path))
+                if pool is not None:
+                    pool.apply_async(_process_file, (task,), callback=results.put,
+                                     error_callback=_failure_callback(results, path))
+                else:
+                    results.put(_process_file(task))
+
+            while True:
+                try:
+                    path, digest, phones, error = results.get_nowait()
+                except queue.Empty:
+                    break
+                size, mtime_ns = in_flight.pop(path)
+                for phone in sink.handle(path, size, mtime_ns, digest, phones, error):
+                    print(f"NEW {phone} ({os.path.basename(path)})", flush=True)
+
+            if time.monotonic() - last_stats >= stats_interval:
+                elapsed = time.monotonic() - last_stats
+                rate = (sink.done - done_at_last_stats) / elapsed
+                print(f"[stats] {rate:.2f} files/s, queue depth {len(debouncing)} waiting + "
+                      f"{len(in_flight)} in flight, {sink.done} done, {sink.stats['new_phones']} new phones, "
+                      f"up {time.monotonic() - started:.0f}s", flush=True)
+                last_stats = time.monotonic()
+                done_at_last_stats = sink.done
+    except KeyboardInterrupt:
+        print("Stopping watcher...")
+    finally:
+        watcher.close()
+        if pool is not None:
+            # Abandon queued work; unfinished files are not in the manifest and are redone on restart
+            pool.terminate()
+            pool.join()
+        sink.close()
+
+    return sink.stats
+
+def _raise_keyboard_interrupt(signum, frame):
+    raise KeyboardInterrupt
+
 def main():
     parser = argparse.ArgumentParser(description="Analyze screenshots for phone numbers.")
-    parser.add_argument("--dir", default="screenshots", help="Directory containing screenshots")
+    parser.add_argument("--dir", default="screenshots",
+                        help="Directory containing screenshots (and/or ZIP/TAR archives of them), or a single archive")
+    parser.add_argument("--batch", action="store_true",
+                        help="Parallel, resumable mode: only new/changed files are processed and results are appended to --output")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes for --batch (default: CPU count)")
+    parser.add_argument("--output", default="extracted_numbers.txt", help="Output file")
+    parser.add_argument("--manifest", default=None, help="Manifest file for --batch/--watch (default: <output>.manifest.jsonl)")
+    parser.add_argument("--watch", action="store_true",
+                        help="Daemon mode: keep watching --dir and process screenshots as they arrive")
+    parser.add_argument("--debounce", type=float, default=1.0, help="Seconds a new file must be quiet before processing (--watch)")
+    parser.add_argument("--max-in-flight", type=int, default=None, help="Max files queued in the worker pool (--watch, default: 2x workers)")
+    parser.add_argument("--stats-interval", type=float, default=60.0, help="Seconds between throughput/queue stats lines (--watch)")
+    parser.add_argument("--poll", action="store_true", help="Use directory polling instead of inotify (--watch)")
+    parser.add_argument("--poll-interval", type=float, default=2.0, help="Seconds between directory scans when polling (--watch)")
+    parser.add_argument("--region", default=None,
+                        help="Default region for numbers without a country code, e.g. IN (default: ACE_DEFAULT_REGION or US)")
+    parser.add_argument("--policy", default="national", choices=POLICIES,
+                        help="Output format: 'national' leaves off the default region's country code unless written, "
+                             "'international' always includes it (as the web app does)")
     args = parser.parse_args()
+    try:
+        configure_normalization(args.region, args.policy)
+    except ValueError as e:
+        parser.error(str(e))
     
     folder_path = args.dir
     # Handle relative paths:
     if not os.path.isabs(folder_path):
         folder_path = os.path.join(os.getcwd(), folder_path)
 
+    manifest_path = args.manifest or args.output + ".manifest.jsonl"
+    if args.watch:
+        # Container stop (SIGTERM) shuts down like Ctrl+C
+        signal.signal(signal.SIGTERM, _raise_keyboard_interrupt)
+        watch_folder(folder_path, args.output, manifest_path, workers=args.workers, debounce=args.debounce,
+                     max_in_flight=args.max_in_flight, stats_interval=args.stats_interval,
+                     polling=args.poll, poll_interval=args.poll_interval)
+        return
+
+    if args.batch:
+        stats = process_folder_batch(folder_path, args.output, manifest_path, workers=args.workers)
+        if stats is not None:
+            print(f"\nProcessed {stats['processed']} files ({stats['skipped']} skipped as already done, "
+                  f"{stats['unchanged']} unchanged content, {stats['failed']} failed).")
+            print(f"Appended {stats['new_phones']} new unique numbers to {args.output}")
+        return
+
     raw_phones = process_folder(folder_path)
     
     # Final Deduplication
@@ -168,7 +560,7 @@ def main():
             print(p)
             
         # Save to file
-        output_file = "extracted_numbers.txt"
+        output_file = args.output
         with open(output_file, "w") as f:
             for p in unique_phones:
                 f.write(p + "\n")
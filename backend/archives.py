@@ -0,0 +1,153 @@
+import posixpath
+import tarfile
+import zipfile
+import zlib
+
+import config
+from uploads import BufferFile, format_size
+
+# Screenshot archives (ZIP, or TAR optionally gzip/bzip2/xz compressed) for /extract and
+# analyze_screenshots.py.
+#
+# Members are decompressed one at a time straight from the upload buffer (no extraction to
+# disk, no copy of the archive), so memory holds one member at a time. Limits against zip bombs:
+#   - ARCHIVE_MAX_MEMBERS entries in the archive (ZIP: checked from the central directory
+#     before anything is decompressed; TAR: while streaming)
+#   - ARCHIVE_MAX_MEMBER_SIZE uncompressed bytes per member, enforced while decompressing
+#     (declared sizes can lie)
+#   - ARCHIVE_MAX_TOTAL_SIZE uncompressed bytes in total
+# Crossing a limit stops the archive with ArchiveError; members already read keep their results.
+# Directories, non-image members (by extension), macOS metadata (__MACOSX/, ._*) and nested
+# archives are skipped.
+
+IMAGE_EXTENSIONS = {'.png', '.jpg', '.jpeg', '.bmp', '.tiff', '.webp'}
+ARCHIVE_EXTENSIONS = ('.zip', '.tar', '.tar.gz', '.tgz', '.tar.bz2', '.tbz2', '.tar.xz', '.txz')
+_CHUNK_SIZE = 1024 * 1024
+
+class ArchiveError(ValueError):
+    pass
+
+def is_archive_name(filename):
+    return bool(filename) and filename.lower().endswith(ARCHIVE_EXTENSIONS)
+
+def archive_kind(filename, data):
+    """
+    'zip', 'tar' or None, from the content (plus the name for compressed TARs).
+    """
+    head = bytes(data[:262])
+    if head.startswith((b'PK\x03\x04', b'PK\x05\x06')):
+        return 'zip'
+    if head[257:262] == b'ustar':
+        return 'tar'
+    if head.startswith((b'\x1f\x8b', b'BZh', b'\xfd7zXZ')) and is_archive_name(filename):
+        return 'tar'
+    return None
+
+def is_image_member(name):
+    base = posixpath.basename(name)
+    if not base or base.startswith('.') or '__MACOSX/' in name:
+        return False
+    return posixpath.splitext(base.lower())[1] in IMAGE_EXTENSIONS
+
+class ArchiveMember:
+    __slots__ = ('name', 'size', '_read')
+
+    def __init__(self, name, size, read):
+        self.name = name
+        # Declared uncompressed size
+        self.size = size
+        self._read = read
+
+    def read(self):
+        """
+        The member's bytes. For TARs this must be called before moving on to the next member.
+        """
+        return self._read()
+
+class ArchiveReader:
+    def __init__(self, data, filename="", max_members=None, max_member_size=None, max_total_size=None):
+        """
+        data: bytes or memory map of the archive (see uploads.open_upload).
+        Raises ArchiveError if it is not a ZIP or TAR archive.
+        """
+        self.kind = archive_kind(filename, data)
+        if self.kind is None:
+            raise ArchiveError(f"'{filename}' is not a ZIP or TAR archive")
+        self.data = data
+        self.filename = filename
+        self.max_members = max_members or config.ARCHIVE_MAX_MEMBERS
+        self.max_member_size = max_member_size or config.ARCHIVE_MAX_MEMBER_SIZE
+        self.max_total_size = max_total_size or config.ARCHIVE_MAX_TOTAL_SIZE
+        self.total_size = 0
+        self.skipped = 0
+
+    def _read_limited(self, fileobj, name):
+        limit = min(self.max_member_size, self.max_total_size - self.total_size)
+        chunks = []
+        size = 0
+        while True:
+            chunk = fileobj.read(_CHUNK_SIZE)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > limit:
+                if limit < self.max_member_size:
+                    raise ArchiveError(f"'{self.filename}' exceeds {format_size(self.max_total_size)} uncompressed")
+                raise ArchiveError(f"'{name}' in '{self.filename}' exceeds {format_size(self.max_member_size)} uncompressed")
+            chunks.append(chunk)
+        self.total_size += size
+        return b"".join(chunks)
+
+    def _check_declared(self, name, size):
+        if size > self.max_member_size:
+            raise ArchiveError(f"'{name}' in '{self.filename}' exceeds {format_size(self.max_member_size)} uncompressed")
+
+    def members(self):
+        """
+        Yields the image members (ArchiveMember) in archive order.
+        Close the generator if not exhausted, so the buffer (e.g. a memory map) can be closed.
+        """
+        buffer = BufferFile(self.data)
+        try:
+            if self.kind == 'zip':
+                yield from self._zip_members(buffer)
+            else:
+                yield from self._tar_members(buffer)
+        except (zipfile.BadZipFile, tarfile.TarError, zlib.error, EOFError, NotImplementedError, RuntimeError) as e:
+            # Corrupt or truncated archive, unsupported compression, encrypted member
+            raise ArchiveError(f"Could not read '{self.filename}': {e}")
+        finally:
+            buffer.close()
+
+    def _zip_members(self, buffer):
+        with zipfile.ZipFile(buffer) as archive:
+            infos = archive.infolist()
+            if len(infos) > self.max_members:
+                raise ArchiveError(f"'{self.filename}' has {len(infos)} entries (limit {self.max_members})")
+            for info in infos:
+                if info.is_dir() or not is_image_member(info.filename):
+                    self.skipped += not info.is_dir()
+                    continue
+                self._check_declared(info.filename, info.file_size)
+
+                def read(info=info):
+                    with archive.open(info) as f:
+                        return self._read_limited(f, info.filename)
+                yield ArchiveMember(info.filename, info.file_size, read)
+
+    def _tar_members(self, buffer):
+        # Stream mode: members are read in order, nothing is seeked or buffered
+        with tarfile.open(fileobj=buffer, mode='r|*') as archive:
+            count = 0
+            for info in archive:
+                count += 1
+                if count > self.max_members:
+                    raise ArchiveError(f"'{self.filename}' has more than {self.max_members} entries")
+                if not info.isfile() or not is_image_member(info.name):
+                    self.skipped += info.isfile()
+                    continue
+                self._check_declared(info.name, info.size)
+
+                def read(info=info):
+                    return self._read_limited(archive.extractfile(info), info.name)
+                yield ArchiveMember(info.name, info.size, read)
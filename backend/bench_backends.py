@@ -0,0 +1,114 @@
+import time
+import random
+import argparse
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+from ocr_backends import EasyOCRBackend, ONNXBackend
+from extractor import extractor
+
+# Benchmark: latency and accuracy of the OCR backends (ocr_backends.py) on the same corpus.
+#
+#   python export_onnx.py --int8              # once, writes onnx_models/
+#   python bench_backends.py --images 50 --backends easyocr onnx onnx-int8
+#
+# The corpus is generated (seeded) contact-list screenshots with known names and phone numbers,
+# so accuracy is measured end to end: backend readtext -> extractor.extract_contacts.
+
+BACKEND_CONFIGS = {
+    "easyocr": lambda languages: EasyOCRBackend(languages),
+    "onnx": lambda languages: ONNXBackend(languages, int8=False),
+    "onnx-int8": lambda languages: ONNXBackend(languages, int8=True),
+}
+
+FIRST_NAMES = ["Jane", "John", "Priya", "Carlos", "Mei", "Ahmed", "Olga", "Liam", "Sara", "Tom"]
+LAST_NAMES = ["Smith", "Patel", "Garcia", "Chen", "Khan", "Ivanova", "Murphy", "Berg", "Jones", "Lee"]
+
+def _font(size):
+    try:
+        return ImageFont.load_default(size=size)
+    except TypeError:
+        return ImageFont.load_default()
+
+def make_corpus(count, seed=0):
+    """
+    Returns a list of (image_np, [(name, normalized_phone), ...]).
+    """
+    rng = random.Random(seed)
+    name_font, phone_font = _font(30), _font(26)
+    corpus = []
+    for _ in range(count):
+        contacts = []
+        image = Image.new('RGB', (720, 160 + 150 * 3), color='white')
+        d = ImageDraw.Draw(image)
+        for row in range(rng.randint(1, 3)):
+            name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+            phone = f"+1 {rng.randint(201, 989)} {rng.randint(200, 999)} {rng.randint(0, 9999):04d}"
+            y = 80 + row * 150
+            d.text((40, y), name, fill='black', font=name_font)
+            d.text((40, y + 50), phone, fill=(90, 90, 90), font=phone_font)
+            contacts.append((name, extractor.normalize_phone(phone)))
+        corpus.append((np.array(image), contacts))
+    return corpus
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return float('nan')
+    index = min(len(sorted_values) - 1, int(round(p / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+def bench(backend, corpus, warmup=2):
+    for image_np, _ in corpus[:warmup]:
+        backend.readtext(image_np)
+
+    latencies = []
+    expected_phones = found_phones = correct_names = 0
+    for image_np, expected in corpus:
+        start = time.perf_counter()
+        results = backend.readtext(image_np)
+        latencies.append(time.perf_counter() - start)
+
+        found = {c.phone: c.name for c in extractor.extract_contacts(results)}
+        for name, phone in expected:
+            expected_phones += 1
+            if phone in found:
+                found_phones += 1
+                correct_names += found[phone] == name
+    latencies.sort()
+    return {
+        "mean": sum(latencies) / len(latencies),
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "phone_recall": found_phones / max(expected_phones, 1),
+        "name_accuracy": correct_names / max(expected_phones, 1),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare OCR backends for latency and accuracy on a synthetic corpus.")
+    parser.add_argument("--backends", nargs="+", default=list(BACKEND_CONFIGS), choices=list(BACKEND_CONFIGS))
+    parser.add_argument("--images", type=int, default=30)
+    parser.add_argument("--langs", nargs="+", default=["en"])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    corpus = make_corpus(args.images, args.seed)
+    rows = []
+    for name in args.backends:
+        print(f"Benchmarking {name}...")
+        started = time.perf_counter()
+        try:
+            backend = BACKEND_CONFIGS[name](args.langs)
+        except Exception as e:
+            print(f"  skipped: {e}")
+            continue
+        load_time = time.perf_counter() - started
+        rows.append(dict(bench(backend, corpus), backend=name, load=load_time))
+
+    print()
+    print(f"{'backend':>10} {'load s':>7} {'mean s':>7} {'p50 s':>7} {'p95 s':>7} {'phones':>7} {'names':>7}")
+    for r in rows:
+        print(f"{r['backend']:>10} {r['load']:>7.1f} {r['mean']:>7.3f} {r['p50']:>7.3f} {r['p95']:>7.3f} "
+              f"{r['phone_recall']:>7.1%} {r['name_accuracy']:>7.1%}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+import os
+import sys
+import time
+import json
+import random
+import resource
+import argparse
+import tempfile
+import subprocess
+
+# Benchmark: time and peak memory of reading a large .xlsx upload for /process-dataset,
+# pd.read_excel (full openpyxl object model) versus the streaming read-only path (spreadsheets.py).
+#
+#   python bench_excel.py --rows 100000 500000
+#
+# Each reader runs in a fresh process so its peak RSS is its own. The workbook is generated
+# (seeded): a title row, a header and Name / Phone / Company / City rows.
+
+READERS = ("read_excel", "streaming")
+
+def make_workbook(path, rows, seed=0):
+    from openpyxl import Workbook
+    rng = random.Random(seed)
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Contacts")
+    sheet.append(["Contact export"])
+    sheet.append(["Name", "Phone", "Company", "City"])
+    for i in range(rows):
+        phone = f"+1 {rng.randint(201, 989)} {rng.randint(200, 999)} {rng.randint(0, 9999):04d}"
+        sheet.append([f"Contact {i}", phone, f"Company {rng.randint(1, 5000)}", rng.choice(["NY", "SF", "LA"])])
+    workbook.save(path)
+
+def run_reader(reader, path):
+    """
+    Child process: reads the workbook into one DataFrame, prints JSON with seconds and peak RSS.
+    """
+    import pandas as pd
+    from spreadsheets import iter_xlsx_chunks
+
+    started = time.perf_counter()
+    if reader == "read_excel":
+        df = pd.read_excel(path, sheet_name="Contacts", header=1)
+    else:
+        df = pd.concat(iter_xlsx_chunks(path, sheet="Contacts"), ignore_index=True)
+    seconds = time.perf_counter() - started
+    # ru_maxrss is in KB on Linux
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(json.dumps({"rows": len(df), "seconds": seconds, "peak_mb": peak_mb}))
+
+def baseline_mb():
+    # Interpreter plus pandas/openpyxl imports, subtracted from the peaks
+    code = ("import resource, pandas, openpyxl, spreadsheets; "
+            "print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024)")
+    return float(subprocess.check_output([sys.executable, "-c", code], cwd=os.path.dirname(os.path.abspath(__file__))))
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark .xlsx ingestion for /process-dataset.")
+    parser.add_argument("--rows", type=int, nargs="+", default=[100000])
+    parser.add_argument("--readers", nargs="+", default=list(READERS), choices=READERS)
+    parser.add_argument("--run", choices=READERS, help=argparse.SUPPRESS)
+    parser.add_argument("--file", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        run_reader(args.run, args.file)
+        return
+
+    base = baseline_mb()
+    print(f"Baseline (imports): {base:.0f}MB")
+    print(f"{'rows':>8} {'reader':>11} {'seconds':>8} {'peak MB':>8} {'above baseline':>15}")
+    for rows in args.rows:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "contacts.xlsx")
+            make_workbook(path, rows)
+            for reader in args.readers:
+                output = subprocess.check_output([sys.executable, __file__, "--run", reader, "--file", path],
+                                                 cwd=os.path.dirname(os.path.abspath(__file__)))
+                result = json.loads(output.decode().strip().splitlines()[-1])
+                assert result["rows"] == rows, result
+                print(f"{rows:>8} {reader:>11} {result['seconds']:>8.1f} {result['peak_mb']:>8.0f} "
+                      f"{result['peak_mb'] - base:>15.0f}")
+
+if __name__ == "__main__":
+    main()
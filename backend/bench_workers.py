@@ -0,0 +1,177 @@
+import os
+import io
+import sys
+import time
+import signal
+import argparse
+import threading
+import subprocess
+import requests
+from PIL import Image, ImageDraw, ImageFont
+
+# Benchmark: throughput and memory vs number of gunicorn workers (gunicorn.conf.py).
+#
+#   python bench_workers.py --workers 1 2 4 --duration 60
+#
+# For each worker count it starts the server, drives /extract with concurrent clients and reports
+# requests/s, latency percentiles and memory read from /proc/<pid>/smaps_rollup (Linux only):
+#   USS = memory unique to a process (what one more worker actually costs)
+#   PSS = USS + its share of pages shared with the master/other workers (the preloaded model)
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def make_image():
+    image = Image.new('RGB', (600, 300), color='white')
+    d = ImageDraw.Draw(image)
+    try:
+        font = ImageFont.load_default(size=32)
+    except TypeError:
+        font = ImageFont.load_default()
+    d.text((30, 60), "Jane Benchmark", fill='black', font=font)
+    d.text((30, 140), "+1 415 555 0134", fill='black', font=font)
+    buf = io.BytesIO()
+    image.save(buf, format='PNG')
+    return buf.getvalue()
+
+def read_memory(pid):
+    """
+    Returns {'rss', 'pss', 'uss'} in MB for a process.
+    """
+    values = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2 and parts[1].isdigit():
+                values[parts[0].rstrip(':')] = int(parts[1])
+    uss = values.get('Private_Clean', 0) + values.get('Private_Dirty', 0)
+    return {'rss': values.get('Rss', 0) / 1024, 'pss': values.get('Pss', 0) / 1024, 'uss': uss / 1024}
+
+def child_pids(pid):
+    children = []
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                # Field 4 is the parent pid; the command name (field 2) may contain spaces
+                ppid = int(f.read().rsplit(')', 1)[1].split()[1])
+        except (OSError, ValueError, IndexError):
+            continue
+        if ppid == pid:
+            children.append(int(entry))
+    return children
+
+def wait_for_health(base_url, server, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError("Server exited during startup")
+        try:
+            if requests.get(f"{base_url}/health", timeout=2).status_code == 200:
+                return
+        except requests.exceptions.ConnectionError:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError("Server did not become healthy in time")
+
+def run_load(base_url, image_bytes, concurrency, duration):
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    stop_at = time.monotonic() + duration
+
+    def client():
+        session = requests.Session()
+        while time.monotonic() < stop_at:
+            start = time.monotonic()
+            try:
+                resp = session.post(f"{base_url}/extract",
+                                    files={"files": ("bench.png", image_bytes, "image/png")}, timeout=600)
+                ok = resp.status_code == 200
+            except requests.exceptions.RequestException:
+                ok = False
+            with lock:
+                if ok:
+                    latencies.append(time.monotonic() - start)
+                else:
+                    errors[0] += 1
+
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return sorted(latencies), errors[0]
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return float('nan')
+    index = min(len(sorted_values) - 1, int(round(p / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+def bench(worker_count, args, image_bytes):
+    port = args.port
+    base_url = f"http://127.0.0.1:{port}"
+    env = dict(os.environ, ACE_WORKERS=str(worker_count), PORT=str(port))
+    server = subprocess.Popen(["gunicorn", "-c", "gunicorn.conf.py", "main:app"], cwd=BACKEND_DIR, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        started = time.monotonic()
+        wait_for_health(base_url, server, args.startup_timeout)
+        cold_start = time.monotonic() - started
+
+        # Warm-up so every worker has run inference once before measuring
+        run_load(base_url, image_bytes, worker_count, args.warmup)
+        latencies, errors = run_load(base_url, image_bytes, args.concurrency or 2 * worker_count, args.duration)
+
+        master = read_memory(server.pid)
+        workers = [read_memory(pid) for pid in child_pids(server.pid)]
+        return {
+            "workers": worker_count,
+            "cold_start": cold_start,
+            "rps": len(latencies) / args.duration,
+            "p50": percentile(latencies, 50),
+            "p95": percentile(latencies, 95),
+            "errors": errors,
+            "master_pss": master['pss'],
+            "worker_uss": sum(w['uss'] for w in workers) / max(len(workers), 1),
+            "worker_pss": sum(w['pss'] for w in workers) / max(len(workers), 1),
+            "total_pss": master['pss'] + sum(w['pss'] for w in workers),
+        }
+    finally:
+        server.send_signal(signal.SIGTERM)
+        try:
+            server.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            server.kill()
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark /extract throughput and memory vs gunicorn worker count.")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--duration", type=float, default=60.0, help="Seconds of measured load per worker count")
+    parser.add_argument("--warmup", type=float, default=10.0)
+    parser.add_argument("--concurrency", type=int, default=None, help="Concurrent clients (default: 2x workers)")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--startup-timeout", type=float, default=600.0)
+    args = parser.parse_args()
+
+    if not sys.platform.startswith('linux'):
+        print("Memory figures need /proc (Linux).")
+        return
+
+    image_bytes = make_image()
+    rows = []
+    for worker_count in args.workers:
+        print(f"Benchmarking {worker_count} worker(s)...")
+        rows.append(bench(worker_count, args, image_bytes))
+
+    print()
+    print(f"{'workers':>7} {'cold s':>7} {'req/s':>7} {'p50 s':>7} {'p95 s':>7} {'errors':>6} "
+          f"{'master PSS':>10} {'worker USS':>10} {'worker PSS':>10} {'total PSS':>10}")
+    for r in rows:
+        print(f"{r['workers']:>7} {r['cold_start']:>7.1f} {r['rps']:>7.2f} {r['p50']:>7.2f} {r['p95']:>7.2f} "
+              f"{r['errors']:>6} {r['master_pss']:>8.0f}MB {r['worker_uss']:>8.0f}MB "
+              f"{r['worker_pss']:>8.0f}MB {r['total_pss']:>8.0f}MB")
+
+if __name__ == "__main__":
+    main()
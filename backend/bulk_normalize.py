@@ -0,0 +1,168 @@
+import json
+import codecs
+
+
+# Bulk phone normalization for POST /normalize.
+#
+# The request body (a JSON array or NDJSON of raw strings) is parsed incrementally as it streams
+# in, normalized in batches and streamed back in the same order, so memory stays bounded by the
+# batch size, the memo and one entry per distinct number (needed for the dedup group ids):
+#   - each batch is normalized per DISTINCT raw string (phone lists repeat a lot), with
+#     results memoized across batches
+#   - every distinct normalized number gets a group id in order of first appearance;
+#     values that normalize to "" get no group (null), like the rows /process-dataset drops
+
+BATCH_SIZE = 10000
+# Distinct raw strings memoized per request; beyond that new strings are normalized without
+# being remembered (earlier, typically most repeated, entries stay useful)
+MEMO_LIMIT = 1000000
+
+def _raw_value(value):
+    # Spreadsheet exports often carry numbers instead of strings
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        raise ValueError(f"Expected a string or number, got {json.dumps(value)}")
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    if isinstance(value, (str, int, float)):
+        return str(value)
+    raise ValueError(f"Expected a string or number, got {json.dumps(value)[:50]}")
+
+async def iter_json_array(chunks):
+    """
+    Yields the items of a top-level JSON array from an async iterator of byte chunks.
+    Raises ValueError on malformed input.
+    """
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder('utf-8')()
+    buffer = ""
+    # start -> '[' -> first (value or ']') -> sep (',' or ']') -> value -> ... -> done
+    state = 'start'
+
+    async def more():
+        async for chunk in chunks:
+            yield text_decoder.decode(chunk), False
+        yield text_decoder.decode(b"", final=True), True
+
+    async for text, final in more():
+        buffer += text
+        pos = 0
+        size = len(buffer)
+        while True:
+            while pos < size and buffer[pos] in ' \t\r\n':
+                pos += 1
+            if pos == size:
+                break
+            char = buffer[pos]
+            if state == 'start':
+                if char != '[':
+                    raise ValueError("Expected a JSON array")
+                pos += 1
+                state = 'first'
+            elif state == 'done':
+                raise ValueError(f"Unexpected data after the JSON array at offset {pos}")
+            elif state == 'sep' or (state == 'first' and char == ']'):
+                if char == ']':
+                    state = 'done'
+                elif char == ',':
+                    state = 'value'
+                else:
+                    raise ValueError(f"Expected ',' or ']' in the JSON array, got {char!r}")
+                pos += 1
+            else:
+                try:
+                    value, end = decoder.raw_decode(buffer, pos)
+                except json.JSONDecodeError as e:
+                    if final:
+                        raise ValueError(f"Invalid JSON: {e}")
+                    break # Probably cut off by the chunk boundary
+                if not final and (end == size or (isinstance(value, (int, float))
+                                                  and buffer[end] not in ' \t\r\n,]')):
+                    break # A number cut off by the chunk boundary ("12" of "12.5e3") may continue
+                yield _raw_value(value)
+                pos = end
+                state = 'sep'
+        buffer = buffer[pos:]
+        if final and state != 'done':
+            raise ValueError("Unexpected end of the JSON array")
+
+async def iter_ndjson(chunks):
+    """
+    Yields one value per non-empty line (each line a JSON string or number).
+    """
+    text_decoder = codecs.getincrementaldecoder('utf-8')()
+    buffer = ""
+    line_number = 0
+
+    def parse(line):
+        try:
+            return _raw_value(json.loads(line))
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Invalid JSON on line {line_number}: {e}")
+
+    async for chunk in chunks:
+        buffer += text_decoder.decode(chunk)
+        lines = buffer.split('\n')
+        buffer = lines.pop()
+        for line in lines:
+            line_number += 1
+            if line.strip():
+                yield parse(line)
+    buffer += text_decoder.decode(b"", final=True)
+    if buffer.strip():
+        line_number += 1
+        yield parse(buffer)
+
+class BulkNormalizer:
+    def __init__(self, normalizer):
+        # A phone_normalizer.PhoneNormalizer (region + output policy)
+        self.normalizer = normalizer
+        self.memo = {}
+        self.groups = {}
+
+    def process(self, batch):
+        """
+        batch: list of raw strings. Returns a list of (normalized, group_id) in the same order.
+        """
+        memo = self.memo
+        local = {}
+        for raw in dict.fromkeys(batch):
+            normalized = memo.get(raw)
+            if normalized is None:
+                normalized = self.normalizer.normalize(raw)
+                if len(memo) < MEMO_LIMIT:
+                    memo[raw] = normalized
+            local[raw] = normalized
+
+        groups = self.groups
+        rows = []
+        for raw in batch:
+            normalized = local[raw]
+            if normalized:
+                group = groups.get(normalized)
+                if group is None:
+                    group = groups[normalized] = len(groups)
+            else:
+                group = None
+            rows.append((normalized, group))
+        return rows
+
+async def iter_batches(values, size=BATCH_SIZE):
+    batch = []
+    async for value in values:
+        batch.append(value)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def render_rows(rows, ndjson):
+    """
+    Serializes one batch: NDJSON lines, or the items of a JSON array (without brackets).
+    """
+    objects = [{"normalized": normalized, "group": group} for normalized, group in rows]
+    if ndjson:
+        return "".join(json.dumps(o) + "\n" for o in objects)
+    return json.dumps(objects)[1:-1]
@@ -0,0 +1,167 @@
+import os
+import math
+import time
+import threading
+from contextlib import contextmanager
+
+import config
+from scheduler import FairScheduler, Job, parse_weights, INTERACTIVE, BATCH
+
+# CPU governance for OCR.
+#
+# PyTorch (and ONNX Runtime) use every core for each inference by default, so two concurrent
+# OCR calls fight over the same cores and total throughput drops instead of rising. Instead:
+#   - each OCR call gets cpus / (workers * OCR_MAX_CONCURRENT) intra-op threads
+#   - at most OCR_MAX_CONCURRENT OCR calls run at once per process, handed out fairly between
+#     clients with an interactive priority lane (see scheduler.py)
+#   - up to OCR_MAX_QUEUE further requests wait for a slot; beyond that requests are
+#     rejected (429 + Retry-After) so queueing delay stays bounded
+#   - speculative calls (see speculation.py) only get slots nobody else needs: none while calls
+#     are queued, other admitted requests between calls have a slot kept free for them, and none
+#     while the machine's load average is above SPECULATIVE_MAX_LOAD per CPU
+
+def available_cpus():
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+def intra_op_threads(processes=None):
+    """
+    Threads per OCR call so that processes * OCR_MAX_CONCURRENT calls fill the CPUs without oversubscribing.
+    """
+    if config.OCR_THREADS:
+        return config.OCR_THREADS
+    processes = processes or config.WORKERS
+    return max(1, available_cpus() // (processes * config.OCR_MAX_CONCURRENT))
+
+def load_per_cpu():
+    try:
+        return os.getloadavg()[0] / available_cpus()
+    except OSError: # Not available on this platform
+        return 0.0
+
+def set_intra_op_threads(threads):
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+
+class OCROverloaded(Exception):
+    def __init__(self, retry_after):
+        super().__init__(f"OCR queue is full, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+class OCRConcurrency:
+    """
+    Admission control (per request) plus fairly scheduled slots (per OCR call).
+    run() blocks, so call it from a worker thread (see main.py).
+    """
+    def __init__(self, max_concurrent, max_queue, weights=None):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.scheduler = FairScheduler(max_concurrent)
+        self.weights = parse_weights(config.SCHEDULER_WEIGHTS) if weights is None else weights
+        # Calls made through run() without a job share one batch-lane key
+        self._default_job = Job("default", BATCH)
+        self._lock = threading.Lock()
+        self.admitted = 0
+        self.running = 0
+        self.speculative_running = 0
+        self.rejected = 0
+        # Smoothed duration of an admitted request, for Retry-After
+        self.request_seconds = None
+
+    def retry_after(self):
+        # Time for the requests ahead to drain through the slots
+        per_request = self.request_seconds or 1.0
+        waiting = max(0, self.admitted - self.max_concurrent) + 1
+        return max(1, math.ceil(per_request * waiting / self.max_concurrent))
+
+    @contextmanager
+    def admit(self):
+        with self._lock:
+            if self.admitted >= self.max_concurrent + self.max_queue:
+                self.rejected += 1
+                raise OCROverloaded(self.retry_after())
+            self.admitted += 1
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            elapsed = time.monotonic() - start
+            with self._lock:
+                self.admitted -= 1
+                if self.request_seconds is None:
+                    self.request_seconds = elapsed
+                else:
+                    self.request_seconds = 0.8 * self.request_seconds + 0.2 * elapsed
+
+    def job(self, key, files=1):
+        """
+        Scheduler Job for a request from client `key` with `files` images (None if unknown, e.g.
+        archives). Small requests use the interactive lane (see scheduler.py).
+        """
+        small = files is not None and files <= config.SCHEDULER_INTERACTIVE_FILES
+        lane = INTERACTIVE if small else BATCH
+        return Job(key, lane, self.weights.get(key, 1.0))
+
+    def run(self, fn, *args, **kwargs):
+        return self.run_job(self._default_job, fn, *args, **kwargs)
+
+    def run_job(self, job, fn, *args, **kwargs):
+        """
+        Runs fn in an OCR slot once the scheduler picks this job, recording queue and OCR time on it.
+        A call passing cancel=<Event> can be withdrawn while queued (FairScheduler.withdraw); it
+        then returns None without running.
+        """
+        grant = self.scheduler.acquire(job, kwargs.get('cancel'))
+        if grant is None:
+            return None
+        return self.run_granted(job, grant, fn, *args, **kwargs)
+
+    def speculate(self, job):
+        """
+        A Grant for a speculative call of job if there is spare capacity (see module comment),
+        else None. Doesn't block; run the call with run_granted().
+        """
+        if config.SPECULATIVE_MAX_LOAD and load_per_cpu() > config.SPECULATIVE_MAX_LOAD:
+            return None
+        with self._lock:
+            # Admitted requests without a running call will want a slot soon
+            idle = max(0, self.admitted - (self.running - self.speculative_running))
+        return self.scheduler.try_acquire(job, keep_free=idle)
+
+    def run_granted(self, job, grant, fn, *args, **kwargs):
+        speculative = grant.cancel is not None
+        with self._lock:
+            self.running += 1
+            self.speculative_running += speculative
+        # Counted when started: cancelled ones may still be winding down when the request answers
+        job.speculative_calls += speculative
+        started = time.monotonic()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            elapsed = time.monotonic() - started
+            with self._lock:
+                self.running -= 1
+                self.speculative_running -= speculative
+            job.calls += 1
+            job.queue_seconds += grant.waited
+            job.ocr_seconds += elapsed
+            self.scheduler.release(grant, elapsed)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "running": self.running,
+                "queued": max(0, self.admitted - self.running),
+                "rejected": self.rejected,
+                "max_concurrent": self.max_concurrent,
+                "max_queue": self.max_queue,
+                "scheduler": self.scheduler.stats(),
+            }
+
+ocr_concurrency = OCRConcurrency(config.OCR_MAX_CONCURRENT, config.OCR_MAX_QUEUE)
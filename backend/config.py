@@ -0,0 +1,130 @@
+import os
+import tempfile
+
+# Runtime settings, read once from the environment at import.
+# Defaults keep the original single-process behaviour; override them in the
+# Dockerfile / deployment environment rather than editing this file.
+
+def _env_int(name, default):
+    try:
+        return int(os.getenv(name, default))
+    except (TypeError, ValueError):
+        return default
+
+def _env_float(name, default):
+    try:
+        return float(os.getenv(name, default))
+    except (TypeError, ValueError):
+        return default
+
+def _env_bool(name, default):
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ('1', 'true', 'yes', 'on')
+
+# Default region for phone numbers written without a country code (see phone_normalizer.py);
+# endpoints and the CLI can override it per request / run
+DEFAULT_REGION = os.getenv("ACE_DEFAULT_REGION", "US").upper()
+
+# Near-duplicate image detection (see image_hash.py)
+IMAGE_DEDUP_ENABLED = _env_bool("ACE_IMAGE_DEDUP", True)
+# Maximum number of strongly changed thumbnail pixels for two uploads to count as the same capture.
+# 0 tolerates recompression/rescaling but not a single changed digit; raise it to be more lenient.
+IMAGE_DEDUP_THRESHOLD = _env_int("ACE_IMAGE_DEDUP_THRESHOLD", 0)
+# Fraction of the image height (from the top) ignored when comparing, i.e. the phone status bar.
+IMAGE_DEDUP_IGNORE_TOP = _env_float("ACE_IMAGE_DEDUP_IGNORE_TOP", 0.06)
+# Remember hashes across requests (process-wide LRU) in addition to within one request.
+IMAGE_DEDUP_CROSS_REQUEST = _env_bool("ACE_IMAGE_DEDUP_CROSS_REQUEST", False)
+IMAGE_DEDUP_CACHE_SIZE = _env_int("ACE_IMAGE_DEDUP_CACHE_SIZE", 1000)
+
+# Uploads (see uploads.py). Limits are enforced while the request body streams in (413 beyond them).
+# Files larger than the spool threshold are kept on disk instead of in memory.
+UPLOAD_SPOOL_THRESHOLD = _env_int("ACE_UPLOAD_SPOOL_THRESHOLD", 1024 * 1024)
+UPLOAD_MAX_FILE_SIZE = _env_int("ACE_UPLOAD_MAX_FILE_SIZE", 20 * 1024 * 1024)
+UPLOAD_MAX_REQUEST_SIZE = _env_int("ACE_UPLOAD_MAX_REQUEST_SIZE", 200 * 1024 * 1024)
+# /process-dataset takes one (potentially large) CSV/Excel file
+DATASET_MAX_FILE_SIZE = _env_int("ACE_DATASET_MAX_FILE_SIZE", 200 * 1024 * 1024)
+
+# OCR backend (see ocr_backends.py): 'easyocr' (PyTorch) or 'onnx' (ONNX Runtime, models from export_onnx.py)
+OCR_BACKEND = os.getenv("ACE_OCR_BACKEND", "easyocr")
+# Default OCR languages (comma-separated EasyOCR codes), loaded at startup and always part of
+# the reader used for a language hint (see reader_pool.py)
+OCR_LANGUAGES = [code.strip() for code in os.getenv("ACE_OCR_LANGUAGES", "en").split(",") if code.strip()]
+# Readers kept loaded at once, including the default one (which is never evicted)
+OCR_MAX_READERS = max(1, _env_int("ACE_OCR_MAX_READERS", 2))
+OCR_ONNX_MODEL_DIR = os.getenv("ACE_OCR_ONNX_MODEL_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "onnx_models"))
+OCR_ONNX_INT8 = _env_bool("ACE_OCR_ONNX_INT8", False)
+# ONNX Runtime intra-op threads (0 = the per-call OCR thread budget, see OCR_THREADS)
+OCR_ONNX_THREADS = _env_int("ACE_OCR_ONNX_THREADS", 0)
+
+# OCR concurrency (see concurrency.py)
+# OCR calls running at once per process; more requests wait for a slot
+OCR_MAX_CONCURRENT = max(1, _env_int("ACE_OCR_MAX_CONCURRENT", 1))
+# Requests allowed to wait for a slot; beyond that /extract answers 429 with Retry-After
+OCR_MAX_QUEUE = max(0, _env_int("ACE_OCR_MAX_QUEUE", 16))
+# Intra-op threads per OCR call (0 = split the CPUs evenly between workers and concurrent calls).
+# ACE_TORCH_THREADS is the older name for the same setting.
+OCR_THREADS = _env_int("ACE_OCR_THREADS", _env_int("ACE_TORCH_THREADS", 0))
+# Server processes sharing the CPUs (gunicorn workers, see gunicorn.conf.py)
+WORKERS = max(1, _env_int("ACE_WORKERS", 1))
+
+# /extract time limits in seconds (see deadlines.py), 0 = unlimited. Clients can lower them per
+# request with ?deadline= and ?file_budget=. Once spent, the remaining fallback strategies are
+# skipped and the best contacts found so far are returned.
+EXTRACT_DEADLINE = _env_float("ACE_EXTRACT_DEADLINE", 0)
+EXTRACT_FILE_BUDGET = _env_float("ACE_EXTRACT_FILE_BUDGET", 0)
+
+# /extract strategy loop (see quality.py): strategies stop once a pass scores at least this
+# (0..1, ?min_quality= per request). Large images are first read from a thumbnail whose long
+# side is OCR_THUMBNAIL_SIZE pixels; full resolution only runs if the thumbnail falls short.
+EXTRACT_MIN_QUALITY = _env_float("ACE_EXTRACT_MIN_QUALITY", 0.8)
+OCR_THUMBNAIL = _env_bool("ACE_OCR_THUMBNAIL", True)
+OCR_THUMBNAIL_SIZE = _env_int("ACE_OCR_THUMBNAIL_SIZE", 1280)
+# Speculative strategies (see speculation.py): while a pass runs, up to this many of the next
+# strategies run at the same time on OCR slots nobody else needs (0 = off, ?speculative= per
+# request). Not while the 1-minute load average per CPU is above SPECULATIVE_MAX_LOAD (0 = no check).
+EXTRACT_SPECULATIVE = max(0, _env_int("ACE_EXTRACT_SPECULATIVE", 0))
+SPECULATIVE_MAX_LOAD = _env_float("ACE_SPECULATIVE_MAX_LOAD", 0.8)
+
+# POST /normalize request body limit (a million numbers as JSON is ~20MB)
+NORMALIZE_MAX_REQUEST_SIZE = _env_int("ACE_NORMALIZE_MAX_REQUEST_SIZE", 256 * 1024 * 1024)
+
+# Fuzzy dedup (see fuzzy_dedup.py), opt-in per request with ?fuzzy_dedup=true.
+# Candidate blocks larger than this (very common keys) are not compared, keeping it near-linear.
+FUZZY_DEDUP_MAX_BLOCK = _env_int("ACE_FUZZY_DEDUP_MAX_BLOCK", 100)
+
+# ZIP/TAR uploads to /extract (see archives.py). An archive may be as large as the request
+# (ARCHIVE_MAX_UPLOAD_SIZE); its image members are read one at a time, each at most
+# ARCHIVE_MAX_MEMBER_SIZE uncompressed, and at most ARCHIVE_MAX_TOTAL_SIZE in total.
+ARCHIVE_MAX_UPLOAD_SIZE = _env_int("ACE_ARCHIVE_MAX_UPLOAD_SIZE", 200 * 1024 * 1024)
+ARCHIVE_MAX_MEMBERS = _env_int("ACE_ARCHIVE_MAX_MEMBERS", 10000)
+ARCHIVE_MAX_MEMBER_SIZE = _env_int("ACE_ARCHIVE_MAX_MEMBER_SIZE", UPLOAD_MAX_FILE_SIZE)
+ARCHIVE_MAX_TOTAL_SIZE = _env_int("ACE_ARCHIVE_MAX_TOTAL_SIZE", 1024 * 1024 * 1024)
+
+# OCR scheduling (see scheduler.py): fair share of the OCR slots per client ('client': the
+# client address, or the X-Client-Id header with SCHEDULER_TRUST_CLIENT_ID, for deployments
+# behind a proxy that sets it) or per request ('request'). Weights per client id,
+# e.g. "tenant-a=4,tenant-b=0.5" (default 1). Requests with at most SCHEDULER_INTERACTIVE_FILES
+# images (pages of multi-page images included) use the priority lane; SCHEDULER_PRIORITY_BURST
+# priority calls in a row let one batch call through.
+SCHEDULER_FAIRNESS = os.getenv("ACE_SCHEDULER_FAIRNESS", "client")
+SCHEDULER_TRUST_CLIENT_ID = _env_bool("ACE_SCHEDULER_TRUST_CLIENT_ID", False)
+SCHEDULER_WEIGHTS = os.getenv("ACE_SCHEDULER_WEIGHTS", "")
+SCHEDULER_INTERACTIVE_FILES = _env_int("ACE_SCHEDULER_INTERACTIVE_FILES", 3)
+SCHEDULER_PRIORITY_BURST = _env_int("ACE_SCHEDULER_PRIORITY_BURST", 4)
+
+# /process-dataset result cache (see result_cache.py): outputs keyed by upload content and
+# options, least recently used evicted beyond DATASET_CACHE_MAX_SIZE bytes. Shared by workers.
+DATASET_CACHE = _env_bool("ACE_DATASET_CACHE", True)
+DATASET_CACHE_DIR = os.getenv("ACE_DATASET_CACHE_DIR", os.path.join(tempfile.gettempdir(), "ace_dataset_cache"))
+DATASET_CACHE_MAX_SIZE = _env_int("ACE_DATASET_CACHE_MAX_SIZE", 512 * 1024 * 1024)
+# /process-dataset reads CSV and .xlsx uploads in chunks of this many rows (see spreadsheets.py)
+DATASET_CHUNK_ROWS = _env_int("ACE_DATASET_CHUNK_ROWS", 50000)
+
+# Admin profiling endpoints (see profiling.py), disabled unless a token is set; callers send it as
+# the X-Admin-Token header. Windows are capped at PROFILE_MAX_SECONDS; tracemalloc keeps
+# PROFILE_TRACEMALLOC_FRAMES frames per allocation.
+ADMIN_TOKEN = os.getenv("ACE_ADMIN_TOKEN", "")
+PROFILE_MAX_SECONDS = _env_float("ACE_PROFILE_MAX_SECONDS", 60.0)
+PROFILE_TRACEMALLOC_FRAMES = _env_int("ACE_PROFILE_TRACEMALLOC_FRAMES", 25)
@@ -0,0 +1,57 @@
+import time
+
+# Time limits for /extract's strategy loop.
+#
+# A request has a Deadline; each file gets a FileBudget capped by it. Before each OCR pass the
+# budget predicts the pass's duration from the passes already done for this file and only
+# allows it if it fits, so a pass that cannot finish in time is never started.
+# The first pass only needs time left (there is nothing to predict from yet).
+
+# Relative cost of one OCR pass per strategy ('resized' has 4x the pixels, a thumbnail of a
+# phone screenshot roughly a quarter)
+STRATEGY_COST = {'resized': 4.0, 'thumbnail': 0.25}
+
+def client_limit(requested, configured):
+    """
+    Limit for a request: the client's value, but never above the server's (0 or None = no limit).
+    """
+    if not configured:
+        return requested
+    return min(requested, configured) if requested else configured
+
+class Deadline:
+    def __init__(self, seconds=None, clock=time.monotonic):
+        self.clock = clock
+        # None or 0 = no limit
+        self.expires_at = clock() + seconds if seconds else None
+
+    def remaining(self):
+        if self.expires_at is None:
+            return float('inf')
+        return self.expires_at - self.clock()
+
+    def expired(self):
+        return self.remaining() <= 0
+
+class FileBudget:
+    def __init__(self, seconds, request_deadline, clock=time.monotonic):
+        self.deadline = Deadline(seconds, clock)
+        self.request_deadline = request_deadline
+        self.spent_seconds = 0.0
+        self.spent_cost = 0.0
+
+    def remaining(self):
+        return min(self.deadline.remaining(), self.request_deadline.remaining())
+
+    def record(self, strategy, seconds):
+        self.spent_seconds += seconds
+        self.spent_cost += STRATEGY_COST.get(strategy, 1.0)
+
+    def estimate(self, strategy):
+        if not self.spent_cost:
+            return 0.0
+        return self.spent_seconds / self.spent_cost * STRATEGY_COST.get(strategy, 1.0)
+
+    def allows(self, strategy):
+        remaining = self.remaining()
+        return remaining > 0 and self.estimate(strategy) <= remaining
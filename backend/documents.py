@@ -0,0 +1,254 @@
+import os
+import re
+import quopri
+from html.parser import HTMLParser
+from urllib.parse import unquote
+
+try:
+    import pypdf
+except ImportError: # Optional: PDF uploads are rejected without it
+    pypdf = None
+
+from uploads import BufferFile
+from archives import IMAGE_EXTENSIONS
+
+# Text-bearing uploads for /extract: vCard exports, plain text, saved HTML pages and PDFs with a
+# text layer. Their text is read directly and laid out as OCR-style boxes (bbox, text, prob=1.0),
+# so ContactExtractor.extract_contacts (and its layout grouping, see layout.py) handles them like
+# a screenshot, without rasterizing or running OCR.
+#
+# Layout: each line of text is a row of boxes on a character grid. Its cells (runs of text two or
+# more spaces apart, HTML table cells) are placed CELL_GAP characters apart whatever their distance
+# in the source, so a name at the start of a line stays closer to a number at its end than the
+# line above is (see layout.nearest_before). Within a cell, runs of words and runs containing
+# digits become separate boxes, so the name left of a number is its own box, as in OCR output.
+#   - text: lines as they are
+#   - HTML: block elements end a line; table cells are cells
+#   - vCard: one line per number, "Full Name | number"
+#   - PDF: pypdf's layout mode renders each page's text layer as text. Each page is a page of
+#     the upload (like multi-page images).
+
+CHAR_WIDTH = 10
+BOX_HEIGHT = 16
+# One box height between lines
+LINE_HEIGHT = 32
+# Characters between cells: wider than layout.JOIN_GAP, so numbers don't run across cells
+CELL_GAP = 4
+
+TEXT_EXTENSIONS = {'.txt', '.text'}
+VCARD_EXTENSIONS = {'.vcf', '.vcard'}
+HTML_EXTENSIONS = {'.html', '.htm'}
+
+class DocumentError(ValueError):
+    pass
+
+def document_kind(filename, data):
+    """
+    'vcard', 'html', 'pdf' or 'text' for text-bearing uploads (by extension or leading bytes),
+    None for images and anything else.
+    """
+    extension = os.path.splitext(filename.lower())[1]
+    if extension in IMAGE_EXTENSIONS:
+        return None
+    head = bytes(data[:512])
+    if extension == '.pdf' or head.startswith(b'%PDF-'):
+        return 'pdf'
+    sniff = head.lstrip(b'\xef\xbb\xbf \t\r\n').lower()
+    if extension in VCARD_EXTENSIONS or sniff.startswith(b'begin:vcard'):
+        return 'vcard'
+    if extension in HTML_EXTENSIONS or sniff.startswith((b'<!doctype html', b'<html')):
+        return 'html'
+    if extension in TEXT_EXTENSIONS:
+        return 'text'
+    return None
+
+def document_pages(data, kind):
+    """
+    Text of each page: every page of a PDF (parsed once), the whole decoded text for the other
+    formats. Nothing refers to `data` afterwards, so a memory-mapped upload can be closed.
+    Raises DocumentError for unreadable documents.
+    """
+    if kind != 'pdf':
+        return [decode_text(data)]
+    if pypdf is None:
+        raise DocumentError("PDF uploads need the pypdf package")
+    try:
+        with BufferFile(data) as fp:
+            reader = pypdf.PdfReader(fp)
+            return [page.extract_text(extraction_mode="layout") for page in reader.pages]
+    except Exception as e:
+        raise DocumentError(f"Unreadable PDF: {e}")
+
+def document_boxes(text, kind):
+    """
+    OCR-style results (bbox, text, 1.0) for one page of text from document_pages.
+    Raises DocumentError for PDF pages without a text layer.
+    """
+    if kind == 'vcard':
+        return grid_boxes(vcard_lines(text))
+    if kind == 'html':
+        return grid_boxes(html_lines(text))
+    if kind == 'pdf' and not text.strip():
+        raise DocumentError("No text layer (scanned PDF?): upload the pages as images")
+    return grid_boxes(text_lines(text))
+
+def decode_text(data):
+    raw = bytes(data)
+    if raw.startswith((b'\xff\xfe', b'\xfe\xff')):
+        return raw.decode('utf-16')
+    try:
+        return raw.decode('utf-8-sig')
+    except UnicodeDecodeError:
+        return raw.decode('cp1252', errors='replace')
+
+# Lines are lists of cell texts
+
+def text_lines(text):
+    """
+    Plain text: cells are runs of text separated by two or more spaces (or tabs).
+    """
+    return [re.findall(r'\S+(?: \S+)*', line.expandtabs(8)) for line in text.splitlines()]
+
+def _segments(column, text):
+    # Runs of words without digits and runs of tokens with digits, as (column, text)
+    segments = []
+    for token in re.finditer(r'\S+', text):
+        numeric = any(c.isdigit() for c in token.group(0))
+        if segments and segments[-1][2] == numeric:
+            start = segments[-1][0]
+            segments[-1] = (start, text[start:token.end()], numeric)
+        else:
+            segments.append((token.start(), token.group(0), numeric))
+    return [(column + start, segment) for start, segment, _ in segments]
+
+def grid_boxes(lines):
+    boxes = []
+    for row, cells in enumerate(lines):
+        y0 = row * LINE_HEIGHT
+        y1 = y0 + BOX_HEIGHT
+        column = 0
+        for cell in cells:
+            segments = _segments(column, cell)
+            column += len(cell) + CELL_GAP
+            for start, text in segments:
+                x0 = start * CHAR_WIDTH
+                x1 = (start + len(text)) * CHAR_WIDTH
+                boxes.append(([[x0, y0], [x1, y0], [x1, y1], [x0, y1]], text, 1.0))
+    return boxes
+
+def _unfold(text):
+    # RFC 6350 line folding (continuation lines start with a space or tab), and vCard 2.1
+    # quoted-printable soft line breaks ("=" at the end of the line)
+    lines = []
+    for line in text.splitlines():
+        if lines and line[:1] in (' ', '\t'):
+            lines[-1] += line[1:]
+        elif lines and lines[-1].endswith('=') and 'QUOTED-PRINTABLE' in lines[-1].split(':', 1)[0].upper():
+            lines[-1] = lines[-1][:-1] + line
+        else:
+            lines.append(line)
+    return lines
+
+def _vcard_value(params, value):
+    params = params.upper()
+    if 'QUOTED-PRINTABLE' in params:
+        charset = re.search(r'CHARSET=([\w-]+)', params)
+        value = quopri.decodestring(value.encode('latin-1', errors='replace')).decode(
+            charset.group(1) if charset else 'utf-8', errors='replace')
+    if value.lower().startswith('tel:'):
+        value = value[4:]
+    return re.sub(r'\\([,;\\])', r'\1', value).replace('\\n', ' ').strip()
+
+def vcard_lines(text):
+    """
+    One row per number: [name, number], name from FN (or N) of its card.
+    """
+    rows = []
+    name, phones = "", []
+    for line in _unfold(text):
+        key, sep, value = line.partition(':')
+        if not sep:
+            continue
+        prop, _, params = key.partition(';')
+        # Grouped properties: "item1.TEL"
+        prop = prop.rsplit('.', 1)[-1].upper()
+        if prop == 'BEGIN':
+            name, phones = "", []
+        elif prop == 'FN':
+            name = _vcard_value(params, value)
+        elif prop == 'N' and not name:
+            # Family;Given;Additional;Prefix;Suffix
+            parts = _vcard_value(params, value.replace('\\;', '\0')).split(';')
+            name = " ".join(p.replace('\0', ';').strip() for p in (parts[1:2] + parts[:1]) if p.strip())
+        elif prop == 'TEL':
+            phones.append(_vcard_value(params, value))
+        elif prop == 'END':
+            rows.extend([name, phone] if name else [phone] for phone in phones if phone)
+            rows.append([])
+    return rows
+
+class _HTMLText(HTMLParser):
+    # Block elements end the current line; td/th start a new cell on it
+    BLOCKS = {'p', 'div', 'br', 'li', 'tr', 'table', 'ul', 'ol', 'dl', 'dt', 'dd', 'h1', 'h2', 'h3',
+              'h4', 'h5', 'h6', 'section', 'article', 'header', 'footer', 'address', 'hr', 'blockquote',
+              'pre', 'form', 'body', 'main', 'nav', 'aside', 'figure', 'figcaption'}
+    CELLS = {'td', 'th'}
+    SKIP = {'script', 'style', 'head', 'template', 'noscript'}
+
+    def __init__(self):
+        super().__init__()
+        self.rows = []
+        self.cells = []
+        self.skipping = 0
+        self.tel = None
+        self.anchor_text = ""
+
+    def _text(self, text):
+        if not self.cells:
+            self.cells.append("")
+        self.cells[-1] = f"{self.cells[-1]} {text}".strip()
+
+    def _end_line(self):
+        cells = [cell for cell in self.cells if cell]
+        if cells:
+            self.rows.append(cells)
+        self.cells = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIP:
+            self.skipping += 1
+        elif tag in self.BLOCKS:
+            self._end_line()
+        elif tag in self.CELLS:
+            self.cells.append("")
+        elif tag == 'a':
+            href = (dict(attrs).get('href') or "").strip()
+            self.tel = unquote(href[4:]) if href.lower().startswith('tel:') else None
+            self.anchor_text = ""
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIP:
+            self.skipping = max(0, self.skipping - 1)
+        elif tag in self.BLOCKS:
+            self._end_line()
+        elif tag == 'a' and self.tel is not None:
+            # "Call" links: the number is only in the href
+            anchor_text = self.anchor_text if any(c.isdigit() for c in self.anchor_text) else self.tel
+            self.tel = None
+            self._text(anchor_text)
+
+    def handle_data(self, data):
+        text = " ".join(data.split())
+        if not text or self.skipping:
+            return
+        if self.tel is not None:
+            self.anchor_text = f"{self.anchor_text} {text}".strip()
+        else:
+            self._text(text)
+
+def html_lines(text):
+    parser = _HTMLText()
+    parser.feed(text)
+    parser.close()
+    parser._end_line()
+    return parser.rows
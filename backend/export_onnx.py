@@ -0,0 +1,84 @@
+import os
+import argparse
+
+from ocr_backends import onnx_model_paths
+import config
+
+# Exports EasyOCR's detector (CRAFT) and recognizer to ONNX for the 'onnx' OCR backend,
+# optionally with int8 dynamic quantization of the weights.
+#
+#   python export_onnx.py --langs en --out onnx_models --int8
+#   ACE_OCR_BACKEND=onnx ACE_OCR_ONNX_INT8=1 python main.py
+
+def export_networks(detector, recognizer, out_dir, recog_name, int8=False, opset=17):
+    """
+    Exports torch detector/recognizer modules. Returns the list of written paths.
+    """
+    import torch
+
+    class RecognizerOnly(torch.nn.Module):
+        # EasyOCR's recognizer forward, minus the text input (unused by CTC models).
+        # AdaptiveAvgPool2d((None, 1)) cannot be exported with a dynamic width, so the
+        # equivalent mean over the height axis is used instead.
+        def __init__(self, model):
+            super().__init__()
+            self.model = model
+
+        def forward(self, image):
+            visual_feature = self.model.FeatureExtraction(image)
+            visual_feature = visual_feature.permute(0, 3, 1, 2).mean(dim=3)
+            contextual_feature = self.model.SequenceModeling(visual_feature)
+            return self.model.Prediction(contextual_feature.contiguous())
+
+    os.makedirs(out_dir, exist_ok=True)
+    detector_path, recognizer_path = onnx_model_paths(out_dir, recog_name)
+    detector.eval()
+    # eval() on the wrapper too: export restores the module's training flag recursively afterwards
+    recognizer_only = RecognizerOnly(recognizer).eval()
+
+    with torch.no_grad():
+        torch.onnx.export(
+            detector, torch.randn(1, 3, 640, 640), detector_path,
+            input_names=['image'], output_names=['y', 'feature'],
+            dynamic_axes={'image': {0: 'batch', 2: 'height', 3: 'width'},
+                          'y': {0: 'batch', 1: 'map_height', 2: 'map_width'},
+                          'feature': {0: 'batch', 2: 'map_height', 3: 'map_width'}},
+            opset_version=opset, dynamo=False,
+        )
+        torch.onnx.export(
+            recognizer_only, torch.randn(1, 1, 64, 256), recognizer_path,
+            input_names=['image'], output_names=['preds'],
+            dynamic_axes={'image': {0: 'batch', 3: 'width'}, 'preds': {0: 'batch', 1: 'length'}},
+            opset_version=opset, dynamo=False,
+        )
+    written = [detector_path, recognizer_path]
+
+    if int8:
+        from onnxruntime.quantization import quantize_dynamic, QuantType
+        int8_paths = onnx_model_paths(out_dir, recog_name, int8=True)
+        for src, dst in zip(written, int8_paths):
+            # Only MatMul/Gemm/LSTM weights: dynamically quantized convolutions (ConvInteger)
+            # are several times SLOWER than float convolutions on CPU in ONNX Runtime.
+            quantize_dynamic(src, dst, weight_type=QuantType.QInt8,
+                             op_types_to_quantize=['MatMul', 'Gemm', 'LSTM'])
+        written.extend(int8_paths)
+    return written
+
+def export_reader(languages, out_dir, int8=False):
+    import easyocr
+    # quantize=False: export the float weights; int8 quantization is done on the ONNX graph instead
+    reader = easyocr.Reader(languages, gpu=False, quantize=False)
+    return export_networks(reader.detector, reader.recognizer, out_dir, reader.model_lang, int8=int8)
+
+def main():
+    parser = argparse.ArgumentParser(description="Export EasyOCR models to ONNX for the 'onnx' OCR backend.")
+    parser.add_argument("--langs", nargs="+", default=["en"])
+    parser.add_argument("--out", default=config.OCR_ONNX_MODEL_DIR)
+    parser.add_argument("--int8", action="store_true", help="Also write int8-quantized models")
+    args = parser.parse_args()
+
+    for path in export_reader(args.langs, args.out, int8=args.int8):
+        print(f"Wrote {path} ({os.path.getsize(path) / (1024 * 1024):.1f}MB)")
+
+if __name__ == "__main__":
+    main()
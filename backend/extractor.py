@@ -1,5 +1,11 @@
 import re
-import phonenumbers
+from phone_normalizer import get_normalizer
+from layout import Layout
+from records import Contact
+
+# Label words next to a number that are not names
+FIELD_LABELS = frozenset(['phone', 'mobile', 'mob', 'cell', 'tel', 'telephone', 'fax', 'work', 'home',
+                          'office', 'contact', 'number', 'whatsapp'])
 
 class ContactExtractor:
     def __init__(self):
@@ -17,95 +23,73 @@ class ContactExtractor:
         # - Continuous: +919999988888
         self.simple_phone_pattern = re.compile(r'(?:\+?\d{1,3}[-.\s]?)?(?:\(?\d{3}\)?[-.\s]?\d{3}[-.\s]?\d{4}|\d{5}[-.\s]?\d{5})')
 
-    def normalize_phone(self, phone_str):
+    def normalize_phone(self, phone_str, region=None):
         """
-        Normalizes a phone number string to just digits using phonenumbers library.
-        Default region is US.
+        Normalizes a phone number string to just digits using phonenumbers library
+        ('international' policy, see phone_normalizer.py).
+        region is the default region for numbers without a country code (config.DEFAULT_REGION, US unless set).
         Example: 
         '+1 (123) 456-7890' -> '11234567890'
         '123-456-7890' -> '11234567890' (US default)
         '+44 7123 456 789' -> '447123456789'
         '001 123 456 7890' -> '11234567890' (Handle 00 as +)
         """
-        if not phone_str:
-            return ""
-            
-        # Ensure input is string
-        if not isinstance(phone_str, str):
-            phone_str = str(phone_str)
-
-        cleaned = phone_str.strip()
-        
-        # specific fix for '00' as '+' (common international prefix)
-        if cleaned.startswith('00'):
-            cleaned = '+' + cleaned[2:]
+        return get_normalizer(region).normalize(phone_str)
 
-        try:
-            # Parse with 'US' as default region
-            parsed_number = phonenumbers.parse(cleaned, "US")
-            
-            # Check validity to avoid coercing unrelated numbers (e.g. Aus 04...) into US +1 format
-            if phonenumbers.is_valid_number(parsed_number):
-                 formatted = phonenumbers.format_number(parsed_number, phonenumbers.PhoneNumberFormat.E164)
-                 if formatted.startswith('+'):
-                    return formatted[1:]
-                 return formatted
-            else:
-                 # If invalid for US (and no country code provided that made it valid otherwise),
-                 # return raw digits. Better to have "04..." than "+104..."
-                 return re.sub(r'\D', '', phone_str)
-            
-        except phonenumbers.NumberParseException:
-             # Fallback: simple digit extraction
-             return re.sub(r'\D', '', phone_str)
+    def looks_like_name(self, text):
+        """
+        Basic name validation:
+        - 1-4 words
+        - No digits
+        - Not a field label ("Mobile:", "Tel")
+        (Capitalization isn't required given OCR quality)
+        """
+        words = text.split()
+        if not (1 <= len(words) <= 4) or any(c.isdigit() for c in text):
+            return False
+        return text.strip(' :.-').casefold() not in FIELD_LABELS
 
-    def extract_contacts(self, ocr_results):
+    def extract_contacts(self, ocr_results, region=None):
         """
         ocr_results: List of (bbox, text, prob)
-        Returns: List of dicts {'name': str, 'phone': str, 'confidence': float}
+        region: default region for phone numbers without a country code
+        Returns: List of Contact records (name, phone, confidence, raw_phone, raw_text; see records.py)
         """
         candidates = []
-        
-        # Sort results by vertical position (top to bottom)
-        # bbox is [[x1,y1], [x2,y2], [x3,y3], [x4,y4]]
-        # We use y1 (top-left y) for sorting
-        # CRITICAL: This sorting ensures that when we iterate and filter duplicates later,
-        # we prioritize the occurence appearing first (top-most) in the document.
-        sorted_results = sorted(ocr_results, key=lambda x: x[0][0][1])
 
-        for i, (bbox, text, prob) in enumerate(sorted_results):
-            # Check for phone number
-            phone_match = self.simple_phone_pattern.search(text)
-            if phone_match:
+        # Group boxes into columns and lines (see layout.py).
+        # CRITICAL: Lines come in reading order (column by column, top to bottom), so when
+        # duplicates are filtered later, the occurrence read first is the one kept.
+        layout = Layout(ocr_results)
+        # Only name-like boxes are indexed as neighbours
+        layout.index(b for b in layout.boxes if self.looks_like_name(b.text.strip()))
+
+        for line in layout.lines:
+            # Every number on the line; a number split over neighbouring boxes is found too
+            for phone_match in self.simple_phone_pattern.finditer(line.text):
                 raw_phone = phone_match.group(0).strip()
-                phone = self.normalize_phone(raw_phone)
-                
-                # Heuristic: Name is likely in the line directly above
-                name = "Unknown"
-                if i > 0:
-                    prev_text = sorted_results[i-1][1].strip()
-                    # Basic name validation: 
-                    # - 2-4 words
-                    # - Mostly alphabetic
-                    # - Capitalized first letters (optional looking at OCR quality)
-                    words = prev_text.split()
-                    if 1 <= len(words) <= 4 and not any(c.isdigit() for c in prev_text):
-                        name = prev_text
-                
+                phone = self.normalize_phone(raw_phone, region)
+                boxes = line.boxes_in(*phone_match.span())
+
+                # Name: the nearest name-like box before the number in reading order,
+                # to its left on the same line or above it in the same column
+                name_box = layout.nearest_before(boxes)
+                name = name_box.text.strip() if name_box else "Unknown"
+
                 # Construct result
-                candidates.append({
-                    "name": name,
-                    "phone": phone,
-                    "confidence": prob, # Using OCR confidence of the phone line for now
-                    "raw_phone": raw_phone,
-                    "raw_text": text
-                })
-        
+                candidates.append(Contact(
+                    name,
+                    phone,
+                    min(b.prob for b in boxes), # Using OCR confidence of the phone box(es) for now
+                    raw_phone,
+                    " ".join(b.text for b in boxes)
+                ))
+
         return candidates
 
     def is_valid_contact(self, contact):
         """
-        Validates a contact dictionary.
+        Validates a contact (Contact record or dict).
         Returns True if valid, False otherwise.
         """
         if not contact:
@@ -0,0 +1,204 @@
+import re
+from collections import defaultdict
+from functools import lru_cache
+
+import config
+
+# Fuzzy deduplication of contacts whose phone numbers differ by an OCR error.
+#
+# Exact dedup on the normalized phone lets through a misread digit, a letter O read for a 0
+# (dropped when normalizing) or a dropped leading digit. Comparing every pair is O(n^2), so
+# records are only compared within blocks that share a key:
+#   - phone deletion neighbourhood: the phone with digit k deleted, one position k at a time
+#     (so the index never holds more than one key per record). Two phones one substitution
+#     apart share the key at that position; a phone missing a digit equals another's key.
+#   - the name + first or last half of the phone: catches numbers two edits apart (both in
+#     the same half, e.g. two swapped digits) for the same name.
+# Blocks larger than max_block (very common keys) are skipped, which keeps the work near-linear.
+#
+# A candidate pair is merged only if the names agree too: two different people can easily
+# have numbers one digit apart. One phone edit needs the names to sound the same (Soundex per
+# word, so OCR-garbled names still match), two edits need the same name. Each merge is reported
+# with the reason. Without names, one-edit matches are only reported for review, not dropped.
+#
+# A record joins a group only if it is close enough to the group's kept (first) record, not to
+# any member: otherwise one-edit links chain through a block of sequential numbers (a DID range,
+# office extensions) and the whole block collapses into one record.
+
+_SOUNDEX_CODES = {c: d for d, letters in {'1': 'bfpv', '2': 'cgjkqsxz', '3': 'dt', '4': 'l',
+                                          '5': 'mn', '6': 'r'}.items() for c in letters}
+_WORD = re.compile(r'\w+')
+
+@lru_cache(maxsize=100000)
+def soundex(word):
+    """
+    American Soundex ('Robert' -> 'R163'). Words without Latin letters are returned casefolded.
+    """
+    letters = [c for c in word.lower() if 'a' <= c <= 'z']
+    if not letters:
+        return word.casefold()
+    code = letters[0].upper()
+    previous = _SOUNDEX_CODES.get(letters[0])
+    for c in letters[1:]:
+        digit = _SOUNDEX_CODES.get(c)
+        if digit and digit != previous:
+            code += digit
+            if len(code) == 4:
+                break
+        if c not in 'hw':
+            previous = digit
+    return code.ljust(4, '0')
+
+def name_key(name):
+    """
+    Phonetic key of a name (word order ignored), or None for a missing / placeholder name.
+    """
+    if not name or name in ("Unknown", "No contact found"):
+        return None
+    words = _WORD.findall(str(name))
+    if not words:
+        return None
+    return " ".join(sorted(soundex(w) for w in words))
+
+def phone_difference(a, b):
+    """
+    Describes how phone b differs from a by one edit, or returns None if they are further apart.
+    """
+    if a == b:
+        return "same number"
+    if len(a) == len(b):
+        diffs = [i for i in range(len(a)) if a[i] != b[i]]
+        if len(diffs) == 1:
+            i = diffs[0]
+            return f"digit {i + 1} read as {b[i]} instead of {a[i]}"
+        if len(diffs) == 2 and diffs[1] == diffs[0] + 1 and a[diffs[0]] == b[diffs[1]] and a[diffs[1]] == b[diffs[0]]:
+            return f"digits {diffs[0] + 1}-{diffs[1] + 1} swapped"
+        return None
+    if abs(len(a) - len(b)) != 1:
+        return None
+    longer, shorter = (a, b) if len(a) > len(b) else (b, a)
+    for i in range(len(longer)):
+        if longer[:i] + longer[i + 1:] == shorter:
+            if longer is a:
+                return f"digit {i + 1} ({a[i]}) missing"
+            return f"extra digit {b[i]} at position {i + 1}"
+    return None
+
+def edit_distance(a, b, limit):
+    """
+    Optimal string alignment distance (substitutions, insertions/deletions, adjacent swaps),
+    or limit + 1 if it exceeds limit. Only the diagonal band |i - j| <= limit is computed.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    if len(a) == len(b):
+        mismatches = sum(x != y for x, y in zip(a, b))
+        # Cheap exit; 2+ mismatches may still be one adjacent swap, so those go through the band
+        if mismatches <= 1:
+            return min(mismatches, limit + 1)
+    too_far = limit + 1
+    previous2 = None
+    previous = [j if j <= limit else too_far for j in range(len(b) + 1)]
+    for i in range(1, len(a) + 1):
+        current = [too_far] * (len(b) + 1)
+        if i <= limit:
+            current[0] = i
+        for j in range(max(1, i - limit), min(len(b), i + limit) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if previous2 is not None and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                value = min(value, previous2[j - 2] + 1)
+            current[j] = value
+        if min(current) > limit:
+            return too_far
+        previous2, previous = previous, current
+    return min(previous[-1], too_far)
+
+def fuzzy_duplicates(phones, names=None, max_block=None, require_name=True):
+    """
+    phones: normalized phone strings (all distinct, i.e. after exact dedup); names: parallel list or None.
+    Returns (keep, merges): keep is a list of booleans, merges a list of
+    {"kept": index, "merged": index, "reason": str, "dropped": bool} in the order they were found.
+    Without names, one-edit phone matches are reported with dropped=False and kept;
+    require_name=False merges them on the phone alone.
+    """
+    max_block = max_block or config.FUZZY_DEDUP_MAX_BLOCK
+    count = len(phones)
+    name_keys = [name_key(n) for n in names] if names is not None else [None] * count
+    exact_names = [" ".join(_WORD.findall(str(n).casefold())) if k else None
+                   for n, k in zip(names, name_keys)] if names is not None else None
+    drop = names is not None or not require_name
+    # Each record's group is the earlier record it was matched to (keep='first', like the exact dedup)
+    kept_by = list(range(count))
+    has_members = [False] * count
+    merges = []
+
+    def consider(i, j, reason_for):
+        if i > j:
+            i, j = j, i
+        # Compare with the kept record of i's group; j must not be grouped yet nor hold a group
+        i = kept_by[i]
+        if kept_by[j] != j or has_members[j]:
+            return
+        reason = reason_for(i, j)
+        if reason:
+            kept_by[j] = i
+            has_members[i] = True
+            merges.append({"kept": i, "merged": j, "reason": reason, "dropped": drop})
+
+    def by_phone(i, j):
+        difference = phone_difference(phones[i], phones[j])
+        if difference is None:
+            return None
+        if name_keys[i] is not None and name_keys[i] == name_keys[j]:
+            return f"phone {difference}, same name sound"
+        if names is None or not require_name:
+            return f"phone {difference}"
+        return None
+
+    def by_name(i, j):
+        if edit_distance(phones[i], phones[j], 2) <= 2:
+            return "same name, phone within 2 digit edits"
+        return None
+
+    def compare_block(members, reason_for):
+        if 1 < len(members) <= max_block:
+            for a in range(len(members)):
+                for b in range(a + 1, len(members)):
+                    consider(members[a], members[b], reason_for)
+
+    # Block 1: one-digit deletion neighbourhood of the phone, one position at a time
+    by_number = defaultdict(list)
+    for i, phone in enumerate(phones):
+        if phone:
+            by_number[phone].append(i)
+    for k in range(max((len(p) for p in phones if p), default=0)):
+        blocks = defaultdict(list)
+        for i, phone in enumerate(phones):
+            if len(phone) > k:
+                blocks[phone[:k] + phone[k + 1:]].append(i)
+        for key, members in blocks.items():
+            # Same deletion at the same position: one substitution apart
+            compare_block(members, by_phone)
+            # The deletion is itself a phone: that one is missing a digit
+            shorter = by_number.get(key)
+            if shorter and len(members) + len(shorter) <= max_block:
+                for i in members:
+                    for j in shorter:
+                        consider(i, j, by_phone)
+        del blocks
+
+    # Block 2: same name and an intact half of the phone (the tail is taken from the end,
+    # so a digit dropped from the head doesn't shift it)
+    if names is not None:
+        blocks = defaultdict(list)
+        for i, phone in enumerate(phones):
+            if phone and exact_names[i]:
+                half = len(phone) // 2
+                blocks[(exact_names[i], 'head', phone[:half])].append(i)
+                blocks[(exact_names[i], 'tail', phone[-half:])].append(i)
+        for members in blocks.values():
+            compare_block(members, by_name)
+
+    keep = [not drop or kept_by[i] == i for i in range(count)]
+    return keep, merges
@@ -0,0 +1,39 @@
+import gc
+import os
+
+# Multi-worker serving with one shared copy of the OCR model.
+#
+#   gunicorn -c gunicorn.conf.py main:app
+#
+# preload_app imports main.py (and so creates the EasyOCR reader) once in the master process.
+# Workers are then forked and share the model weights copy-on-write instead of each loading
+# their own copy. Weights are never written after loading, so those pages stay shared;
+# what each worker adds is its Python heap plus inference activations (see bench_workers.py
+# to measure per-worker memory on your hardware).
+#
+# Fork safety: PyTorch's OpenMP thread pool does not survive fork(). A child of a process that
+# has run a parallel op hangs in its own first one. The master therefore never runs one: it
+# loads the model on a single intra-op thread and runs no inference (see OCREngine.__init__,
+# test_ocr_backends.py). Each worker's pool starts with its first request, after post_fork.
+
+bind = f"0.0.0.0:{os.getenv('PORT', '7860')}"
+workers = int(os.getenv("ACE_WORKERS", "1"))
+worker_class = "uvicorn_worker.UvicornWorker"
+preload_app = True
+# OCR requests can legitimately take a while on CPU
+timeout = int(os.getenv("ACE_WORKER_TIMEOUT", "300"))
+graceful_timeout = 30
+
+def when_ready(server):
+    # Move everything allocated so far (model, modules) out of the GC's tracked generations.
+    # Otherwise the first collection in each worker touches every object header and
+    # un-shares those pages.
+    gc.freeze()
+
+def post_fork(server, worker):
+    # Split cores between workers and their concurrent OCR calls; by default every worker's
+    # PyTorch would use all of them (see concurrency.py, ACE_OCR_THREADS overrides).
+    from concurrency import intra_op_threads, set_intra_op_threads
+    threads = intra_op_threads(workers)
+    set_intra_op_threads(threads)
+    server.log.info(f"Worker {worker.pid}: {threads} OCR thread(s) per call")
@@ -0,0 +1,137 @@
+import threading
+from collections import OrderedDict
+import numpy as np
+from PIL import Image
+
+import config
+from uploads import BufferFile
+
+# Near-duplicate detection for uploaded screenshots.
+#
+# Two stages:
+# 1. dHash (one bit per horizontal neighbour comparison on a 33x32 grayscale grid) is used
+#    only to find candidates. Screenshots of different contacts from the same app share a
+#    layout, so their dHashes are close too - a hash match alone is NOT proof of a duplicate.
+# 2. Candidates are confirmed on a 192x384 grayscale thumbnail: we count pixels that changed
+#    strongly. Recompression only produces small changes everywhere, while a different digit
+#    in a phone number produces a few strong changes. Rescaled or re-photographed copies are
+#    usually not matched; that is the safe direction (OCR simply runs again).
+#
+# The top of the image (status bar: clock, battery, notifications) is ignored in both stages.
+
+HASH_SIZE = 32
+THUMB_SIZE = (192, 384)
+# Per-pixel difference (0-255) that counts as a real change rather than compression noise
+PIXEL_DELTA = 64
+# The 1024-bit hash is bucketed in 16 bands; hashes within 15 bits always share a band.
+NUM_BANDS = 16
+
+class Fingerprint:
+    __slots__ = ('hash', 'thumb')
+
+    def __init__(self, hash, thumb):
+        self.hash = hash
+        self.thumb = thumb
+
+def fingerprint(image_bytes: bytes, frame=0):
+    """
+    Returns the Fingerprint of an image (bytes or memory map), or None if it cannot be decoded.
+    frame: page of a multi-frame image.
+    """
+    try:
+        with BufferFile(image_bytes) as fp:
+            image = Image.open(fp)
+            if frame:
+                image.seek(frame)
+            # draft() lets JPEG decode at a reduced scale, we only need thumbnails
+            image.draft('L', (THUMB_SIZE[0] * 2, THUMB_SIZE[1] * 2))
+            image = image.convert('L')
+        width, height = image.size
+        top = int(height * config.IMAGE_DEDUP_IGNORE_TOP)
+        image = image.crop((0, top, width, height))
+        thumb = image.resize(THUMB_SIZE, Image.Resampling.BOX)
+        grid = thumb.resize((HASH_SIZE + 1, HASH_SIZE), Image.Resampling.BOX)
+    except Exception:
+        return None
+
+    pixels = np.asarray(grid, dtype=np.int16)
+    bits = (pixels[:, :-1] > pixels[:, 1:]).flatten()
+    value = int.from_bytes(np.packbits(bits).tobytes(), 'big')
+    return Fingerprint(value, np.asarray(thumb, dtype=np.uint8))
+
+def changed_pixels(a: Fingerprint, b: Fingerprint) -> int:
+    diff = np.abs(a.thumb.astype(np.int16) - b.thumb.astype(np.int16))
+    return int(np.count_nonzero(diff > PIXEL_DELTA))
+
+def _bands(h):
+    band_bits = HASH_SIZE * HASH_SIZE // NUM_BANDS
+    mask = (1 << band_bits) - 1
+    return [(h >> (i * band_bits)) & mask for i in range(NUM_BANDS)]
+
+class ImageHashIndex:
+    """
+    Bounded (LRU) index of image fingerprints -> payload (e.g. extracted contacts).
+    Thread-safe so a process-wide instance can be shared between requests.
+    """
+    def __init__(self, threshold=None, max_size=None):
+        # Maximum number of strongly changed thumbnail pixels to still count as the same image
+        self.threshold = config.IMAGE_DEDUP_THRESHOLD if threshold is None else threshold
+        self.max_size = max_size
+        self._entries = OrderedDict()  # id -> (Fingerprint, payload)
+        self._buckets = [dict() for _ in range(NUM_BANDS)]  # band value -> set of ids
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def find(self, fp):
+        """
+        Returns (payload, changed_pixels) of the closest stored image within threshold, or None.
+        """
+        if fp is None:
+            return None
+        with self._lock:
+            candidates = set()
+            for i, band in enumerate(_bands(fp.hash)):
+                candidates.update(self._buckets[i].get(band, ()))
+
+            best = None
+            for entry_id in candidates:
+                distance = changed_pixels(fp, self._entries[entry_id][0])
+                if distance <= self.threshold and (best is None or distance < best[1]):
+                    best = (entry_id, distance)
+            if best is None:
+                return None
+            self._entries.move_to_end(best[0])
+            return self._entries[best[0]][1], best[1]
+
+    def add(self, fp, payload):
+        if fp is None:
+            return
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = (fp, payload)
+            for i, band in enumerate(_bands(fp.hash)):
+                self._buckets[i].setdefault(band, set()).add(entry_id)
+            if self.max_size and len(self._entries) > self.max_size:
+                self._evict(next(iter(self._entries)))
+
+    def _evict(self, entry_id):
+        fp, _ = self._entries.pop(entry_id)
+        for i, band in enumerate(_bands(fp.hash)):
+            bucket = self._buckets[i].get(band)
+            if bucket is not None:
+                bucket.discard(entry_id)
+                if not bucket:
+                    del self._buckets[i][band]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            for bucket in self._buckets:
+                bucket.clear()
+
+# Process-wide index, only consulted when IMAGE_DEDUP_CROSS_REQUEST is enabled
+shared_image_index = ImageHashIndex(max_size=config.IMAGE_DEDUP_CACHE_SIZE)
@@ -0,0 +1,197 @@
+import bisect
+from collections import defaultdict
+from statistics import median
+
+# Page geometry of OCR results: boxes grouped into columns and lines, in reading order, plus a
+# grid index for neighbour queries.
+#
+# Screenshots can carry thousands of boxes, so nothing here compares all pairs:
+#   - columns: the boxes' x-intervals are sorted and merged where they overlap or are less than
+#     COLUMN_GAP line heights apart. Boxes wider than half the page (headers, banners) take no
+#     part, so they can't glue two columns together.
+#   - lines: within a column, boxes sorted by vertical centre join the current line while their
+#     centre is within half a line height of it.
+#   - neighbours: boxes are bucketed in a grid of cells two (median) line heights wide, so a
+#     query only visits the few cells around it.
+# Sorting dominates: O(n log n).
+#
+# Reading order is column by column (left to right), top to bottom, then left to right.
+
+COLUMN_GAP = 2.0
+# Boxes on a line closer than this (in line heights) are read as one text, so a number split
+# by OCR ("+91 99999" "88888") is still found; further apart they are kept separate
+JOIN_GAP = 1.0
+# How far a name may be from its number, in the number's line heights
+LEFT_REACH = 20.0
+ABOVE_REACH = 3.0
+
+class Box:
+    __slots__ = ('index', 'text', 'prob', 'x0', 'y0', 'x1', 'y1', 'column', 'order')
+
+    def __init__(self, index, bbox, text, prob):
+        # bbox is [[x1,y1], [x2,y2], [x3,y3], [x4,y4]] (possibly rotated): keep its bounding rectangle
+        xs = [p[0] for p in bbox]
+        ys = [p[1] for p in bbox]
+        self.index = index
+        self.text = text
+        self.prob = prob
+        self.x0, self.x1 = min(xs), max(xs)
+        self.y0, self.y1 = min(ys), max(ys)
+        self.column = 0
+        self.order = index
+
+    @property
+    def height(self):
+        return max(self.y1 - self.y0, 1)
+
+    @property
+    def cx(self):
+        return (self.x0 + self.x1) / 2
+
+    @property
+    def cy(self):
+        return (self.y0 + self.y1) / 2
+
+class Line:
+    __slots__ = ('column', 'boxes', 'text', 'spans')
+
+    def __init__(self, column, boxes):
+        self.column = column
+        self.boxes = sorted(boxes, key=lambda b: b.x0)
+        height = max(b.height for b in self.boxes)
+        # Line text with each box's character span; distant boxes are separated by '|',
+        # which phone patterns don't cross
+        parts = []
+        self.spans = []
+        offset = 0
+        for i, box in enumerate(self.boxes):
+            if i:
+                separator = " " if box.x0 - self.boxes[i - 1].x1 <= JOIN_GAP * height else " | "
+                parts.append(separator)
+                offset += len(separator)
+            parts.append(box.text)
+            self.spans.append((offset, offset + len(box.text), box))
+            offset += len(box.text)
+        self.text = "".join(parts)
+
+    def boxes_in(self, start, end):
+        """
+        Boxes whose text overlaps the character range [start, end) of the line text.
+        """
+        return [box for s, e, box in self.spans if s < end and e > start]
+
+class Layout:
+    def __init__(self, ocr_results):
+        """
+        ocr_results: List of (bbox, text, prob)
+        """
+        self.boxes = [Box(i, bbox, text, prob) for i, (bbox, text, prob) in enumerate(ocr_results)]
+        self.line_height = median(b.height for b in self.boxes) if self.boxes else 1
+        self.columns = self._find_columns()
+        self.lines = self._find_lines()
+        for order, box in enumerate(b for line in self.lines for b in line.boxes):
+            box.order = order
+        self._cell = 2 * self.line_height
+        self._grid = defaultdict(list)
+
+    def _find_columns(self):
+        if not self.boxes:
+            return []
+        left = min(b.x0 for b in self.boxes)
+        page_width = max(b.x1 for b in self.boxes) - left
+        intervals = sorted((b.x0, b.x1) for b in self.boxes if b.x1 - b.x0 <= page_width / 2)
+        columns = []
+        for x0, x1 in intervals:
+            if columns and x0 <= columns[-1][1] + COLUMN_GAP * self.line_height:
+                columns[-1][1] = max(columns[-1][1], x1)
+            else:
+                columns.append([x0, x1])
+        if not columns:
+            return [(left, left + page_width)]
+
+        starts = [c[0] for c in columns]
+        for box in self.boxes:
+            i = max(bisect.bisect_right(starts, box.cx) - 1, 0)
+            # Centre in the gap after column i (or a wide box): take the closer column
+            if i + 1 < len(columns) and box.cx - columns[i][1] > columns[i + 1][0] - box.cx:
+                i += 1
+            box.column = i
+        return [tuple(c) for c in columns]
+
+    def _find_lines(self):
+        by_column = defaultdict(list)
+        for box in self.boxes:
+            by_column[box.column].append(box)
+        lines = []
+        for column in sorted(by_column):
+            current = []
+            centre = height = 0
+            for box in sorted(by_column[column], key=lambda b: b.cy):
+                if current and box.cy - centre <= max(height, box.height) / 2:
+                    current.append(box)
+                    centre += (box.cy - centre) / len(current)
+                    height = max(height, box.height)
+                else:
+                    if current:
+                        lines.append(Line(column, current))
+                    current = [box]
+                    centre, height = box.cy, box.height
+            if current:
+                lines.append(Line(column, current))
+        return lines
+
+    def _cells(self, x0, y0, x1, y1):
+        cell = self._cell
+        for gx in range(int(x0 // cell), int(x1 // cell) + 1):
+            for gy in range(int(y0 // cell), int(y1 // cell) + 1):
+                yield gx, gy
+
+    def index(self, boxes):
+        """
+        Adds boxes to the neighbour index (only indexed boxes are returned by nearest_before).
+        """
+        for box in boxes:
+            for key in self._cells(box.x0, box.y0, box.x1, box.y1):
+                self._grid[key].append(box)
+
+    def nearest_before(self, boxes):
+        """
+        The indexed box closest to `boxes` (e.g. the parts of a phone number) that comes before
+        them in reading order: to the left on the same line, or above in the same column or
+        overlapping horizontally. Horizontal gaps count a quarter as much as vertical ones
+        (fields on one line sit further apart than lines do). None if nothing is within reach.
+        """
+        x0 = min(b.x0 for b in boxes)
+        x1 = max(b.x1 for b in boxes)
+        y0 = min(b.y0 for b in boxes)
+        y1 = max(b.y1 for b in boxes)
+        height = max(y1 - y0, 1)
+        column = boxes[0].column
+        first = min(b.order for b in boxes)
+
+        best, best_rank = None, None
+        seen = set()
+        for key in self._cells(x0 - LEFT_REACH * height, y0 - ABOVE_REACH * height, x1, y1):
+            for box in self._grid.get(key, ()):
+                if box.index in seen:
+                    continue
+                seen.add(box.index)
+                if box.order > first:
+                    continue
+                overlap = min(y1, box.y1) - max(y0, box.y0)
+                if overlap >= min(height, box.height) / 2 and box.x1 <= x0 + height / 2:
+                    gap = max(x0 - box.x1, 0) / height
+                    if gap > LEFT_REACH:
+                        continue
+                    cost = gap / 4
+                elif box.y1 <= y0 + height / 2 and (box.column == column or (box.x0 < x1 and box.x1 > x0)):
+                    cost = max(y0 - box.y1, 0) / height
+                    if cost > ABOVE_REACH:
+                        continue
+                else:
+                    continue
+                # Ties go to the box closest in reading order
+                rank = (cost, -box.order)
+                if best_rank is None or rank < best_rank:
+                    best, best_rank = box, rank
+        return best
@@ -0,0 +1,329 @@
+import io
+import os
+import sys
+import json
+import time
+import random
+import signal
+import argparse
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from PIL import Image, ImageDraw, ImageFont
+
+from bench_workers import BACKEND_DIR, read_memory, child_pids, wait_for_health, percentile
+
+# Load test: how the server behaves under concurrent traffic.
+#
+#   python load_test.py --workers 2 --concurrency 8 --duration 60
+#   python load_test.py --workers 2 --rate 5 --mix extract=0.9,dataset=0.1 --json load.json
+#   python load_test.py --url http://127.0.0.1:8000 --rate 2        # an already running server
+#
+# It starts the app with gunicorn (gunicorn.conf.py), then replays a mix of /extract and
+# /process-dataset requests built from a generated corpus (contact screenshots and CSV files of
+# different sizes), either
+#   - closed loop (--concurrency N): N clients, each sending its next request when the last
+#     one completes, or
+#   - open loop (--rate R): requests arrive at R per second (Poisson), whether or not earlier
+#     ones have completed. Latency counts from the scheduled arrival, so a server that falls
+#     behind shows it (no coordinated omission).
+# Reports throughput, p50/p95/p99 latency per endpoint, error and 429 rates, and the server's
+# RSS/PSS (master + workers, from /proc) over time. --max-p95 / --max-error-rate make it exit
+# non-zero, to catch scaling regressions in CI.
+
+FIRST_NAMES = ["James", "Mary", "Priya", "Wei", "Fatima", "Carlos", "Anna", "Kenji", "Olivia", "Omar"]
+LAST_NAMES = ["Smith", "Patel", "Chen", "Garcia", "Khan", "Nowak", "Okafor", "Sato", "Brown", "Silva"]
+
+def _font(size):
+    try:
+        return ImageFont.load_default(size=size)
+    except TypeError:
+        return ImageFont.load_default()
+
+def _phone(rng):
+    return f"+1 {rng.randint(201, 989)} {rng.randint(200, 999)} {rng.randint(0, 9999):04d}"
+
+def make_image(rng):
+    # A contact screenshot: 1-3 name/number pairs; some at phone-screenshot size
+    width, height = rng.choice([(600, 300), (720, 640), (1080, 2400)])
+    image = Image.new('RGB', (width, height), color='white')
+    d = ImageDraw.Draw(image)
+    scale = width / 600
+    name_font, phone_font = _font(int(32 * scale)), _font(int(28 * scale))
+    for row in range(rng.randint(1, 3)):
+        y = int((40 + row * 90) * scale)
+        d.text((int(30 * scale), y), f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}", fill='black', font=name_font)
+        d.text((int(30 * scale), y + int(40 * scale)), _phone(rng), fill=(60, 60, 60), font=phone_font)
+    buf = io.BytesIO()
+    image.save(buf, format='PNG')
+    return buf.getvalue()
+
+def make_dataset(rng, rows):
+    # CSV with ~20% duplicate numbers in other formats
+    phones = [_phone(rng) for _ in range(max(1, int(rows * 0.8)))]
+    lines = ["Name,Phone"]
+    for _ in range(rows):
+        phone = rng.choice(phones)
+        if rng.random() < 0.3:
+            phone = phone.replace("+1 ", "(", 1).replace(" ", ") ", 1)
+        lines.append(f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)},{phone}")
+    return ("\n".join(lines) + "\n").encode()
+
+def make_corpus(images, datasets, seed=0):
+    rng = random.Random(seed)
+    return {
+        "extract": [make_image(rng) for _ in range(images)],
+        "dataset": [make_dataset(rng, rng.choice([100, 1000, 10000])) for _ in range(datasets)],
+    }
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(','):
+        name, _, weight = part.partition('=')
+        if name not in ("extract", "dataset"):
+            raise argparse.ArgumentTypeError(f"Unknown endpoint '{name}' (use extract, dataset)")
+        mix[name] = float(weight or 1)
+    return mix
+
+class Stats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = {}
+        self.counts = {}
+
+    def record(self, endpoint, outcome, latency):
+        with self.lock:
+            counts = self.counts.setdefault(endpoint, {"ok": 0, "throttled": 0, "error": 0})
+            counts[outcome] += 1
+            if outcome == "ok":
+                self.latencies.setdefault(endpoint, []).append(latency)
+
+def send(session, base_url, endpoint, payload, timeout):
+    if endpoint == "extract":
+        resp = session.post(f"{base_url}/extract", files={"files": ("load.png", payload, "image/png")},
+                            timeout=timeout)
+    else:
+        resp = session.post(f"{base_url}/process-dataset", files={"file": ("load.csv", payload, "text/csv")},
+                            timeout=timeout)
+    if resp.status_code == 200:
+        return "ok"
+    return "throttled" if resp.status_code == 429 else "error"
+
+def run_load(base_url, corpus, mix, args, duration, stats):
+    endpoints = list(mix)
+    weights = [mix[e] for e in endpoints]
+    rng = random.Random(args.seed)
+    rng_lock = threading.Lock()
+    started = time.monotonic()
+    stop_at = started + duration
+    local = threading.local()
+
+    def pick():
+        with rng_lock:
+            endpoint = rng.choices(endpoints, weights)[0]
+            return endpoint, rng.choice(corpus[endpoint])
+
+    def one(endpoint, payload, scheduled):
+        session = getattr(local, 'session', None)
+        if session is None:
+            session = local.session = requests.Session()
+        try:
+            outcome = send(session, base_url, endpoint, payload, args.timeout)
+        except requests.exceptions.RequestException:
+            outcome = "error"
+        stats.record(endpoint, outcome, time.monotonic() - scheduled)
+
+    if args.rate:
+        # Open loop: arrivals on schedule; requests beyond --max-inflight wait client-side (and that wait counts)
+        with ThreadPoolExecutor(max_workers=args.max_inflight) as pool:
+            next_at = time.monotonic()
+            while next_at < stop_at:
+                delay = next_at - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                pool.submit(one, *pick(), next_at)
+                with rng_lock:
+                    next_at += rng.expovariate(args.rate)
+    else:
+        def client():
+            while time.monotonic() < stop_at:
+                one(*pick(), time.monotonic())
+        threads = [threading.Thread(target=client) for _ in range(args.concurrency)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    # Includes requests still in flight at the end
+    return time.monotonic() - started
+
+class MemorySampler(threading.Thread):
+    """
+    Samples the server's memory (master + workers) every `interval` seconds.
+    """
+    def __init__(self, pid, interval):
+        super().__init__(daemon=True)
+        self.pid = pid
+        self.interval = interval
+        self.samples = []
+        self.started = time.monotonic()
+        self._stopped = threading.Event()
+
+    def run(self):
+        while not self._stopped.is_set():
+            try:
+                processes = [read_memory(p) for p in [self.pid] + child_pids(self.pid)]
+                self.samples.append({
+                    "t": round(time.monotonic() - self.started, 1),
+                    "rss_mb": round(sum(p['rss'] for p in processes), 1),
+                    "pss_mb": round(sum(p['pss'] for p in processes), 1),
+                    "processes": len(processes),
+                })
+            except OSError:
+                pass # A worker exited (or restarted) between listing and reading
+            self._stopped.wait(self.interval)
+
+    def stop(self):
+        self._stopped.set()
+        self.join()
+
+def summarize(stats, duration):
+    report = {"duration": duration, "endpoints": {}}
+    total = {"ok": 0, "throttled": 0, "error": 0}
+    all_latencies = []
+    for endpoint, counts in stats.counts.items():
+        latencies = sorted(stats.latencies.get(endpoint, []))
+        all_latencies.extend(latencies)
+        requests_sent = sum(counts.values())
+        for key in total:
+            total[key] += counts[key]
+        report["endpoints"][endpoint] = {
+            "requests": requests_sent,
+            "throughput": counts["ok"] / duration,
+            "p50": percentile(latencies, 50),
+            "p95": percentile(latencies, 95),
+            "p99": percentile(latencies, 99),
+            "error_rate": counts["error"] / requests_sent,
+            "throttled_rate": counts["throttled"] / requests_sent,
+        }
+    all_latencies.sort()
+    requests_sent = sum(total.values())
+    report["total"] = {
+        "requests": requests_sent,
+        "throughput": total["ok"] / duration,
+        "p50": percentile(all_latencies, 50),
+        "p95": percentile(all_latencies, 95),
+        "p99": percentile(all_latencies, 99),
+        "error_rate": total["error"] / requests_sent if requests_sent else 0.0,
+        "throttled_rate": total["throttled"] / requests_sent if requests_sent else 0.0,
+    }
+    return report
+
+def print_report(report):
+    print()
+    print(f"{'endpoint':>10} {'requests':>8} {'ok/s':>7} {'p50 s':>7} {'p95 s':>7} {'p99 s':>7} {'errors':>7} {'429s':>7}")
+    rows = list(report["endpoints"].items()) + [("total", report["total"])]
+    for name, r in rows:
+        print(f"{name:>10} {r['requests']:>8} {r['throughput']:>7.2f} {r['p50']:>7.2f} {r['p95']:>7.2f} "
+              f"{r['p99']:>7.2f} {r['error_rate']:>7.1%} {r['throttled_rate']:>7.1%}")
+    memory = report.get("memory")
+    if memory:
+        print()
+        print(f"Server memory (master + workers): start {memory[0]['rss_mb']:.0f}MB RSS, "
+              f"peak {max(s['rss_mb'] for s in memory):.0f}MB, end {memory[-1]['rss_mb']:.0f}MB")
+        step = max(1, len(memory) // 10)
+        for sample in memory[::step]:
+            print(f"  t={sample['t']:>6.1f}s  RSS {sample['rss_mb']:>7.0f}MB  PSS {sample['pss_mb']:>7.0f}MB  "
+                  f"({sample['processes']} processes)")
+
+def start_server(args):
+    # The corpus repeats a few CSV files: with the result cache on, nearly every /process-dataset
+    # request after the first few would be a cache hit
+    env = dict(os.environ, ACE_WORKERS=str(args.workers), PORT=str(args.port), ACE_DATASET_CACHE="0")
+    return subprocess.Popen(["gunicorn", "-c", "gunicorn.conf.py", "main:app"], cwd=BACKEND_DIR, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test /extract and /process-dataset against a local server.")
+    parser.add_argument("--url", default=None, help="Use a running server instead of starting one")
+    parser.add_argument("--pid", type=int, default=None, help="With --url: server (master) pid to sample memory from")
+    parser.add_argument("--workers", type=int, default=1, help="gunicorn workers of the started server")
+    parser.add_argument("--port", type=int, default=8766)
+    load = parser.add_mutually_exclusive_group()
+    load.add_argument("--concurrency", type=int, default=4, help="Closed loop: concurrent clients (default)")
+    load.add_argument("--rate", type=float, default=None, help="Open loop: arrivals per second")
+    parser.add_argument("--max-inflight", type=int, default=64, help="Open loop: client-side connection limit")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("extract=0.8,dataset=0.2"),
+                        help="Request mix, e.g. extract=0.9,dataset=0.1")
+    parser.add_argument("--duration", type=float, default=60.0, help="Seconds of measured load")
+    parser.add_argument("--warmup", type=float, default=10.0)
+    parser.add_argument("--images", type=int, default=20, help="Generated screenshots in the corpus")
+    parser.add_argument("--datasets", type=int, default=5, help="Generated CSV files in the corpus")
+    parser.add_argument("--timeout", type=float, default=600.0, help="Per-request timeout in seconds")
+    parser.add_argument("--sample-interval", type=float, default=1.0, help="Seconds between memory samples")
+    parser.add_argument("--startup-timeout", type=float, default=600.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", default=None, help="Also write the report to this file")
+    parser.add_argument("--max-p95", type=float, default=None, help="Exit 1 if the overall p95 (s) is above this")
+    parser.add_argument("--max-error-rate", type=float, default=None, help="Exit 1 if the error rate (0-1) is above this")
+    args = parser.parse_args()
+
+    print("Generating corpus...")
+    corpus = make_corpus(args.images, args.datasets, args.seed)
+
+    server = None
+    pid = args.pid
+    base_url = args.url
+    if base_url is None:
+        base_url = f"http://127.0.0.1:{args.port}"
+        server = start_server(args)
+        pid = server.pid
+    try:
+        base_url = base_url.rstrip('/')
+        if server:
+            started = time.monotonic()
+            wait_for_health(base_url, server, args.startup_timeout)
+            print(f"Server ready in {time.monotonic() - started:.1f}s")
+        else:
+            requests.get(f"{base_url}/health", timeout=10).raise_for_status()
+        mode = f"{args.rate} req/s" if args.rate else f"{args.concurrency} clients"
+        if args.warmup:
+            print(f"Warming up for {args.warmup:.0f}s...")
+            run_load(base_url, corpus, args.mix, args, args.warmup, Stats())
+        # Memory is sampled over the measured load only, like latency
+        sampler = MemorySampler(pid, args.sample_interval) if pid and sys.platform.startswith('linux') else None
+        if sampler:
+            sampler.start()
+        print(f"Measuring for {args.duration:.0f}s at {mode}...")
+        stats = Stats()
+        elapsed = run_load(base_url, corpus, args.mix, args, args.duration, stats)
+
+        report = summarize(stats, elapsed)
+        report["mode"] = mode
+        if sampler:
+            sampler.stop()
+            report["memory"] = sampler.samples
+    finally:
+        if server:
+            server.send_signal(signal.SIGTERM)
+            try:
+                server.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                server.kill()
+
+    print_report(report)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+    failed = []
+    if args.max_p95 is not None and not report["total"]["p95"] <= args.max_p95:
+        failed.append(f"p95 {report['total']['p95']:.2f}s > {args.max_p95}s")
+    if args.max_error_rate is not None and report["total"]["error_rate"] > args.max_error_rate:
+        failed.append(f"error rate {report['total']['error_rate']:.1%} > {args.max_error_rate:.1%}")
+    if failed:
+        print("FAILED: " + "; ".join(failed))
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
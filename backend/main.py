@@ -1,13 +1,28 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException
+from fastapi import FastAPI, UploadFile, File, HTTPException, Depends, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from typing import List
+from typing import List, Optional
 import shutil
 import os
 import pandas as pd
 import io
-from fastapi.responses import StreamingResponse
+import json
+import time
+import itertools
+import functools
+import hmac
+import asyncio
+import threading
+from fastapi.responses import StreamingResponse, Response
+
+from uploads import UploadLimitRoute, upload_limits, open_upload, close_upload_source, limited_stream
+import profiling
+# starlette's run_in_threadpool, tagging worker threads with the request while profiling
+from profiling import run_in_threadpool, ProfilingMiddleware
+import config
 
 app = FastAPI()
+# Multipart uploads are parsed with size limits enforced while streaming (see uploads.py)
+app.router.route_class = UploadLimitRoute
 
 # CORS configuration
 origins = [
@@ -23,6 +38,8 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Tags requests while an admin CPU profile runs; a no-op otherwise (see profiling.py)
+app.add_middleware(ProfilingMiddleware)
 
 @app.get("/health")
 async def health_check():
@@ -30,89 +47,334 @@ async def health_check():
 
 from ocr_engine import ocr_engine
 from extractor import extractor
+from image_hash import fingerprint, ImageHashIndex, shared_image_index
+from concurrency import ocr_concurrency, OCROverloaded
+from phone_normalizer import get_normalizer, POLICIES
+from bulk_normalize import iter_json_array, iter_ndjson, iter_batches, BulkNormalizer, render_rows
+from deadlines import Deadline, FileBudget, client_limit
+from fuzzy_dedup import fuzzy_duplicates
+from records import ResultRow, rows_payload, columnar_payload, dumps
+from quality import result_score
+from archives import ArchiveReader, ArchiveError, is_archive_name
+from result_cache import dataset_cache, cache_key, etag_matches
+from spreadsheets import iter_dataset_chunks
+from documents import document_kind, document_pages, document_boxes
+from speculation import StrategyRace
+
+def resolve_normalizer(region=None, policy="international"):
+    # Cached per (region, policy), see phone_normalizer.py
+    try:
+        return get_normalizer(region.upper() if region else None, policy)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+_request_ids = itertools.count()
+
+def upload_frames(file):
+    contents = open_upload(file)
+    try:
+        return ocr_engine.frame_count(contents)
+    finally:
+        close_upload_source(contents)
+
+def ocr_job(request, files):
+    """
+    Scheduler job for this request's OCR calls (see scheduler.py), keyed per client or per request.
+    """
+    if config.SCHEDULER_FAIRNESS == 'request':
+        key = f"request-{next(_request_ids)}"
+    else:
+        # The header is only a client's own claim: without a proxy that sets it, anyone could take
+        # a weighted tenant's share, or start over with a fresh id
+        key = request.headers.get('x-client-id') if config.SCHEDULER_TRUST_CLIENT_ID else None
+        key = key or (request.client.host if request.client else "unknown")
+    # Archives may hold any number of images, so they never count as small
+    count = None if any(is_archive_name(file.filename) for file in files) else len(files)
+    if count is not None and count <= config.SCHEDULER_INTERACTIVE_FILES:
+        # Pages of multi-page TIFFs and animations count as images (headers only)
+        count = sum(upload_frames(file) for file in files)
+    return ocr_concurrency.job(key, count)
+
+async def ocr_admission():
+    # Bounded queue in front of OCR: reject early instead of letting latency grow without limit
+    try:
+        with ocr_concurrency.admit():
+            yield
+    except OCROverloaded as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+
+def frames_of(contents):
+    """
+    Frame indexes to OCR: [None] for a single image, every page of a multi-page TIFF or animation.
+    """
+    count = ocr_engine.frame_count(contents)
+    return [None] if count == 1 else range(count)
+
+async def upload_sources(files):
+    """
+    Yields (filename, contents, frame, document, error) per image: each uploaded image, or each
+    image member of an uploaded ZIP/TAR archive (named "archive.zip/member.png", see archives.py).
+    Multi-page images are yielded once per page (frame 0, 1, ...; None for single images) and
+    only the page being processed is decoded.
+    Text documents (see documents.py) are read once; their pages are yielded as text in place of
+    contents, with document set to their kind ('vcard', 'pdf', ...; None for images).
+    Archive members are decompressed one at a time in a worker thread, so only the member being
+    processed is held in memory; an unreadable archive or one crossing a limit yields an error.
+    """
+    for file in files:
+        contents = b""
+        try:
+            # Bytes for small uploads, a memory map of the spooled temp file for large ones
+            contents = open_upload(file)
+            document = document_kind(file.filename, contents)
+            if document is not None:
+                # Text copied out of the upload, which can be closed as soon as this file is done
+                pages = await run_in_threadpool(document_pages, contents, document)
+                for i, text in enumerate(pages):
+                    yield file.filename, text, i if len(pages) > 1 else None, document, None
+                continue
+            if not is_archive_name(file.filename):
+                for frame in frames_of(contents):
+                    yield file.filename, contents, frame, None, None
+                continue
+            members = None
+            try:
+                reader = ArchiveReader(contents, file.filename)
+                members = reader.members()
+                while True:
+                    member = await run_in_threadpool(next, members, None)
+                    if member is None:
+                        break
+                    data = await run_in_threadpool(member.read)
+                    for frame in frames_of(data):
+                        yield f"{file.filename}/{member.name}", data, frame, None, None
+                if reader.skipped:
+                    print(f"Skipped {reader.skipped} non-image members in {file.filename}")
+            except ArchiveError as e:
+                yield file.filename, None, None, None, str(e)
+            finally:
+                if members is not None:
+                    members.close()
+        except Exception as e:
+            yield file.filename, None, None, None, str(e)
+        finally:
+            close_upload_source(contents)
 
 @app.post("/extract")
-async def extract_contacts(files: List[UploadFile] = File(...)):
+@upload_limits(max_archive_size=config.ARCHIVE_MAX_UPLOAD_SIZE)
+async def extract_contacts(request: Request,
+                           files: List[UploadFile] = File(...),
+                           deadline: Optional[float] = Query(None, gt=0, description="Seconds for the whole request"),
+                           file_budget: Optional[float] = Query(None, gt=0, description="Seconds per file"),
+                           languages: Optional[str] = Query(None, description="Language hint, comma-separated EasyOCR codes (e.g. 'hi' or 'ar')"),
+                           region: Optional[str] = Query(None, description="Default region for numbers without a country code (e.g. IN)"),
+                           min_quality: Optional[float] = Query(None, ge=0, le=1, description="Stop trying OCR strategies once a pass scores this (0-1)"),
+                           fuzzy_dedup: bool = Query(False, description="Also merge contacts whose numbers differ by an OCR error"),
+                           response_format: str = Query("rows", alias="format", pattern="^(rows|columnar)$", description="Response layout: rows, or columnar (arrays per field)"),
+                           speculative: Optional[int] = Query(None, ge=0, le=4, description="Strategies to run ahead on spare OCR slots (0 = off)"),
+                           _admission=Depends(ocr_admission)):
     results = []
+    # Fair share of the OCR slots for this client, small requests in the priority lane (see scheduler.py)
+    job = ocr_job(request, files)
+    # Time limits (see deadlines.py): files that run out of time skip their remaining strategies
+    # Clients can only tighten the server's limits
+    request_deadline = Deadline(client_limit(deadline, config.EXTRACT_DEADLINE))
+    file_budget = client_limit(file_budget, config.EXTRACT_FILE_BUDGET)
+    cut_short = []
+    region = resolve_normalizer(region).region
+    # Quality score a pass must reach to skip the remaining strategies (see quality.py)
+    min_quality = config.EXTRACT_MIN_QUALITY if min_quality is None else min_quality
+    speculative = config.EXTRACT_SPECULATIVE if speculative is None else speculative
+
+    # Language hint: OCR with a reader for these languages (plus the defaults) from the reader pool
+    ocr_kwargs = {}
+    if languages:
+        language_list = [code.strip() for code in languages.split(',') if code.strip()]
+        try:
+            # Loads the reader on first use, outside the event loop
+            await run_in_threadpool(ocr_engine.reader_for, language_list)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"Unsupported languages '{languages}': {e}")
+        except Exception as e:
+            raise HTTPException(status_code=503, detail=f"Could not load OCR reader for '{languages}': {e}")
+        ocr_kwargs['languages'] = language_list
+    # Other requests may have used other languages or regions, so only share results for the defaults
+    cross_request_dedup = config.IMAGE_DEDUP_CROSS_REQUEST and not ocr_kwargs and region == config.DEFAULT_REGION
     # Deduplication Scope: Per upload batch.
     # We maintain a set of seen phones for the entire request (all files).
-    # 1. Single File: effectively handled because we process contacts top-to-bottom (see extractor.py sorting), 
+    # 1. Single File: effectively handled because we process contacts in reading order (see extractor.py / layout.py),
     #    so the first one is added to seen_phones and subsequent duplicates in the same file are skipped.
     # 2. Multiple Files: effectively handled because seen_phones persists across the file loop. 
     #    If a number was found in a previous file, it will be skipped here.
     seen_phones = set()
+
+    # Near-duplicate image skipping: the same card captured twice (or screenshots differing
+    # only in the status bar) reuses the earlier image's contacts instead of running OCR again.
+    request_image_index = ImageHashIndex()
     
     # Initialize OCR engine if not already (it lazy loads in class)
     if not ocr_engine.reader:
          # In a real app we might handle this better, but ocr_engine.init handles internal checks
          pass
 
-    for file in files:
+    # Per-page timing of multi-page images
+    pages = []
+
+    # Images one at a time, archives expanded into their image members, multi-page images into pages.
+    # Each page runs through the strategy loop on its own; seen_phones dedups across all of them.
+    async for filename, contents, frame, document, error in upload_sources(files):
+        if error is not None:
+            results.append(ResultRow(filename, error=error))
+            continue
+        page = None if frame is None else frame + 1
+        label = filename if page is None else f"{filename} page {page}"
+        # Only passed for later pages, the first frame is the default
+        frame_kwargs = {'frame': frame} if frame else {}
+        page_started = time.monotonic()
+        page_queue_seconds = job.queue_seconds
+        race = None
         try:
-            contents = await file.read()
             # Define strategies to try
             strategies = ['original', 'enhanced', 'binarized', 'grayscale', 'resized']
             
+            # Cheap first pass on a thumbnail of large images: full resolution only if it falls short
+            if document is None and config.OCR_THUMBNAIL and ocr_engine.thumbnail_scale(contents, frame or 0):
+                strategies.insert(0, 'thumbnail')
+
             best_contacts = []
+            best_score = 0.0
+            best_strategy = None
             successful_strategy = None
+            no_text_in_thumbnail = False
+            budget = FileBudget(file_budget, request_deadline)
+            file_cut_short = False
+
+            image_fp = fingerprint(contents, frame or 0) if config.IMAGE_DEDUP_ENABLED and document is None else None
+            duplicate = request_image_index.find(image_fp)
+            if duplicate is None and cross_request_dedup:
+                duplicate = shared_image_index.find(image_fp)
+            if duplicate is not None:
+                (best_contacts, successful_strategy, best_score), distance = duplicate
+                print(f"Skipping OCR for {label}: near-duplicate image ({distance} changed pixels)")
+                strategies = []
+
+            if document is not None:
+                # The document's own text, laid out as OCR boxes: same extractor, dedup and rows
+                # (vCard, text, HTML or PDF: contents is the page's text, no OCR, see documents.py)
+                text_boxes = await run_in_threadpool(document_boxes, contents, document)
+                best_contacts = extractor.extract_contacts(text_boxes, region=region)
+                best_score = result_score(best_contacts)
+                successful_strategy = f"text:{document}"
+                strategies = []
+
+            # Passes scored so far: strategy -> (ocr_results, contacts, score)
+            passes = {}
+            # Speculation: the next strategies run at the same time on spare OCR slots, the first
+            # good enough pass wins (see speculation.py)
+            if speculative and strategies:
+                race = StrategyRace(job, speculative, functools.partial(
+                    ocr_engine.process_image_with_strategy, contents, **ocr_kwargs, **frame_kwargs))
+            winner = None
 
-            for strategy in strategies:
-                print(f"Processing {file.filename} with strategy: {strategy}")
-                ocr_results = ocr_engine.process_image_with_strategy(contents, strategy=strategy)
-                contacts = extractor.extract_contacts(ocr_results)
-                
-                # Check if we got any valid contacts
-                if contacts:
-                    # simplistic check: if ANY contact is valid, we consider this strategy successful
-                    if any(extractor.is_valid_contact(c) for c in contacts):
-                        best_contacts = contacts
+            for i, strategy in enumerate(strategies):
+                # A pass that already ran ahead costs nothing more
+                if strategy not in passes and not budget.allows(strategy):
+                    print(f"Time budget spent for {label}, skipping: {', '.join(strategies[i:])}")
+                    file_cut_short = True
+                    break
+                print(f"Processing {label} with strategy: {strategy}")
+                while strategy not in passes and winner is None:
+                    if race is None:
+                        started = time.monotonic()
+                        # In a worker thread, at most OCR_MAX_CONCURRENT at once, in fair order (see scheduler.py)
+                        ocr_results = await run_in_threadpool(
+                            ocr_concurrency.run_job, job, ocr_engine.process_image_with_strategy, contents,
+                            strategy=strategy, **ocr_kwargs, **frame_kwargs)
+                        finished = [(strategy, ocr_results, time.monotonic() - started)]
+                    else:
+                        race.run_ahead([s for s in strategies[i + 1:] if s not in passes and budget.allows(s)])
+                        # This pass, or passes ahead of it, as they finish
+                        finished = await race.wait(strategy)
+                    for name, ocr_results, seconds in finished:
+                        # Includes time waiting for an OCR slot: the budget is wall-clock
+                        budget.record(name, seconds)
+                        contacts = extractor.extract_contacts(ocr_results, region=region)
+                        # OCR confidence, phone validity and name plausibility combined (see quality.py)
+                        score = result_score(contacts)
+                        passes[name] = (ocr_results, contacts, score)
+
+                        # The best-scoring pass so far is the answer if no pass is good enough
+                        if contacts and (not best_contacts or score > best_score):
+                            best_contacts, best_score, best_strategy = contacts, score, name
+                        if name != strategy and contacts and score >= min_quality and winner is None:
+                            print(f"Strategy {name} ran ahead for {label} and wins")
+                            winner = name
+
+                if strategy in passes:
+                    ocr_results, contacts, score = passes[strategy]
+                    if contacts and score >= min_quality:
                         successful_strategy = strategy
                         break # Stop retrying
-                    
-                    # If we found contacts but they weren't "valid" (e.g. name was Unknown),
-                    # we keep them as a fallback if no better strategy works
-                    if not best_contacts:
-                         best_contacts = contacts
+                if winner is not None:
+                    successful_strategy = winner
+                    break
+
+                # No text at all, neither in the thumbnail nor at full resolution:
+                # image enhancements won't find any either
+                if strategy == 'thumbnail':
+                    no_text_in_thumbnail = not ocr_results
+                elif strategy == 'original' and no_text_in_thumbnail and not ocr_results:
+                    print(f"No text in {label}, skipping: {', '.join(strategies[i + 1:])}")
+                    break
+
+            # Below min_quality but with a named contact: still that strategy's result, not a fallback
+            if successful_strategy is None and any(extractor.is_valid_contact(c) for c in best_contacts):
+                successful_strategy = best_strategy
+
+            if file_cut_short:
+                cut_short.append(label)
+            # Cut-short results are incomplete, don't let later duplicates reuse them
+            if image_fp is not None and duplicate is None and not file_cut_short:
+                request_image_index.add(image_fp, (best_contacts, successful_strategy, best_score))
+                if cross_request_dedup:
+                    shared_image_index.add(image_fp, (best_contacts, successful_strategy, best_score))
             
             # Add to results
             if best_contacts:
                 for contact in best_contacts:
-                    phone = contact['phone']
+                    phone = contact.phone
                     # Deduplication check: strict check against seen_phones
                     if phone and phone not in seen_phones:
                         seen_phones.add(phone)
-                        results.append({
-                            "filename": file.filename,
-                            "name": contact['name'],
-                            "phone": phone,
-                            "confidence": contact['confidence'],
-                            "strategy": successful_strategy or "fallback"
-                        })
+                        # Rows refer to the extractor's Contact records, no copies (see records.py)
+                        results.append(ResultRow(filename, contact, successful_strategy or "fallback",
+                                                 file_cut_short, quality=best_score, page=page))
                     elif not phone:
                          # Handle case where contact found but no phone (unlikely given logic, but safe)
                          pass
             else:
-                 results.append({
-                        "filename": file.filename,
-                        "name": "No contact found",
-                        "phone": "",
-                        "confidence": 0.0,
-                        "strategy": "all_failed"
-                    })
+                 results.append(ResultRow(filename, None,
+                                          "deadline_exceeded" if file_cut_short else "all_failed",
+                                          file_cut_short, page=page))
+            if page is not None:
+                pages.append({"filename": filename, "page": page, "strategy": successful_strategy,
+                              "contacts": len(best_contacts),
+                              "seconds": round(time.monotonic() - page_started, 3),
+                              "queue_seconds": round(job.queue_seconds - page_queue_seconds, 3)})
 
         except Exception as e:
-            results.append({
-                "filename": file.filename,
-                "error": str(e),
-                "status": "failed"
-            })
+            results.append(ResultRow(filename, error=str(e) if page is None else f"page {page}: {e}"))
+        finally:
+            # Passes still running ahead lost (or the file failed): stop them before the upload closes
+            if race is not None:
+                await race.close()
             
     # Final Validation Step: functional double-check for uniqueness
     # (Though logic above should handle it, this meets the 'Final validation step' requirement)
     final_results = []
     final_seen = set()
     for res in results:
-        p = res.get('phone')
+        p = res.phone if res.error is None else None
         if p:
             if p not in final_seen:
                 final_seen.add(p)
@@ -121,37 +383,109 @@ async def extract_contacts(files: List[UploadFile] = File(...)):
         else:
             # Keep failures or no-phone entries
             final_results.append(res)
-            
-    return {"results": final_results}
 
-@app.post("/process-dataset")
-async def process_dataset(file: UploadFile = File(...)):
-    # Read file into Pandas DataFrame
-    contents = await file.read()
-    
+    merged = None
+    if fuzzy_dedup:
+        # Near-duplicates (misread / dropped digit, same name) are dropped and reported (see fuzzy_dedup.py)
+        with_phone = [res for res in final_results if res.error is None and res.phone]
+        keep, merges = fuzzy_duplicates([res.phone for res in with_phone], [res.name for res in with_phone])
+        merged_away = {id(with_phone[m["merged"]]) for m in merges if m["dropped"]}
+        final_results = [res for res in final_results if id(res) not in merged_away]
+        merged = [{
+            "kept": {"filename": with_phone[m["kept"]].filename, "name": with_phone[m["kept"]].name,
+                     "phone": with_phone[m["kept"]].phone},
+            "merged": {"filename": with_phone[m["merged"]].filename, "name": with_phone[m["merged"]].name,
+                       "phone": with_phone[m["merged"]].phone},
+            "reason": m["reason"],
+        } for m in merges]
+
+    if response_format == "columnar":
+        filenames, columns, errors = columnar_payload(final_results)
+        response = {"format": "columnar", "filenames": filenames, "rows": columns, "errors": errors,
+                    "cut_short": cut_short}
+    else:
+        response = {"results": rows_payload(final_results), "cut_short": cut_short}
+    if merged is not None:
+        response["merged"] = merged
+    if pages:
+        response["pages"] = pages
+    # Time waiting for OCR slots vs. running OCR
+    response["timing"] = job.timing()
+    # Serialized directly with the fast encoder, skipping FastAPI's generic jsonable_encoder pass
+    return Response(dumps(response), media_type="application/json")
+
+@app.get("/ocr/stats")
+async def ocr_stats():
+    # OCR load (see concurrency.py) and resident readers with their load time and memory (see reader_pool.py)
+    return {"concurrency": ocr_concurrency.stats(), "readers": ocr_engine.pool.stats()}
+
+@app.post("/normalize")
+async def normalize_numbers(request: Request,
+                            region: Optional[str] = Query(None, description="Default region for numbers without a country code"),
+                            policy: str = Query("international", description=f"Output policy: {', '.join(POLICIES)}")):
+    """
+    Body: a JSON array of raw phone strings, or NDJSON (Content-Type: application/x-ndjson).
+    Returns {"normalized", "group"} per input, in the same order and format. Inputs that
+    normalize to the same number share a group id; unusable inputs get group null.
+    """
+    normalizer = BulkNormalizer(resolve_normalizer(region, policy))
+    content_type = request.headers.get('content-type', '')
+    ndjson = 'ndjson' in content_type or 'jsonl' in content_type
+
+    # Parsed incrementally while the body streams in (see bulk_normalize.py)
+    chunks = limited_stream(request, config.NORMALIZE_MAX_REQUEST_SIZE)
+    values = iter_ndjson(chunks) if ndjson else iter_json_array(chunks)
+    batches = iter_batches(values)
+
+    # The first batch is processed before responding, so malformed input still gets a 400
     try:
-        if file.filename.endswith('.csv'):
-            df = pd.read_csv(io.BytesIO(contents))
-        elif file.filename.endswith(('.xls', '.xlsx')):
-            df = pd.read_excel(io.BytesIO(contents))
-        else:
-            raise HTTPException(status_code=400, detail="Invalid file format. Please upload CSV or Excel.")
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Error reading file: {str(e)}")
+        first = await anext(batches, None)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    async def body():
+        batch = first
+        if not ndjson:
+            yield "["
+        separator = ""
+        while batch is not None:
+            rows = await run_in_threadpool(normalizer.process, batch)
+            chunk = render_rows(rows, ndjson)
+            yield chunk if ndjson else separator + chunk
+            separator = ","
+            try:
+                batch = await anext(batches, None)
+            except ValueError as e:
+                # Too late for a status code: NDJSON gets an error line, a JSON array is left unterminated
+                print(f"/normalize: invalid input mid-stream: {e}")
+                if ndjson:
+                    yield json.dumps({"error": str(e)}) + "\n"
+                return
+        if not ndjson:
+            yield "]"
+
+    return StreamingResponse(body(), media_type="application/x-ndjson" if ndjson else "application/json")
 
+XLSX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+def find_phone_column(df, phone_column=None):
     # Identify phone column
     phone_col = None
+    if phone_column is not None:
+        if phone_column not in df.columns:
+            raise HTTPException(status_code=400, detail=f"Column '{phone_column}' not found.")
+        phone_col = phone_column
     possible_names = ['phone', 'mobile', 'contact', 'cell', 'number', 'tel']
     
     # Case-insensitive search
-    col_map = {c.lower(): c for c in df.columns}
+    col_map = {str(c).lower(): c for c in df.columns}
     for name in possible_names:
+        if phone_col:
+            break
         for col in col_map:
             if name in col:
                 phone_col = col_map[col]
                 break
-        if phone_col:
-            break
             
     # Fallback to first column if no match found
     if not phone_col and not df.empty:
@@ -159,18 +493,94 @@ async def process_dataset(file: UploadFile = File(...)):
         
     if not phone_col:
         raise HTTPException(status_code=400, detail="Could not identify phone number column and file is empty.")
+    return phone_col
 
-    # Normalize phone numbers
-    # Create a new column 'Normalized Phone'
-    # We use the existing extractor instance
-    df['Normalized Phone'] = df[phone_col].astype(str).apply(extractor.normalize_phone)
-    
-    # Remove rows where Normalized Phone is empty (invalid numbers)
-    df = df[df['Normalized Phone'] != ""]
-    
-    # Deduplicate based on 'Normalized Phone'
-    # keep='first' retains the first occurrence
-    df_deduped = df.drop_duplicates(subset=['Normalized Phone'], keep='first')
+def phone_strings(values):
+    """
+    Phone cells as text. Numeric cells (Excel numbers, CSV columns with blanks) lose the '.0'.
+    """
+    if values.dtype == object or pd.api.types.is_float_dtype(values):
+        return values.map(lambda v: str(int(v)) if isinstance(v, float) and v.is_integer() else str(v))
+    return values.astype(str)
+
+def normalize_chunks(chunks, normalizer, phone_column=None):
+    """
+    Normalizes and deduplicates DataFrame chunks (see spreadsheets.py), keeping the first row of
+    each number across all chunks. Returns (DataFrame, phone column).
+    """
+    phone_col = None
+    kept = []
+    seen = set()
+    # Each distinct value is normalized once, then mapped back onto the column
+    normalized = {}
+    for df in chunks:
+        if phone_col is None:
+            phone_col = find_phone_column(df, phone_column)
+
+        # Normalize phone numbers
+        # Create a new column 'Normalized Phone'
+        raw_phones = phone_strings(df[phone_col])
+        normalized.update((raw, normalizer.normalize(raw)) for raw in raw_phones.unique() if raw not in normalized)
+        df['Normalized Phone'] = raw_phones.map(normalized)
+
+        # Remove rows where Normalized Phone is empty (invalid numbers)
+        df = df[df['Normalized Phone'] != ""]
+
+        # Deduplicate based on 'Normalized Phone'
+        # keep='first' retains the first occurrence, within the chunk and then across chunks
+        df = df.drop_duplicates(subset=['Normalized Phone'], keep='first')
+        df = df[~df['Normalized Phone'].isin(seen)]
+        seen.update(df['Normalized Phone'])
+        kept.append(df)
+
+    if phone_col is None:
+        raise HTTPException(status_code=400, detail="Could not identify phone number column and file is empty.")
+    return pd.concat(kept, ignore_index=True), phone_col
+
+@app.post("/process-dataset")
+@upload_limits(max_file_size=config.DATASET_MAX_FILE_SIZE,
+               max_request_size=config.DATASET_MAX_FILE_SIZE + 1024 * 1024)
+async def process_dataset(request: Request,
+                          file: UploadFile = File(...),
+                          region: Optional[str] = Query(None, description="Default region for numbers without a country code"),
+                          policy: str = Query("international", description=f"Output policy: {', '.join(POLICIES)}"),
+                          fuzzy_dedup: bool = Query(False, description="Also merge rows whose numbers differ by an OCR error"),
+                          phone_column: Optional[str] = Query(None, description="Phone column (default: detected from the header)"),
+                          sheet: Optional[str] = Query(None, description="Excel sheet name or 0-based index (default: the first)"),
+                          header_row: Optional[int] = Query(None, ge=1, description="1-based header row (default: detected)")):
+    normalizer = resolve_normalizer(region, policy)
+    if not file.filename.endswith(('.csv', '.xls', '.xlsx')):
+        raise HTTPException(status_code=400, detail="Invalid file format. Please upload CSV or Excel.")
+
+    # Same content and options give the same output: the key is the ETag, and repeated uploads
+    # are answered from the result cache (see result_cache.py)
+    options = {"format": os.path.splitext(file.filename)[1].lower(), "region": normalizer.region,
+               "policy": policy, "fuzzy_dedup": fuzzy_dedup, "phone_column": phone_column, "sheet": sheet,
+               "header_row": header_row}
+    source = open_upload(file)
+    try:
+        key = await run_in_threadpool(cache_key, source, options)
+    finally:
+        close_upload_source(source)
+    file.file.seek(0)
+    headers = {"ETag": f'"{key}"',
+               "Content-Disposition": f"attachment; filename=processed_{file.filename}.xlsx"}
+    if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+        return Response(status_code=304, headers={"ETag": headers["ETag"]})
+    if dataset_cache is not None:
+        cached = await run_in_threadpool(dataset_cache.get, key)
+        if cached is not None:
+            return Response(cached, media_type=XLSX_MEDIA_TYPE, headers={**headers, "X-Cache": "hit"})
+
+    # Rows in chunks straight from the spooled upload (no in-memory copy): CSV chunks, or .xlsx
+    # rows streamed in read-only mode (see spreadsheets.py), through one normalize-and-dedupe loop
+    try:
+        chunks = iter_dataset_chunks(file.file, file.filename, sheet, header_row)
+        df_deduped, phone_col = await run_in_threadpool(normalize_chunks, chunks, normalizer, phone_column)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Error reading file: {str(e)}")
     
     # Final Validation Step: strict cross-check
     unique_phones = df_deduped['Normalized Phone'].unique()
@@ -183,17 +593,92 @@ async def process_dataset(file: UploadFile = File(...)):
     # Verify again
     assert len(df_deduped) == len(df_deduped['Normalized Phone'].unique())
 
+    merged_sheet = None
+    if fuzzy_dedup:
+        # Near-duplicates (see fuzzy_dedup.py); a name column, if any, has to agree too. Without
+        # one, matches stay in Sheet1 and are only listed for review
+        name_col = next((c for c in df_deduped.columns if c != phone_col and 'name' in str(c).lower()), None)
+        phones = df_deduped['Normalized Phone'].tolist()
+        names = df_deduped[name_col].fillna("").astype(str).tolist() if name_col else None
+        keep, merges = await run_in_threadpool(fuzzy_duplicates, phones, names)
+        merged_sheet = pd.DataFrame([{
+            "Kept Phone": phones[m["kept"]],
+            "Merged Phone": phones[m["merged"]],
+            **({"Kept Name": names[m["kept"]], "Merged Name": names[m["merged"]]} if names else {}),
+            "Reason": m["reason"],
+            "Action": "merged" if m["dropped"] else "review",
+        } for m in merges])
+        df_deduped = df_deduped[keep]
+
     # Create Excel output
     output = io.BytesIO()
     with pd.ExcelWriter(output, engine='openpyxl') as writer:
         df_deduped.to_excel(writer, index=False)
-    output.seek(0)
-    
-    return StreamingResponse(
-        output, 
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={"Content-Disposition": f"attachment; filename=processed_{file.filename}.xlsx"}
-    )
+        if merged_sheet is not None:
+            merged_sheet.to_excel(writer, sheet_name="Merged", index=False)
+    data = output.getvalue()
+    if dataset_cache is not None:
+        await run_in_threadpool(dataset_cache.put, key, data)
+
+    return Response(data, media_type=XLSX_MEDIA_TYPE, headers={**headers, "X-Cache": "miss"})
+
+def require_admin(request: Request):
+    # Admin endpoints are hidden unless ACE_ADMIN_TOKEN is set
+    if not config.ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    token = request.headers.get('x-admin-token', '')
+    if not hmac.compare_digest(token.encode(), config.ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+def profile_window(seconds):
+    if seconds > config.PROFILE_MAX_SECONDS:
+        raise HTTPException(status_code=400, detail=f"seconds must be at most {config.PROFILE_MAX_SECONDS:g}")
+
+@app.post("/admin/profile/cpu", dependencies=[Depends(require_admin)])
+async def profile_cpu(seconds: float = Query(10, gt=0, description="Sampling window"),
+                      interval_ms: float = Query(10, ge=1, le=1000, description="Time between samples"),
+                      tag: Optional[str] = Query(None, description="Only samples of this request, e.g. 'POST /extract'"),
+                      format: str = Query("folded", pattern="^(folded|json)$")):
+    """
+    Samples every thread's stack for `seconds` while the server keeps serving (see profiling.py).
+    folded: flamegraph.pl / speedscope input, one "tag;frame;...;frame count" line per stack.
+    json: the same stacks plus the top functions by samples.
+    """
+    profile_window(seconds)
+    try:
+        counts, rounds = await run_in_threadpool(
+            profiling.profiler.sample, seconds, interval_ms / 1000,
+            asyncio.get_running_loop(), threading.get_ident()
+        )
+    except profiling.ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if format == "folded":
+        return Response(profiling.folded(counts, tag), media_type="text/plain")
+    return {
+        "seconds": seconds,
+        "interval_ms": interval_ms,
+        "rounds": rounds,
+        "tags": sorted({stack_tag for stack_tag, _ in counts}),
+        "stacks": [{"tag": stack_tag, "frames": list(frames), "samples": count}
+                   for (stack_tag, frames), count in counts.most_common()
+                   if tag is None or stack_tag == tag],
+        "top_functions": profiling.top_functions(counts, tag=tag),
+    }
+
+@app.post("/admin/profile/memory", dependencies=[Depends(require_admin)])
+async def profile_memory(seconds: float = Query(10, gt=0, description="Tracing window"),
+                         files: str = Query(",".join(profiling.DEFAULT_FILES), description="Comma-separated file names, or *"),
+                         limit: int = Query(20, ge=1, le=500)):
+    """
+    Traces allocations with tracemalloc for `seconds`; returns the sites in `files` that allocated
+    the most memory still alive at the end of the window (see profiling.py).
+    """
+    profile_window(seconds)
+    names = tuple(name.strip() for name in files.split(",") if name.strip())
+    try:
+        return await run_in_threadpool(profiling.trace_memory, seconds, names, limit)
+    except profiling.ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
 
 if __name__ == "__main__":
     import uvicorn
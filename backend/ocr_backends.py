@@ -0,0 +1,160 @@
+import os
+from abc import ABC, abstractmethod
+
+import config
+from concurrency import intra_op_threads
+
+# OCR backends used by OCREngine.
+#
+# Every backend implements the same three calls on an image as a numpy array:
+#   detect(image_np)                        -> (horizontal_list, free_list) text boxes
+#   recognize(image_np, horizontal, free)   -> [(bbox, text, confidence), ...]
+#   readtext(image_np)                      -> [(bbox, text, confidence), ...] (detect + recognize)
+#
+# Backends are chosen with ACE_OCR_BACKEND (see config.py):
+#   easyocr - EasyOCR running its PyTorch models (default)
+#   onnx    - the same detector/recognizer exported to ONNX (export_onnx.py) and run with
+#             ONNX Runtime, optionally int8-quantized. EasyOCR's pre/post-processing is reused,
+#             only the network forward passes move to ONNX Runtime.
+
+class OCRBackend(ABC):
+    # A backend missing one of the three calls fails when it is created, not mid-request
+    name = "base"
+
+    @abstractmethod
+    def detect(self, image_np):
+        pass
+
+    @abstractmethod
+    def recognize(self, image_np, horizontal_list, free_list):
+        pass
+
+    @abstractmethod
+    def readtext(self, image_np):
+        pass
+
+    def model_bytes(self):
+        # Size of the model weights, for the reader pool's metrics (None = unknown)
+        return None
+
+class EasyOCRBackend(OCRBackend):
+    name = "easyocr"
+
+    def __init__(self, languages):
+        import easyocr
+        self.reader = easyocr.Reader(languages)
+
+    def detect(self, image_np):
+        horizontal_list, free_list = self.reader.detect(image_np)
+        # reader.detect returns one list per image in the batch; we always pass one image
+        return horizontal_list[0], free_list[0]
+
+    def recognize(self, image_np, horizontal_list, free_list):
+        return self.reader.recognize(_grey(image_np), horizontal_list, free_list, detail=1)
+
+    def readtext(self, image_np):
+        # detail=0 returns just the text list. detail=1 (default) returns bounding box, text, confidence
+        return self.reader.readtext(image_np, detail=1)
+
+    def model_bytes(self):
+        # Layers EasyOCR quantizes dynamically on CPU keep packed weights outside parameters(),
+        # so this undercounts those
+        total = 0
+        for network in (self.reader.detector, self.reader.recognizer):
+            for tensor in list(network.parameters()) + list(network.buffers()):
+                total += tensor.numel() * tensor.element_size()
+        return total
+
+def _grey(image_np):
+    import cv2
+    if image_np.ndim == 2:
+        return image_np
+    if image_np.shape[2] == 4:
+        return cv2.cvtColor(image_np, cv2.COLOR_RGBA2GRAY)
+    return cv2.cvtColor(image_np, cv2.COLOR_RGB2GRAY)
+
+class _OnnxDetector:
+    """
+    Stands in for EasyOCR's CRAFT torch module: same call signature, inference in ONNX Runtime.
+    """
+    def __init__(self, session):
+        self.session = session
+        self.input_name = session.get_inputs()[0].name
+
+    def eval(self):
+        return self
+
+    def __call__(self, x):
+        import torch
+        y, feature = self.session.run(None, {self.input_name: x.numpy()})
+        return torch.from_numpy(y), torch.from_numpy(feature)
+
+class _OnnxRecognizer:
+    """
+    Stands in for EasyOCR's recognition torch module (the CTC text input is unused by the model).
+    """
+    def __init__(self, session):
+        self.session = session
+        self.input_name = session.get_inputs()[0].name
+
+    def eval(self):
+        return self
+
+    def __call__(self, image, text=None):
+        import torch
+        preds, = self.session.run(None, {self.input_name: image.numpy()})
+        return torch.from_numpy(preds)
+
+def onnx_model_paths(model_dir, recog_model_name, int8=False):
+    suffix = ".int8.onnx" if int8 else ".onnx"
+    return (os.path.join(model_dir, "craft" + suffix),
+            os.path.join(model_dir, recog_model_name + suffix))
+
+class ONNXBackend(EasyOCRBackend):
+    name = "onnx"
+
+    def __init__(self, languages, model_dir=None, int8=None, threads=None):
+        import easyocr
+        import onnxruntime as ort
+        from easyocr.detection import get_textbox
+        from easyocr.utils import CTCLabelConverter
+
+        model_dir = model_dir or config.OCR_ONNX_MODEL_DIR
+        int8 = config.OCR_ONNX_INT8 if int8 is None else int8
+
+        # A Reader without its torch networks: keeps language/charset setup and all pre/post-processing
+        reader = easyocr.Reader(languages, gpu=False, detector=False, recognizer=False, verbose=False)
+        reader.detect_network = 'craft'
+        reader.get_textbox = get_textbox
+        dict_list = {lang: os.path.join(easyocr.easyocr.BASE_PATH, 'dict', lang + ".txt") for lang in languages}
+        reader.converter = CTCLabelConverter(reader.character, {}, dict_list)
+
+        detector_path, recognizer_path = onnx_model_paths(model_dir, reader.model_lang, int8)
+        for path in (detector_path, recognizer_path):
+            if not os.path.isfile(path):
+                raise FileNotFoundError(f"Missing ONNX model {path}. Run export_onnx.py first.")
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        # Same per-call thread budget as PyTorch unless overridden (see concurrency.py)
+        options.intra_op_num_threads = threads or config.OCR_ONNX_THREADS or intra_op_threads()
+        providers = ['CPUExecutionProvider']
+        reader.detector = _OnnxDetector(ort.InferenceSession(detector_path, options, providers=providers))
+        reader.recognizer = _OnnxRecognizer(ort.InferenceSession(recognizer_path, options, providers=providers))
+        self.reader = reader
+        self.int8 = int8
+        self.model_paths = (detector_path, recognizer_path)
+
+    def model_bytes(self):
+        return sum(os.path.getsize(path) for path in self.model_paths)
+
+BACKENDS = {
+    EasyOCRBackend.name: EasyOCRBackend,
+    ONNXBackend.name: ONNXBackend,
+}
+
+def create_backend(name=None, languages=('en',)):
+    name = name or config.OCR_BACKEND
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown OCR backend '{name}'. Available: {', '.join(BACKENDS)}")
+    return BACKENDS[name](list(languages))
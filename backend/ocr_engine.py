@@ -1,18 +1,34 @@
-import easyocr
-import io
 from PIL import Image
 import numpy as np
 from PIL import Image, ImageEnhance, ImageOps
+from uploads import BufferFile
+from ocr_backends import create_backend
+from reader_pool import ReaderPool, language_key
+from concurrency import intra_op_threads, set_intra_op_threads
+import config
 
 class OCREngine:
-    def __init__(self, languages=['en']):
-        print("Initializing EasyOCR...")
+    def __init__(self, languages=None, backend=None):
+        backend = backend or config.OCR_BACKEND
+        print(f"Initializing OCR backend '{backend}'...")
+        self.default_languages = language_key(languages or config.OCR_LANGUAGES)
+        # Readers per language set (see reader_pool.py); the default one is loaded now and kept
+        self.pool = ReaderPool(lambda langs: create_backend(backend, langs), config.OCR_MAX_READERS,
+                               pinned=[self.default_languages])
+        # Load on one intra-op thread: loading (weight copies, quantization) then never starts
+        # PyTorch's OpenMP pool. Under gunicorn this runs in the master (preload_app), and a
+        # worker forked from a process whose pool has started hangs in its first parallel op.
+        set_intra_op_threads(1)
         try:
-            self.reader = easyocr.Reader(languages)
-            print("EasyOCR initialized.")
+            # The OCR backend (see ocr_backends.py): detect / recognize / readtext
+            self.reader = self.pool.get(self.default_languages)
+            print(f"OCR backend '{backend}' initialized.")
         except Exception as e:
-            print(f"Error initializing EasyOCR: {e}")
+            print(f"Error initializing OCR backend '{backend}': {e}")
             self.reader = None
+        # Leave room for concurrent OCR calls instead of giving each one every core. Only takes
+        # effect at the first inference (in the workers, see gunicorn.conf.py post_fork)
+        set_intra_op_threads(intra_op_threads())
 
     def process_image(self, image_bytes: bytes):
         """
@@ -21,22 +37,78 @@ class OCREngine:
         """
         return self.process_image_with_strategy(image_bytes, 'original')
 
-    def process_image_with_strategy(self, image_bytes: bytes, strategy: str = 'original'):
-        if not self.reader:
+    def reader_for(self, languages=None):
+        """
+        The reader for a language hint (always including the default languages), loading it if needed.
+        """
+        if not languages:
+            return self.reader
+        return self.pool.get(language_key(languages, self.default_languages))
+
+    def frame_count(self, image_bytes):
+        """
+        Number of frames (pages) in the image: more than 1 for multi-page TIFFs and animated
+        GIF/WebP/PNG, 1 otherwise or if it can't be read. Only headers are read, no frame is decoded.
+        """
+        try:
+            with BufferFile(image_bytes) as fp:
+                return max(1, getattr(Image.open(fp), 'n_frames', 1))
+        except Exception:
+            return 1
+
+    def thumbnail_scale(self, image_bytes, frame=0):
+        """
+        Scale of the 'thumbnail' strategy for this image (long side down to config.OCR_THUMBNAIL_SIZE),
+        or None if the image is already that small or can't be read. Only the image header is read.
+        """
+        try:
+            with BufferFile(image_bytes) as fp:
+                image = Image.open(fp)
+                if frame:
+                    image.seek(frame)
+                width, height = image.size
+        except Exception:
+            return None
+        scale = config.OCR_THUMBNAIL_SIZE / max(width, height, 1)
+        return scale if scale < 1 else None
+
+    def process_image_with_strategy(self, image_bytes: bytes, strategy: str = 'original', languages=None, frame=0,
+                                    cancel=None):
+        """
+        image_bytes may also be a memory map of a spooled upload (see uploads.open_upload);
+        it is decoded in place rather than copied.
+        frame: page of a multi-frame image (see frame_count); only that frame is decoded.
+        cancel: threading.Event of a speculative call (see speculation.py), checked between
+        preprocessing, detection and recognition; once set the call returns [] early.
+        """
+        if cancel is not None and cancel.is_set():
+            return []
+        reader = self.reader_for(languages)
+        if not reader:
              raise Exception("OCR Engine not initialized")
 
         try:
-            image = Image.open(io.BytesIO(image_bytes))
-            
-            # Apply preprocessing based on strategy
-            image = self._preprocess_image(image, strategy)
+            with BufferFile(image_bytes) as fp:
+                image = Image.open(fp)
+                if frame:
+                    image.seek(frame)
+                
+                # Apply preprocessing based on strategy
+                image = self._preprocess_image(image, strategy)
 
-            # Convert to numpy array for EasyOCR
-            image_np = np.array(image)
+                # Convert to numpy array for the OCR backend (decodes while the file is still open)
+                image_np = np.array(image)
             
-            # detail=0 returns just the text list. detail=1 (default) returns bounding box, text, confidence
-            results = self.reader.readtext(image_np, detail=1) 
-            return results
+            if cancel is None:
+                # List of (bbox, text, confidence)
+                return reader.readtext(image_np)
+            # readtext in its two stages, so a cancelled call gives its slot back in between
+            if cancel.is_set():
+                return []
+            horizontal_list, free_list = reader.detect(image_np)
+            if cancel.is_set():
+                return []
+            return reader.recognize(image_np, horizontal_list, free_list)
         except Exception as e:
             print(f"Error processing image with strategy {strategy}: {e}")
             return []
@@ -60,6 +132,15 @@ class OCREngine:
             image = enhancer.enhance(1.5)
             return image
 
+        elif strategy == 'thumbnail':
+            # Cheap first pass: long side down to OCR_THUMBNAIL_SIZE
+            scale = config.OCR_THUMBNAIL_SIZE / max(image.size)
+            if scale < 1:
+                width, height = image.size
+                return image.resize((max(1, round(width * scale)), max(1, round(height * scale))),
+                                    Image.Resampling.BILINEAR)
+            return image
+
         elif strategy == 'resized':
             # Resize by 2x
             width, height = image.size
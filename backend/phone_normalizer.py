@@ -0,0 +1,141 @@
+import re
+from functools import lru_cache
+
+import phonenumbers
+from phonenumbers import PhoneMetadata
+from phonenumbers.phonenumberutil import COUNTRY_CODE_TO_REGION_CODE
+
+import config
+
+# One phone normalization core, parameterized by default region and output policy.
+#
+# Output policies (what a valid number becomes; invalid input always becomes its raw digits):
+#   international - country code + national number, e.g. '(212) 555-1234' -> '12125551234'
+#                   (ContactExtractor.normalize_phone, /extract, /process-dataset, /normalize)
+#   national      - like international, but the default region's country code is left off unless
+#                   the input wrote it explicitly ('+1 ...' or '001 ...'): '(212) 555-1234' ->
+#                   '2125551234' (analyze_screenshots.py)
+#
+# Normalizers are built once per (region, policy) and cached. Each precompiles a fast path for
+# the region: a plain local number (digits and separators only, no prefixes) is validated
+# against the region's own number patterns directly, skipping phonenumbers.parse and the
+# search over every region sharing the country code (25 for +1). Anything else, or anything
+# the fast path cannot confirm as valid, goes through phonenumbers as before, so results are
+# identical either way.
+
+POLICIES = ('international', 'national')
+
+_PLAIN_LOCAL = re.compile(r'[0-9 ().\-/]+')
+_NON_DIGIT = re.compile(r'\D')
+
+# Number types phonenumbers checks to decide a number is valid (type != UNKNOWN)
+_TYPE_DESCS = ('premium_rate', 'toll_free', 'shared_cost', 'voip', 'personal_number', 'pager',
+               'uan', 'voicemail', 'fixed_line', 'mobile')
+
+def _compile_desc(desc):
+    if desc is None or not desc.national_number_pattern:
+        return None
+    return re.compile(desc.national_number_pattern), frozenset(desc.possible_length or ())
+
+def _matches(national_number, compiled):
+    pattern, lengths = compiled
+    if lengths and len(national_number) not in lengths:
+        return False
+    return pattern.fullmatch(national_number) is not None
+
+class PhoneNormalizer:
+    def __init__(self, region="US", policy="international"):
+        region = region.upper()
+        if region not in phonenumbers.SUPPORTED_REGIONS:
+            raise ValueError(f"Unknown region '{region}'")
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown policy '{policy}'. Available: {', '.join(POLICIES)}")
+        self.region = region
+        self.policy = policy
+        self.country_code = phonenumbers.country_code_for_region(region)
+        self._country_prefix = str(self.country_code)
+        self._build_fast_path()
+
+    def _build_fast_path(self):
+        metadata = PhoneMetadata.metadata_for_region(self.region)
+        regions = COUNTRY_CODE_TO_REGION_CODE.get(self.country_code, ())
+        # phonenumbers attributes a number to the first region of its country code that claims it;
+        # only when that is always this region is "valid here" the same as "valid"
+        self.fast_path = bool(regions) and regions[0] == self.region and \
+            (len(regions) == 1 or metadata.leading_digits is None)
+        if not self.fast_path:
+            return
+        self._general = _compile_desc(metadata.general_desc)
+        self._types = [c for c in (_compile_desc(getattr(metadata, name)) for name in _TYPE_DESCS) if c]
+        # Inputs starting with an international or national prefix are left to phonenumbers
+        self._idd = re.compile(metadata.international_prefix) if metadata.international_prefix else None
+        prefix = metadata.national_prefix_for_parsing or metadata.national_prefix
+        self._national_prefix = re.compile(prefix) if prefix else None
+        if self._general is None:
+            self.fast_path = False
+
+    def _fast_valid(self, digits):
+        """
+        Returns the national number if `digits` is certainly a valid local number of this region, else None.
+        """
+        if digits.startswith('00') or digits.startswith(self._country_prefix):
+            return None
+        if self._idd is not None and self._idd.match(digits):
+            return None
+        if self._national_prefix is not None and self._national_prefix.match(digits):
+            return None
+        if not _matches(digits, self._general):
+            return None
+        if any(_matches(digits, compiled) for compiled in self._types):
+            return digits
+        return None
+
+    def normalize(self, phone_str):
+        if not phone_str:
+            return ""
+
+        # Ensure input is string
+        if not isinstance(phone_str, str):
+            phone_str = str(phone_str)
+
+        cleaned = phone_str.strip()
+
+        if self.fast_path and _PLAIN_LOCAL.fullmatch(cleaned):
+            national = self._fast_valid(_NON_DIGIT.sub('', cleaned))
+            if national is not None:
+                if self.policy == 'national':
+                    return national
+                return self._country_prefix + national
+
+        # Country code written out: '+...' or '00...' (common international prefix, read as '+')
+        explicit_country_code = cleaned.startswith('+') or cleaned.startswith('00')
+        if cleaned.startswith('00'):
+            cleaned = '+' + cleaned[2:]
+
+        try:
+            parsed_number = phonenumbers.parse(cleaned, self.region)
+
+            # Check validity to avoid coercing unrelated numbers (e.g. Aus 04...) into this region's format
+            if phonenumbers.is_valid_number(parsed_number):
+                digits = phonenumbers.format_number(parsed_number, phonenumbers.PhoneNumberFormat.E164).lstrip('+')
+                if (self.policy == 'national' and parsed_number.country_code == self.country_code
+                        and not explicit_country_code):
+                    return digits[len(self._country_prefix):]
+                return digits
+            # Invalid for this region (and no country code making it valid otherwise):
+            # raw digits. Better to have "04..." than "+104..."
+            return _NON_DIGIT.sub('', phone_str)
+        except phonenumbers.NumberParseException:
+            # Fallback: simple digit extraction
+            return _NON_DIGIT.sub('', phone_str)
+
+@lru_cache(maxsize=64)
+def get_normalizer(region=None, policy="international"):
+    """
+    Cached normalizer per (region, policy); region defaults to config.DEFAULT_REGION.
+    Raises ValueError for an unknown region or policy.
+    """
+    return PhoneNormalizer(region or config.DEFAULT_REGION, policy or "international")
+
+def normalize_phone(phone_str, region=None, policy="international"):
+    return get_normalizer(region, policy).normalize(phone_str)
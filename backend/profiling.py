@@ -0,0 +1,222 @@
+import asyncio
+import contextvars
+import fnmatch
+import os
+import sys
+import threading
+import time
+import tracemalloc
+import weakref
+from collections import Counter
+
+from starlette.concurrency import run_in_threadpool as _run_in_threadpool
+
+import config
+
+# On-demand, in-process profiling for the admin endpoints (see main.py, ACE_ADMIN_TOKEN).
+#
+# CPU: a sampler thread reads every thread's current stack (sys._current_frames) every few
+# milliseconds for the requested window and counts identical stacks. Output is in the "folded"
+# format of flamegraph.pl / speedscope / inferno: "tag;frame;frame;... count" per line, where the
+# tag is the request ("POST /extract") the sampled code was working for, or the thread name.
+# Tags come from ProfilingMiddleware (the request's asyncio task on the event loop thread) and
+# run_in_threadpool below (worker threads running a request's blocking calls).
+#
+# Memory: tracemalloc runs for the window only, and the allocations made during it that are
+# still alive at its end are grouped by the innermost frame in the given files (main.py,
+# extractor.py and ocr_engine.py by default).
+#
+# When no session is running, the middleware and run_in_threadpool do a single flag check and
+# nothing else, and tracemalloc is off.
+
+request_tag = contextvars.ContextVar('request_tag', default=None)
+
+DEFAULT_FILES = ("main.py", "extractor.py", "ocr_engine.py")
+
+class ProfilerBusy(Exception):
+    pass
+
+class CPUProfiler:
+    def __init__(self):
+        self.active = False
+        self._lock = threading.Lock()
+        # Tags of threads / event loop tasks currently working for a request, while active
+        self._thread_tags = {}
+        self._task_tags = weakref.WeakKeyDictionary()
+
+    def sample(self, seconds, interval, loop=None, loop_thread=None):
+        """
+        Samples all threads every `interval` seconds for `seconds`. Blocks; returns
+        (Counter of (tag, frames) -> samples, number of sampling rounds).
+        loop / loop_thread: the event loop and its thread, to tag samples by the running task.
+        """
+        with self._lock:
+            if self.active:
+                raise ProfilerBusy("A CPU profile is already running")
+            self.active = True
+        own_thread = threading.get_ident()
+        counts = Counter()
+        rounds = 0
+        try:
+            deadline = time.monotonic() + seconds
+            while time.monotonic() < deadline:
+                names = {thread.ident: thread.name for thread in threading.enumerate()}
+                for ident, frame in sys._current_frames().items():
+                    if ident == own_thread:
+                        continue
+                    tag = self._thread_tags.get(ident)
+                    if tag is None and ident == loop_thread and loop is not None:
+                        task = asyncio.current_task(loop)
+                        tag = self._task_tags.get(task) if task is not None else None
+                    counts[(tag or names.get(ident, str(ident)), stack_of(frame))] += 1
+                rounds += 1
+                time.sleep(interval)
+        finally:
+            self.active = False
+            self._thread_tags.clear()
+            self._task_tags.clear()
+        return counts, rounds
+
+def stack_of(frame):
+    """
+    Frames from the outermost to the innermost, as "file.py:function".
+    """
+    frames = []
+    while frame is not None:
+        code = frame.f_code
+        frames.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+        frame = frame.f_back
+    frames.reverse()
+    return tuple(frames)
+
+def folded(counts, tag=None):
+    """
+    flamegraph.pl input: one "tag;frame;...;frame count" line per distinct stack.
+    """
+    lines = [f"{stack_tag};{';'.join(frames)} {count}"
+             for (stack_tag, frames), count in counts.most_common()
+             if tag is None or stack_tag == tag]
+    return "\n".join(lines) + "\n"
+
+def top_functions(counts, limit=20, tag=None):
+    """
+    Functions by samples on top of the stack (self) and anywhere in it (total).
+    """
+    own = Counter()
+    total = Counter()
+    for (stack_tag, frames), count in counts.items():
+        if tag is not None and stack_tag != tag or not frames:
+            continue
+        own[frames[-1]] += count
+        for name in set(frames):
+            total[name] += count
+    return [{"function": name, "self": own[name], "total": count} for name, count in total.most_common(limit)]
+
+profiler = CPUProfiler()
+
+class ProfilingMiddleware:
+    """
+    Tags requests while a CPU profile is running. Pure ASGI, so the endpoint runs in the same
+    task as this middleware.
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if not profiler.active or scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        tag = f"{scope['method']} {scope['path']}"
+        token = request_tag.set(tag)
+        task = asyncio.current_task()
+        profiler._task_tags[task] = tag
+        try:
+            return await self.app(scope, receive, send)
+        finally:
+            profiler._task_tags.pop(task, None)
+            request_tag.reset(token)
+
+def _run_tagged(tag, func, args, kwargs):
+    ident = threading.get_ident()
+    profiler._thread_tags[ident] = tag
+    try:
+        return func(*args, **kwargs)
+    finally:
+        profiler._thread_tags.pop(ident, None)
+
+async def run_in_threadpool(func, *args, **kwargs):
+    """
+    starlette's run_in_threadpool; while a CPU profile runs, the worker thread's samples are
+    tagged with the calling request.
+    """
+    if not profiler.active:
+        return await _run_in_threadpool(func, *args, **kwargs)
+    tag = request_tag.get()
+    if tag is None:
+        return await _run_in_threadpool(func, *args, **kwargs)
+    return await _run_in_threadpool(_run_tagged, tag, func, args, kwargs)
+
+_memory_lock = threading.Lock()
+
+def trace_memory(seconds, files=DEFAULT_FILES, limit=20):
+    """
+    Traces allocations for `seconds` (blocks). Returns the top allocation sites in `files`
+    (basenames or patterns, "*" for all) of memory allocated during the window and still alive.
+    """
+    if not _memory_lock.acquire(blocking=False):
+        raise ProfilerBusy("A memory trace is already running")
+    try:
+        # Leave tracing on afterwards if it was started elsewhere (e.g. PYTHONTRACEMALLOC)
+        started_here = not tracemalloc.is_tracing()
+        if started_here:
+            tracemalloc.start(config.PROFILE_TRACEMALLOC_FRAMES)
+        try:
+            before = tracemalloc.take_snapshot()
+            time.sleep(seconds)
+            after = tracemalloc.take_snapshot()
+            traced, peak = tracemalloc.get_traced_memory()
+        finally:
+            if started_here:
+                tracemalloc.stop()
+    finally:
+        _memory_lock.release()
+
+    patterns = ["*"] if "*" in files else [f"*{os.sep}{name}" for name in files]
+    filters = [tracemalloc.Filter(True, pattern, all_frames=True) for pattern in patterns]
+    diff = after.filter_traces(filters).compare_to(before.filter_traces(filters), 'traceback')
+
+    sites = {}
+    for stat in diff:
+        if stat.size_diff <= 0:
+            continue
+        frames = list(stat.traceback) # Innermost first
+        site = next((f for f in frames if any(fnmatch.fnmatch(f.filename, p) for p in patterns)), frames[0])
+        # The outermost main.py function: the endpoint the allocation was made for
+        endpoint = next((f for f in reversed(frames) if os.path.basename(f.filename) == "main.py"), None)
+        key = (site.filename, site.lineno)
+        entry = sites.setdefault(key, {"file": os.path.basename(site.filename), "line": site.lineno,
+                                       "size_diff": 0, "count_diff": 0, "endpoints": Counter()})
+        entry["size_diff"] += stat.size_diff
+        entry["count_diff"] += stat.count_diff
+        if endpoint is not None:
+            entry["endpoints"][endpoint.lineno] += stat.size_diff
+
+    top = sorted(sites.values(), key=lambda entry: entry["size_diff"], reverse=True)[:limit]
+    for entry in top:
+        entry["endpoints"] = [_function_at(line) for line, _ in entry["endpoints"].most_common(3)]
+    return {"seconds": seconds, "traced_bytes": traced, "peak_bytes": peak, "sites": top}
+
+def _function_at(main_line):
+    # tracemalloc frames have no function names: find the main.py function containing the line
+    import main
+    import inspect
+    best = None
+    for name, func in inspect.getmembers(main, inspect.isfunction):
+        if getattr(func, '__module__', None) != 'main':
+            continue
+        try:
+            lines, start = inspect.getsourcelines(func)
+        except (OSError, TypeError):
+            continue
+        if start <= main_line < start + len(lines):
+            best = name
+    return best or f"main.py:{main_line}"
@@ -0,0 +1,64 @@
+import unicodedata
+
+import phonenumbers
+
+from extractor import extractor
+
+# Quality score of an OCR pass's contacts, used by /extract to stop trying strategies once a
+# result is good enough (config.EXTRACT_MIN_QUALITY, ?min_quality=).
+#
+# Per contact, 0..1:
+#   0.4 x OCR confidence of the phone box(es)
+#   0.3 x phone validity: 1 if phonenumbers considers it valid, 0.5 if it merely has a plausible
+#         length (7-15 digits), else 0
+#   0.3 x name plausibility: 0 for no name; name-like text scores 0.5, plus 0.25 if every word
+#         is capitalized (or in a script without case), plus 0.25 if it is 2-3 words of letters
+# A pass scores the mean over its named contacts: numbers without a name next to them (a company
+# line, a fax number) don't pull a good card below the threshold. On a page without any names
+# the name weight is left out, so a clean read of bare numbers still scores ~0.95. 0 without
+# contacts.
+
+WEIGHTS = (0.4, 0.3, 0.3)
+
+def phone_validity(phone):
+    if not phone:
+        return 0.0
+    try:
+        if phonenumbers.is_valid_number(phonenumbers.parse('+' + phone)):
+            return 1.0
+    except phonenumbers.NumberParseException:
+        pass
+    return 0.5 if 7 <= len(phone) <= 15 else 0.0
+
+def name_plausibility(name):
+    if not name or name in ("Unknown", "No contact found") or not extractor.looks_like_name(name):
+        return 0.0
+    words = name.split()
+    score = 0.5
+    # First letter upper case, or a script without case (Devanagari, Arabic, ...)
+    if all(w[0].isupper() or w[0].upper() == w[0].lower() for w in words):
+        score += 0.25
+    # Combining marks (e.g. Devanagari vowel signs) are part of letters
+    letters = sum(c.isalpha() or unicodedata.category(c).startswith('M') for w in words for c in w)
+    if 2 <= len(words) <= 3 and letters >= 0.9 * sum(len(w) for w in words):
+        score += 0.25
+    return score
+
+def contact_score(contact, named=True):
+    """
+    named=False scores the OCR confidence and phone validity only (pages without names).
+    """
+    confidence = min(max(float(contact.confidence), 0.0), 1.0)
+    ocr_weight, phone_weight, name_weight = WEIGHTS
+    score = ocr_weight * confidence + phone_weight * phone_validity(contact.phone)
+    if not named:
+        return score / (ocr_weight + phone_weight)
+    return score + name_weight * name_plausibility(contact.name)
+
+def result_score(contacts):
+    if not contacts:
+        return 0.0
+    named = [c for c in contacts if name_plausibility(c.name)]
+    if named:
+        return sum(contact_score(c) for c in named) / len(named)
+    return sum(contact_score(c, named=False) for c in contacts) / len(contacts)
@@ -0,0 +1,99 @@
+import time
+import threading
+from collections import OrderedDict
+
+# Readers (OCR backends) keyed by language set.
+#
+# Loading every language into one reader is slow and makes every OCR pass slower, so each
+# language set gets its own reader, created on first use. At most max_readers stay resident;
+# the least recently used one is dropped when another is loaded. The default language set is
+# loaded eagerly (shared copy-on-write by gunicorn workers) and never evicted.
+
+def _rss_bytes():
+    try:
+        import resource
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * resource.getpagesize()
+    except (OSError, ImportError, ValueError, IndexError):
+        return None
+
+def language_key(languages, base_languages=()):
+    """
+    Canonical reader key: sorted, de-duplicated, always including the base languages.
+    """
+    return tuple(sorted(set(languages) | set(base_languages)))
+
+class ReaderPool:
+    def __init__(self, factory, max_readers=2, pinned=()):
+        # factory(languages list) -> backend
+        self.factory = factory
+        self.max_readers = max(1, max_readers)
+        self.pinned = set(pinned)
+        self._readers = OrderedDict()
+        self._metrics = {}
+        self._lock = threading.Lock()
+        # One lock per key being loaded, so concurrent requests for a new language load it once
+        self._loading = {}
+
+    def get(self, key):
+        with self._lock:
+            if key in self._readers:
+                self._readers.move_to_end(key)
+                self._metrics[key]['uses'] += 1
+                return self._readers[key]
+            load_lock = self._loading.setdefault(key, threading.Lock())
+
+        with load_lock:
+            with self._lock:
+                if key in self._readers:
+                    self._readers.move_to_end(key)
+                    self._metrics[key]['uses'] += 1
+                    return self._readers[key]
+
+            print(f"Loading OCR reader for languages {list(key)}...")
+            rss_before = _rss_bytes()
+            started = time.perf_counter()
+            try:
+                reader = self.factory(list(key))
+            except Exception:
+                with self._lock:
+                    self._loading.pop(key, None)
+                raise
+            load_seconds = time.perf_counter() - started
+            rss_after = _rss_bytes()
+            model_bytes = getattr(reader, 'model_bytes', lambda: None)()
+
+            with self._lock:
+                self._loading.pop(key, None)
+                self._readers[key] = reader
+                self._metrics[key] = {
+                    'load_seconds': round(load_seconds, 3),
+                    'model_mb': None if model_bytes is None else round(model_bytes / (1024 * 1024), 1),
+                    # Process RSS growth while loading; approximate if other work ran meanwhile
+                    'rss_delta_mb': None if rss_before is None or rss_after is None
+                                    else round((rss_after - rss_before) / (1024 * 1024), 1),
+                    'uses': 1,
+                    'loaded_at': time.time(),
+                }
+                self._evict(keep=key)
+            print(f"OCR reader for {list(key)} loaded in {load_seconds:.1f}s")
+            return reader
+
+    def _evict(self, keep):
+        # Least recently used first; pinned readers and the one just loaded stay
+        for key in list(self._readers):
+            if len(self._readers) <= self.max_readers:
+                break
+            if key in self.pinned or key == keep:
+                continue
+            del self._readers[key]
+            del self._metrics[key]
+            print(f"Evicted OCR reader for languages {list(key)}")
+
+    def stats(self):
+        with self._lock:
+            return {
+                'max_readers': self.max_readers,
+                'readers': [dict(self._metrics[key], languages=list(key), pinned=key in self.pinned)
+                            for key in self._readers],
+            }
@@ -0,0 +1,135 @@
+import json
+
+try:
+    import orjson
+except ImportError: # Optional: falls back to the standard library encoder
+    orjson = None
+
+# Records passed through the /extract pipeline, and the two response layouts built from them.
+#
+# A batch can yield many thousands of contacts, so these are slotted objects rather than dicts:
+# the extractor creates one Contact per number, and each /extract row refers to its Contact
+# instead of copying the fields into a new dict. Dicts are only built when serializing the
+# default (row) layout.
+#
+# Columnar layout (/extract?format=columnar): one array per field, with filenames stored once in
+# a table and rows pointing into it:
+#   {"format": "columnar", "filenames": ["a.png", ...],
+#    "rows": {"file": [0, 0, 1], "page": [null, null, 2], "name": [...], "phone": [...],
+#             "confidence": [...], "strategy": [...], "quality": [...], "cut_short": [...]},
+#    "errors": [{"file": 2, "error": "..."}], "cut_short": [...]}
+
+class Contact:
+    """
+    One phone number found in an image, with the name linked to it.
+    Also readable like a dict (contact['phone']) for older callers.
+    """
+    __slots__ = ('name', 'phone', 'confidence', 'raw_phone', 'raw_text')
+
+    def __init__(self, name, phone, confidence, raw_phone="", raw_text=""):
+        self.name = name
+        self.phone = phone
+        self.confidence = confidence
+        self.raw_phone = raw_phone
+        self.raw_text = raw_text
+
+    def __getitem__(self, key):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key, default=None):
+        return getattr(self, key, default) if key in self.__slots__ else default
+
+    def to_dict(self):
+        return {key: getattr(self, key) for key in self.__slots__}
+
+    def __repr__(self):
+        return f"Contact(name={self.name!r}, phone={self.phone!r}, confidence={self.confidence!r})"
+
+class ResultRow:
+    """
+    One row of the /extract response: a contact of a file, a file without contacts
+    (contact None) or a file that failed (error set). For multi-page files, one page's.
+    """
+    __slots__ = ('filename', 'contact', 'strategy', 'cut_short', 'error', 'quality', 'page')
+
+    def __init__(self, filename, contact=None, strategy=None, cut_short=False, error=None, quality=0.0,
+                 page=None):
+        self.filename = filename
+        # 1-based page of a multi-page TIFF / animated image, None for single images
+        self.page = page
+        self.contact = contact
+        self.strategy = strategy
+        self.cut_short = cut_short
+        self.error = error
+        # Quality score of the OCR pass the contact came from (see quality.py)
+        self.quality = quality
+
+    @property
+    def name(self):
+        return self.contact.name if self.contact is not None else "No contact found"
+
+    @property
+    def phone(self):
+        return self.contact.phone if self.contact is not None else ""
+
+    @property
+    def confidence(self):
+        return self.contact.confidence if self.contact is not None else 0.0
+
+    def to_dict(self):
+        if self.error is not None:
+            return {"filename": self.filename, "error": self.error, "status": "failed"}
+        row = {
+            "filename": self.filename,
+            "name": self.name,
+            "phone": self.phone,
+            "confidence": self.confidence,
+            "strategy": self.strategy,
+            "quality": round(self.quality, 3),
+            "cut_short": self.cut_short,
+        }
+        if self.page is not None:
+            row["page"] = self.page
+        return row
+
+def rows_payload(rows):
+    return [row.to_dict() for row in rows]
+
+def columnar_payload(rows):
+    """
+    Returns (filenames, columns, errors) for the columnar layout.
+    """
+    file_ids = {}
+    columns = {"file": [], "page": [], "name": [], "phone": [], "confidence": [], "strategy": [],
+               "quality": [], "cut_short": []}
+    errors = []
+    for row in rows:
+        file_id = file_ids.setdefault(row.filename, len(file_ids))
+        if row.error is not None:
+            errors.append({"file": file_id, "error": row.error})
+            continue
+        columns["file"].append(file_id)
+        columns["page"].append(row.page)
+        columns["name"].append(row.name)
+        columns["phone"].append(row.phone)
+        columns["confidence"].append(row.confidence)
+        columns["strategy"].append(row.strategy)
+        columns["quality"].append(round(row.quality, 3))
+        columns["cut_short"].append(row.cut_short)
+    return list(file_ids), columns, errors
+
+def _default(value):
+    # numpy scalars (e.g. float32 confidences) in the standard library fallback
+    if hasattr(value, 'item'):
+        return value.item()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def dumps(payload):
+    """
+    JSON bytes, with orjson when installed (several times faster than json.dumps).
+    """
+    if orjson is not None:
+        return orjson.dumps(payload, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(payload, separators=(',', ':'), default=_default).encode()
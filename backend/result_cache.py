@@ -0,0 +1,124 @@
+import hashlib
+import json
+import os
+import tempfile
+
+import phonenumbers
+
+import config
+
+# Disk-backed cache of /process-dataset results.
+#
+# Analysts upload the same export many times a day; parsing, normalizing and rendering the Excel
+# output is the expensive part. Results are stored as files named after their key: a SHA-256 of
+# the upload content plus the processing options (and the versions that affect the output), so
+# the key doubles as the response ETag.
+#
+# The directory is the only state, so gunicorn workers share it. Reads bump a file's mtime and
+# writes evict the least recently used files (oldest mtime) until the cache is within
+# DATASET_CACHE_MAX_SIZE. Writes go through a temp file and rename, so readers never see a
+# partial result.
+
+# Bump when the /process-dataset output changes for the same input and options
+CACHE_VERSION = 2
+_CHUNK_SIZE = 1024 * 1024
+
+def cache_key(source, options):
+    """
+    Hex key for an upload's content (bytes or memory map, see uploads.open_upload) and options.
+    """
+    digest = hashlib.sha256()
+    view = memoryview(source)
+    try:
+        for start in range(0, len(view), _CHUNK_SIZE):
+            digest.update(view[start:start + _CHUNK_SIZE])
+    finally:
+        view.release()
+    settings = {"options": options, "version": CACHE_VERSION, "phonenumbers": phonenumbers.__version__}
+    digest.update(json.dumps(settings, sort_keys=True, default=str).encode())
+    return digest.hexdigest()
+
+def etag_matches(if_none_match, etag):
+    """
+    True if an If-None-Match header value lists etag. Weak validators match too. "*" does not:
+    the results are computed by a POST, so the client cannot hold one it never received.
+    """
+    if not if_none_match:
+        return False
+    return any(candidate.strip().removeprefix("W/") == etag for candidate in if_none_match.split(","))
+
+class ResultCache:
+    def __init__(self, directory, max_size):
+        self.directory = directory
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + ".bin")
+
+    def get(self, key):
+        """
+        The stored result bytes, or None.
+        """
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            # Most recently used
+            os.utime(path)
+        except OSError:
+            # Missing, or evicted by another worker meanwhile
+            self.misses += 1
+            return None
+        self.hits += 1
+        return data
+
+    def put(self, key, data):
+        if len(data) > self.max_size:
+            return
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, self._path(key))
+        except OSError as e:
+            print(f"Could not write dataset cache entry: {e}")
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            return
+        self._evict()
+
+    def _evict(self):
+        entries = []
+        total = 0
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if not entry.name.endswith(".bin"):
+                    continue
+                try:
+                    st = entry.stat()
+                except OSError:
+                    continue
+                entries.append((st.st_mtime_ns, st.st_size, entry.path))
+                total += st.st_size
+        # Least recently used first
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_size:
+                break
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+            total -= size
+
+    def stats(self):
+        entries = [entry.stat().st_size for entry in os.scandir(self.directory) if entry.name.endswith(".bin")]
+        return {"entries": len(entries), "size": sum(entries), "max_size": self.max_size,
+                "hits": self.hits, "misses": self.misses}
+
+dataset_cache = ResultCache(config.DATASET_CACHE_DIR, config.DATASET_CACHE_MAX_SIZE) if config.DATASET_CACHE else None
@@ -0,0 +1,243 @@
+import heapq
+import itertools
+import threading
+import time
+
+import config
+
+# Weighted fair scheduling of OCR calls (see concurrency.py).
+#
+# Every OCR call (one strategy pass over one file or page) waits here for one of the
+# OCR_MAX_CONCURRENT slots. Waiting calls are ordered by start-time fair queuing instead of
+# arrival: each client (or request, SCHEDULER_FAIRNESS) has a virtual finish time that grows by
+# the OCR seconds it used divided by its weight, and the call with the smallest start tag goes
+# next. A tenant uploading 500 screenshots therefore gets its share of the slots, but a client
+# arriving with one business card is served next instead of after the batch.
+#
+# Requests with at most SCHEDULER_INTERACTIVE_FILES files go to the interactive lane, which is
+# served before the batch lane; after SCHEDULER_PRIORITY_BURST interactive calls in a row one
+# waiting batch call goes through, so batches are slowed down but never starved.
+#
+# Speculative calls (see speculation.py) never wait: try_acquire() only grants a slot that nobody
+# is waiting for, and as soon as a regular call has to wait, running speculative calls are asked
+# to stop (their cancel event is set) so the slot comes back at their next checkpoint.
+
+INTERACTIVE = 'interactive'
+BATCH = 'batch'
+LANES = (INTERACTIVE, BATCH)
+
+def parse_weights(spec):
+    """
+    "tenant-a=4,tenant-b=0.5" -> {"tenant-a": 4.0, "tenant-b": 0.5}
+    """
+    weights = {}
+    for item in (spec or "").split(","):
+        if "=" in item:
+            key, value = item.split("=", 1)
+            try:
+                weight = float(value)
+            except ValueError:
+                continue
+            if weight > 0:
+                weights[key.strip()] = weight
+    return weights
+
+class Job:
+    """
+    One request's OCR work: its client key, lane and weight, plus the time its calls spent
+    queued and running.
+    """
+    __slots__ = ('key', 'lane', 'weight', 'queue_seconds', 'ocr_seconds', 'calls', 'speculative_calls')
+
+    def __init__(self, key, lane=BATCH, weight=1.0):
+        self.key = key
+        self.lane = lane
+        self.weight = weight
+        self.queue_seconds = 0.0
+        self.ocr_seconds = 0.0
+        self.calls = 0
+        # Of the calls, those run ahead on spare slots (see speculation.py)
+        self.speculative_calls = 0
+
+    def timing(self):
+        return {"lane": self.lane, "ocr_calls": self.calls, "queue_seconds": round(self.queue_seconds, 3),
+                "ocr_seconds": round(self.ocr_seconds, 3), "speculative_calls": self.speculative_calls}
+
+class Grant:
+    """
+    One queued OCR call; returned by acquire() once it may run.
+    """
+    __slots__ = ('start', 'seq', 'job', 'charge', 'waited', 'granted', 'cancel', 'abandon', 'withdrawn')
+
+    def __init__(self, start, seq, job, charge):
+        self.start = start
+        self.seq = seq
+        self.job = job
+        # Provisional cost charged at acquire(), replaced by the real one at release()
+        self.charge = charge
+        self.waited = 0.0
+        self.granted = threading.Event()
+        # Speculative grants only: set when a regular call needs the slot
+        self.cancel = None
+        # Event the caller may withdraw a queued call with (see withdraw())
+        self.abandon = None
+        self.withdrawn = False
+
+    def __lt__(self, other):
+        return (self.start, self.seq) < (other.start, other.seq)
+
+class FairScheduler:
+    """
+    Slot semaphore with weighted fair ordering of the waiters. acquire() blocks, so call it
+    from a worker thread.
+    """
+    def __init__(self, slots, priority_burst=None):
+        self.slots = slots
+        self.priority_burst = max(1, priority_burst or config.SCHEDULER_PRIORITY_BURST)
+        self._lock = threading.Lock()
+        self._free = slots
+        self._queues = {lane: [] for lane in LANES}
+        self._seq = itertools.count()
+        self._burst = 0
+        # Start-time fair queuing state: system virtual time and each key's virtual finish time
+        self._virtual_time = 0.0
+        self._finish = {}
+        self._outstanding = {}
+        self._sweep_at = 1024
+        # Smoothed OCR call duration, the provisional charge until a call's real duration is known
+        self._call_seconds = 1.0
+        self._stats = {lane: {"calls": 0, "queue_seconds": 0.0, "ocr_seconds": 0.0, "speculative": 0,
+                              "preempted": 0} for lane in LANES}
+        # Running speculative grants
+        self._speculative = set()
+
+    def _grant(self, job):
+        start = max(self._virtual_time, self._finish.get(job.key, 0.0))
+        # Charge the expected cost now so a client's concurrent calls are spread out
+        grant = Grant(start, next(self._seq), job, self._call_seconds / job.weight)
+        self._finish[job.key] = start + grant.charge
+        self._outstanding[job.key] = self._outstanding.get(job.key, 0) + 1
+        return grant
+
+    def acquire(self, job, abandon=None):
+        """
+        Blocks until job may run one OCR call. Returns its Grant (grant.waited: seconds queued),
+        or None if it was withdrawn while queued (withdraw(abandon)).
+        """
+        started = time.monotonic()
+        with self._lock:
+            grant = self._grant(job)
+            grant.abandon = abandon
+            heapq.heappush(self._queues[job.lane], grant)
+            self._dispatch()
+            if not grant.granted.is_set():
+                # Waiting: take the slots back from speculative calls
+                for running in self._speculative:
+                    if not running.cancel.is_set():
+                        running.cancel.set()
+                        self._stats[running.job.lane]["preempted"] += 1
+        grant.granted.wait()
+        if grant.withdrawn:
+            return None
+        grant.waited = time.monotonic() - started
+        with self._lock:
+            self._stats[job.lane]["queue_seconds"] += grant.waited
+        return grant
+
+    def try_acquire(self, job, keep_free=0):
+        """
+        A speculative call's Grant if a slot is free that no call is waiting for, with more than
+        keep_free slots free; None otherwise. Never blocks. Its grant.cancel is set once a regular
+        call has to wait; release() it as usual.
+        """
+        with self._lock:
+            if self._free <= keep_free or any(self._queues.values()):
+                return None
+            grant = self._grant(job)
+            grant.cancel = threading.Event()
+            self._free -= 1
+            self._virtual_time = max(self._virtual_time, grant.start)
+            self._speculative.add(grant)
+            self._stats[job.lane]["speculative"] += 1
+            grant.granted.set()
+            return grant
+
+    def withdraw(self, abandon):
+        """
+        Drops the queued calls acquired with this abandon event; their acquire() returns None.
+        Calls already granted are not affected.
+        """
+        with self._lock:
+            for queue in self._queues.values():
+                withdrawn = [grant for grant in queue if grant.abandon is abandon]
+                if not withdrawn:
+                    continue
+                queue[:] = [grant for grant in queue if grant.abandon is not abandon]
+                heapq.heapify(queue)
+                for grant in withdrawn:
+                    # Nothing ran: take back the provisional charge
+                    self._settle(grant, 0.0)
+                    grant.withdrawn = True
+                    grant.granted.set()
+
+    def _settle(self, grant, seconds):
+        job = grant.job
+        self._finish[job.key] = self._finish.get(job.key, 0.0) + seconds / job.weight - grant.charge
+        self._outstanding[job.key] -= 1
+        if not self._outstanding[job.key]:
+            del self._outstanding[job.key]
+            # A key at or behind virtual time gains nothing from its finish time: forget it,
+            # so per-request keys don't accumulate
+            if self._finish[job.key] <= self._virtual_time:
+                del self._finish[job.key]
+        if len(self._finish) > self._sweep_at:
+            self._finish = {key: finish for key, finish in self._finish.items()
+                            if finish > self._virtual_time or key in self._outstanding}
+            self._sweep_at = max(1024, 2 * len(self._finish))
+
+    def release(self, grant, seconds):
+        """
+        Frees the slot and charges the call's actual duration to the job's key.
+        """
+        job = grant.job
+        with self._lock:
+            self._free += 1
+            self._speculative.discard(grant)
+            self._settle(grant, seconds)
+            self._call_seconds = 0.8 * self._call_seconds + 0.2 * seconds
+            stats = self._stats[job.lane]
+            stats["calls"] += 1
+            stats["ocr_seconds"] += seconds
+            self._dispatch()
+
+    def _dispatch(self):
+        while self._free:
+            interactive, batch = self._queues[INTERACTIVE], self._queues[BATCH]
+            if interactive and (not batch or self._burst < self.priority_burst):
+                queue = interactive
+                self._burst = self._burst + 1 if batch else 0
+            elif batch:
+                queue = batch
+                self._burst = 0
+            else:
+                return
+            grant = heapq.heappop(queue)
+            self._free -= 1
+            self._virtual_time = max(self._virtual_time, grant.start)
+            grant.granted.set()
+
+    def stats(self):
+        with self._lock:
+            lanes = {}
+            for lane in LANES:
+                stats = self._stats[lane]
+                calls = stats["calls"] or 1
+                lanes[lane] = {
+                    "waiting": len(self._queues[lane]),
+                    "calls": stats["calls"],
+                    "avg_queue_seconds": round(stats["queue_seconds"] / calls, 3),
+                    "avg_ocr_seconds": round(stats["ocr_seconds"] / calls, 3),
+                    "speculative": stats["speculative"],
+                    "preempted": stats["preempted"],
+                }
+            return {"lanes": lanes, "active_keys": len(self._outstanding), "speculative_running": len(self._speculative)}
@@ -0,0 +1,108 @@
+import asyncio
+import threading
+import time
+
+from concurrency import ocr_concurrency
+from profiling import run_in_threadpool
+
+# Speculative strategy racing for /extract (?speculative=N, config.EXTRACT_SPECULATIVE).
+#
+# The strategy loop runs one OCR pass after another, so a file that only reads well with its
+# fourth strategy pays four OCR latencies in a row. With speculation, while the loop waits for a
+# pass, up to N of the following strategies run at the same time on spare OCR slots
+# (OCRConcurrency.speculate: never while calls are queued or the machine is loaded). Passes are
+# scored as they finish, whichever order that is in; the first one reaching min_quality wins and
+# the passes still running are cancelled.
+#
+# Cancelling cannot interrupt an OCR call, so calls check their cancel event between
+# preprocessing, detection and recognition (ocr_engine.process_image_with_strategy) and give
+# their slot back at the next checkpoint; calls still queued for a slot are withdrawn. close()
+# waits for all of them: they read the upload, which is closed once the file is done. The
+# scheduler sets the same event on speculative calls as soon as a regular call has to wait for a
+# slot (see scheduler.py); such a pass is dropped and run again, regularly, when the loop reaches
+# its strategy.
+
+class StrategyRace:
+    """
+    OCR passes of one file (or page). ocr(strategy=..., cancel=...) is the blocking OCR call.
+    """
+    def __init__(self, job, width, ocr):
+        self.job = job
+        self.width = width
+        self.ocr = ocr
+        self._tasks = {}
+        self._cancels = {}
+        self._speculative = set()
+
+    def _start(self, strategy, grant=None):
+        cancel = grant.cancel if grant is not None else threading.Event()
+
+        async def run():
+            started = time.monotonic()
+            if grant is None:
+                results = await run_in_threadpool(ocr_concurrency.run_job, self.job, self.ocr,
+                                                  strategy=strategy, cancel=cancel)
+            else:
+                results = await run_in_threadpool(ocr_concurrency.run_granted, self.job, grant, self.ocr,
+                                                  strategy=strategy, cancel=cancel)
+            # A cancelled call may have stopped halfway: its results don't count
+            return None if cancel.is_set() else (results, time.monotonic() - started)
+
+        self._tasks[strategy] = asyncio.ensure_future(run())
+        self._cancels[strategy] = cancel
+        if grant is not None:
+            self._speculative.add(strategy)
+
+    def run_ahead(self, strategies):
+        """
+        Starts the first of `strategies` not started yet on spare slots, up to width running at once.
+        """
+        running = sum(1 for s in self._speculative if not self._tasks[s].done())
+        for strategy in strategies:
+            if running >= self.width:
+                return
+            if strategy in self._tasks:
+                continue
+            grant = ocr_concurrency.speculate(self.job)
+            if grant is None:
+                return
+            self._start(strategy, grant)
+            running += 1
+
+    async def wait(self, strategy):
+        """
+        Waits until the pass for `strategy` (started now if it isn't running) or any other pass
+        finishes. Returns the finished passes as [(strategy, ocr_results, seconds)]; each pass is
+        returned once. Cancelled passes are not returned and can be started again.
+        """
+        if strategy not in self._tasks:
+            self._start(strategy)
+        await asyncio.wait(self._tasks.values(), return_when=asyncio.FIRST_COMPLETED)
+        finished = []
+        for name, task in list(self._tasks.items()):
+            if not task.done():
+                continue
+            del self._tasks[name]
+            self._speculative.discard(name)
+            try:
+                outcome = task.result()
+            except Exception:
+                if name == strategy:
+                    raise
+                # Dropped: the loop runs this strategy again when it gets there
+                continue
+            if outcome is not None:
+                finished.append((name,) + outcome)
+        return finished
+
+    async def close(self):
+        """
+        Stops every pass still running and waits until they have returned, so nothing reads the
+        upload any more: running calls stop at their next checkpoint, queued ones are withdrawn.
+        """
+        for name in self._tasks:
+            self._cancels[name].set()
+            ocr_concurrency.scheduler.withdraw(self._cancels[name])
+        await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+        self._tasks.clear()
+        self._speculative.clear()
@@ -0,0 +1,129 @@
+import itertools
+import os
+
+import pandas as pd
+from openpyxl import load_workbook
+
+import config
+
+# Chunked reading of /process-dataset uploads.
+#
+# pd.read_excel builds openpyxl's full object model (every cell an object with its style) before
+# a DataFrame exists, so a 500K-row workbook needs gigabytes and minutes. .xlsx files are instead
+# read in openpyxl's read-only mode, which streams rows from the sheet XML, and turned into
+# DataFrames of DATASET_CHUNK_ROWS rows. CSVs are read in chunks of the same size, so both feed the
+# same normalize-and-dedupe loop (see main.process_dataset). Legacy .xls files still go through
+# pd.read_excel.
+#
+# Header detection (.xlsx): exports often start with a title or a few notes above the table.
+# Among the first HEADER_SCAN_ROWS rows, the header is the first row that is as wide as the
+# widest of them and contains only text. header_row (1-based) overrides it.
+
+HEADER_SCAN_ROWS = 20
+
+def select_sheet(workbook, sheet=None):
+    """
+    Worksheet by name or 0-based index (as text, from a query parameter); the first one by default.
+    """
+    if sheet is None or sheet == "":
+        return workbook.worksheets[0]
+    if sheet in workbook.sheetnames:
+        return workbook[sheet]
+    if str(sheet).isdigit() and int(sheet) < len(workbook.worksheets):
+        return workbook.worksheets[int(sheet)]
+    raise ValueError(f"Sheet '{sheet}' not found (sheets: {', '.join(workbook.sheetnames)})")
+
+def _filled(row):
+    return [value for value in row if value is not None and value != ""]
+
+def detect_header(rows):
+    """
+    Index of the header among the sampled rows (see module comment), 0 if none qualifies.
+    """
+    widths = [len(_filled(row)) for row in rows]
+    if not widths or not max(widths):
+        return 0
+    widest = max(widths)
+    for i, row in enumerate(rows):
+        if widths[i] == widest and all(isinstance(value, str) for value in _filled(row)):
+            return i
+    return 0
+
+def column_names(header):
+    """
+    Header cells as column names, pandas style: "Unnamed: 3" for blanks, "Phone.1" for repeats.
+    """
+    names = []
+    seen = {}
+    for i, value in enumerate(header):
+        name = str(value).strip() if value is not None and str(value).strip() else f"Unnamed: {i}"
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        names.append(name)
+    return names
+
+def iter_xlsx_chunks(fileobj, sheet=None, header_row=None, chunk_rows=None):
+    """
+    Yields DataFrames of up to chunk_rows rows from one sheet, reading the workbook in read-only
+    (streaming) mode. Raises ValueError for an unknown sheet.
+    """
+    chunk_rows = chunk_rows or config.DATASET_CHUNK_ROWS
+    workbook = load_workbook(fileobj, read_only=True, data_only=True)
+    try:
+        rows = select_sheet(workbook, sheet).iter_rows(values_only=True)
+
+        # Rows up to and including the header
+        sample = []
+        for row in rows:
+            sample.append(row)
+            if len(sample) >= (header_row or HEADER_SCAN_ROWS):
+                break
+        if not sample:
+            return
+        header_index = header_row - 1 if header_row else detect_header(sample)
+        if header_index >= len(sample):
+            raise ValueError(f"Header row {header_row} is beyond the end of the sheet")
+        columns = column_names(sample[header_index])
+
+        def chunk(values):
+            nonlocal columns
+            width = max(len(row) for row in values)
+            if width > len(columns):
+                # Data wider than the header
+                columns = column_names(list(columns) + [None] * (width - len(columns)))
+            return pd.DataFrame([tuple(row) + (None,) * (len(columns) - len(row)) for row in values],
+                                columns=columns)
+
+        batch = []
+        yielded = False
+        for row in itertools.chain(sample[header_index + 1:], rows):
+            if not _filled(row):
+                continue
+            batch.append(row)
+            if len(batch) >= chunk_rows:
+                yield chunk(batch)
+                yielded = True
+                batch = []
+        if batch or not yielded:
+            yield chunk(batch) if batch else pd.DataFrame(columns=columns)
+    finally:
+        workbook.close()
+
+def iter_dataset_chunks(fileobj, filename, sheet=None, header_row=None, chunk_rows=None):
+    """
+    DataFrame chunks of a CSV or Excel upload. Raises ValueError for unsupported files.
+    """
+    chunk_rows = chunk_rows or config.DATASET_CHUNK_ROWS
+    extension = os.path.splitext(filename.lower())[1]
+    if extension == '.csv':
+        header = header_row - 1 if header_row else 'infer'
+        return pd.read_csv(fileobj, chunksize=chunk_rows, header=header)
+    if extension == '.xlsx':
+        return iter_xlsx_chunks(fileobj, sheet, header_row, chunk_rows)
+    if extension == '.xls':
+        sheet_name = int(sheet) if sheet and sheet.isdigit() else (sheet or 0)
+        return iter([pd.read_excel(fileobj, sheet_name=sheet_name, header=header_row - 1 if header_row else 0)])
+    raise ValueError("Invalid file format. Please upload CSV or Excel.")
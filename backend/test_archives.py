@@ -0,0 +1,158 @@
+import io
+import tarfile
+import zipfile
+from typing import List
+import pytest
+from fastapi import FastAPI, UploadFile, File
+from fastapi.testclient import TestClient
+import main
+import analyze_screenshots
+from ocr_engine import ocr_engine
+from archives import ArchiveReader, ArchiveError
+from uploads import UploadLimitRoute, upload_limits
+
+client = TestClient(main.app)
+
+def mock_process(content, strategy='original', **kwargs):
+    # The "image" content is the contact text itself
+    name, phone = content.decode('utf-8').split('|')
+    return [([[0, 0], [100, 0], [100, 20], [0, 20]], name, 0.9),
+            ([[0, 30], [100, 30], [100, 50], [0, 50]], phone, 0.9)]
+
+def make_zip(members):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for name, data in members.items():
+            archive.writestr(name, data)
+    return buffer.getvalue()
+
+def make_tar(members, mode='w:gz'):
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode=mode) as archive:
+        for name, data in members.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            archive.addfile(info, io.BytesIO(data))
+    return buffer.getvalue()
+
+MEMBERS = {
+    "cards/a.png": b"Alice Moore|212-555-0001",
+    "cards/notes.txt": b"not an image",
+    "__MACOSX/cards/._a.png": b"resource fork",
+    "cards/b.JPG": b"Bob Stone|212-555-0002",
+}
+
+def read_all(data, filename, **limits):
+    reader = ArchiveReader(data, filename, **limits)
+    return [(m.name, m.read()) for m in reader.members()], reader.skipped
+
+def test_reads_image_members_of_zip_and_tar():
+    for data, filename in [(make_zip(MEMBERS), "cards.zip"), (make_tar(MEMBERS), "cards.tar.gz"),
+                           (make_tar(MEMBERS, 'w'), "cards.tar")]:
+        members, skipped = read_all(data, filename)
+        assert members == [("cards/a.png", MEMBERS["cards/a.png"]), ("cards/b.JPG", MEMBERS["cards/b.JPG"])]
+        assert skipped == 2
+
+def test_limits():
+    with pytest.raises(ArchiveError, match="entries"):
+        read_all(make_zip(MEMBERS), "cards.zip", max_members=3)
+    with pytest.raises(ArchiveError, match="entries"):
+        read_all(make_tar(MEMBERS), "cards.tgz", max_members=3)
+    # Highly compressible member: rejected while decompressing, not after
+    bomb = {"bomb.png": b"\0" * (5 * 1024 * 1024)}
+    with pytest.raises(ArchiveError, match="bomb.png"):
+        read_all(make_zip(bomb), "bomb.zip", max_member_size=1024 * 1024)
+    with pytest.raises(ArchiveError, match="exceeds 1.95KB"):
+        read_all(make_tar({"a.png": b"x" * 1500, "b.png": b"y" * 1500}), "ab.tar", max_total_size=2000)
+
+def test_rejects_corrupt_and_non_archives():
+    with pytest.raises(ArchiveError, match="not a ZIP or TAR"):
+        ArchiveReader(b"hello", "cards.zip")
+    with pytest.raises(ArchiveError, match="Could not read"):
+        read_all(make_zip(MEMBERS)[:200], "cards.zip")
+
+def test_extract_expands_archive_members():
+    original_method = main.ocr_engine.process_image_with_strategy
+    main.ocr_engine.process_image_with_strategy = mock_process
+    try:
+        files = [('files', ('cards.zip', make_zip(MEMBERS), 'application/zip')),
+                 ('files', ('c.png', b"Carol King|212-555-0003", 'image/png')),
+                 ('files', ('broken.zip', b"PK\x03\x04 truncated", 'application/zip'))]
+        response = client.post("/extract", files=files)
+        assert response.status_code == 200
+        results = response.json()['results']
+        assert [(r['filename'], r.get('name')) for r in results] == [
+            ("cards.zip/cards/a.png", "Alice Moore"),
+            ("cards.zip/cards/b.JPG", "Bob Stone"),
+            ("c.png", "Carol King"),
+            ("broken.zip", None),
+        ]
+        assert results[3]['status'] == "failed"
+    finally:
+        main.ocr_engine.process_image_with_strategy = original_method
+
+limits_app = FastAPI()
+limits_app.router.route_class = UploadLimitRoute
+
+@limits_app.post("/upload")
+@upload_limits(max_file_size=1000, max_archive_size=3000)
+async def upload(files: List[UploadFile] = File(...)):
+    return {"count": len(files)}
+
+def test_archives_have_their_own_upload_limit():
+    limits_client = TestClient(limits_app)
+    response = limits_client.post("/upload", files=[('files', ('a.zip', b'x' * 2000, 'application/zip'))])
+    assert response.status_code == 200
+    response = limits_client.post("/upload", files=[('files', ('a.png', b'x' * 2000, 'image/png'))])
+    assert response.status_code == 413
+    response = limits_client.post("/upload", files=[('files', ('a.zip', b'x' * 3001, 'application/zip'))])
+    assert response.status_code == 413
+
+def test_batch_mode_reads_archives(tmp_path):
+    folder = tmp_path / "shots"
+    folder.mkdir()
+    (folder / "cards.zip").write_bytes(make_zip(MEMBERS))
+    (folder / "c.png").write_bytes(b"Carol King|212-555-0003")
+    output = str(tmp_path / "out.txt")
+    manifest = output + ".manifest.jsonl"
+
+    original_method = ocr_engine.process_image_with_strategy
+    ocr_engine.process_image_with_strategy = mock_process
+    try:
+        stats = analyze_screenshots.process_folder_batch(str(folder), output, manifest, workers=1)
+        assert stats["processed"] == 3
+        with open(output) as f:
+            assert sorted(f.read().split()) == ["2125550001", "2125550002", "2125550003"]
+
+        # Members are in the manifest: a rerun skips them without OCR
+        stats = analyze_screenshots.process_folder_batch(str(folder), output, manifest, workers=1)
+        assert stats["skipped"] == 3
+        assert stats["processed"] == 0
+
+        # A single archive as --dir
+        (tmp_path / "more.tar.gz").write_bytes(make_tar({"d.png": b"Dan Ross|212-555-0004"}))
+        stats = analyze_screenshots.process_folder_batch(str(tmp_path / "more.tar.gz"), output, manifest, workers=1)
+        assert stats["processed"] == 1
+        assert stats["new_phones"] == 1
+    finally:
+        ocr_engine.process_image_with_strategy = original_method
+
+class FailingPool:
+    """
+    Pool whose tasks all fail in the worker, e.g. MemoryError: only error_callback is called.
+    """
+    def apply_async(self, fn, args, callback=None, error_callback=None):
+        if error_callback is not None:
+            error_callback(MemoryError("worker out of memory"))
+
+def test_failed_pool_tasks_do_not_stay_in_flight(tmp_path):
+    archive = tmp_path / "cards.zip"
+    archive.write_bytes(make_zip(MEMBERS))
+    output = str(tmp_path / "out.txt")
+    sink = analyze_screenshots.ResultSink(output, analyze_screenshots.Manifest(output + ".manifest.jsonl"))
+    try:
+        # Returns instead of waiting forever for results that never come
+        analyze_screenshots.process_archive_batch(str(archive), sink, FailingPool(), max_in_flight=1)
+    finally:
+        sink.close()
+    assert sink.stats["failed"] == 2
@@ -0,0 +1,97 @@
+import os
+import json
+import time
+import threading
+from ocr_engine import ocr_engine
+import analyze_screenshots
+
+def mock_process(content, strategy='original'):
+    # The "image" content is the phone text itself
+    return [ ( [[0,0],[100,0],[100,20],[0,20]], content.decode('utf-8'), 0.9 ) ]
+
+def test_batch_mode_resumes_and_appends(tmp_path):
+    folder = tmp_path / "shots"
+    folder.mkdir()
+    (folder / "a.png").write_bytes(b"(212) 555-1234")
+    (folder / "b.png").write_bytes(b"+91 99999 88888")
+    (folder / "c.png").write_bytes(b"212-555-1234") # Same number as a.png
+    (folder / "notes.txt").write_bytes(b"415-555-9999") # Not an image, ignored
+    output = str(tmp_path / "out.txt")
+    manifest = output + ".manifest.jsonl"
+
+    original_method = ocr_engine.process_image_with_strategy
+    ocr_engine.process_image_with_strategy = mock_process
+    try:
+        stats = analyze_screenshots.process_folder_batch(str(folder), output, manifest, workers=1)
+        assert stats["processed"] == 3
+        assert stats["new_phones"] == 2
+        with open(output) as f:
+            assert sorted(f.read().split()) == ["2125551234", "919999988888"]
+        with open(manifest) as f:
+            assert len(f.readlines()) == 3
+
+        # Rerun: nothing new, nothing re-processed
+        stats = analyze_screenshots.process_folder_batch(str(folder), output, manifest, workers=1)
+        assert stats["skipped"] == 3
+        assert stats["processed"] == 0
+
+        # New file and a changed file are processed; touched-but-identical content is not re-OCRed
+        (folder / "d.png").write_bytes(b"4155559999")
+        (folder / "b.png").write_bytes(b"+44 791 112 3456")
+        os.utime(folder / "a.png", ns=(1, 1))
+        stats = analyze_screenshots.process_folder_batch(str(folder), output, manifest, workers=1)
+        assert stats["processed"] == 2
+        assert stats["unchanged"] == 1
+        assert stats["skipped"] == 1
+        with open(output) as f:
+            assert sorted(f.read().split()) == ["2125551234", "4155559999", "447911123456", "919999988888"]
+    finally:
+        ocr_engine.process_image_with_strategy = original_method
+
+def test_manifest_ignores_torn_last_line(tmp_path):
+    path = str(tmp_path / "m.jsonl")
+    with open(path, "w") as f:
+        f.write(json.dumps({"path": "/x.png", "size": 1, "mtime_ns": 2, "sha256": "abc"}) + "\n")
+        f.write('{"path": "/y.png", "si')
+    manifest = analyze_screenshots.Manifest(path)
+    try:
+        assert manifest.is_unchanged("/x.png", 1, 2)
+        assert manifest.known_hash("/y.png") is None
+    finally:
+        manifest.close()
+
+def test_watch_mode_processes_new_files_incrementally(tmp_path, capsys):
+    folder = tmp_path / "inbox"
+    folder.mkdir()
+    (folder / "existing.png").write_bytes(b"(212) 555-1234")
+    output = str(tmp_path / "out.txt")
+    stop = threading.Event()
+
+    original_method = ocr_engine.process_image_with_strategy
+    ocr_engine.process_image_with_strategy = mock_process
+    try:
+        daemon = threading.Thread(target=analyze_screenshots.watch_folder,
+                                  args=(str(folder), output, output + ".manifest.jsonl"),
+                                  kwargs=dict(workers=1, debounce=0.05, polling=True, poll_interval=0.05,
+                                              stats_interval=0.1, stop_event=stop))
+        daemon.start()
+        time.sleep(0.5)
+        (folder / "new.png").write_bytes(b"+91 99999 88888")
+        (folder / "dupe.png").write_bytes(b"212-555-1234")
+
+        deadline = time.monotonic() + 5
+        phones = []
+        while time.monotonic() < deadline and len(phones) < 2:
+            time.sleep(0.05)
+            with open(output) as f:
+                phones = f.read().split()
+        stop.set()
+        daemon.join(timeout=5)
+
+        assert sorted(phones) == ["2125551234", "919999988888"]
+        out = capsys.readouterr().out
+        assert "NEW 919999988888 (new.png)" in out
+        assert "[stats]" in out
+    finally:
+        stop.set()
+        ocr_engine.process_image_with_strategy = original_method
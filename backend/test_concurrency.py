@@ -0,0 +1,44 @@
+import time
+import threading
+import pytest
+from fastapi.testclient import TestClient
+import main
+from concurrency import OCRConcurrency, OCROverloaded
+
+client = TestClient(main.app)
+
+def test_run_caps_concurrent_calls():
+    limiter = OCRConcurrency(max_concurrent=2, max_queue=10)
+    peak = [0]
+
+    def work():
+        peak[0] = max(peak[0], limiter.running)
+        time.sleep(0.05)
+
+    threads = [threading.Thread(target=limiter.run, args=(work,)) for _ in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert peak[0] == 2
+    assert limiter.stats()["running"] == 0
+
+def test_admission_rejects_beyond_queue():
+    limiter = OCRConcurrency(max_concurrent=1, max_queue=1)
+    with limiter.admit(), limiter.admit():
+        with pytest.raises(OCROverloaded) as excinfo:
+            with limiter.admit():
+                pass
+        assert excinfo.value.retry_after >= 1
+    # Slots are released again
+    with limiter.admit():
+        pass
+    assert limiter.stats()["rejected"] == 1
+
+def test_extract_returns_429_with_retry_after(monkeypatch):
+    limiter = OCRConcurrency(max_concurrent=1, max_queue=0)
+    monkeypatch.setattr(main, "ocr_concurrency", limiter)
+    with limiter.admit():
+        response = client.post("/extract", files=[('files', ('a.png', b'not an image', 'image/png'))])
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
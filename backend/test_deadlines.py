@@ -0,0 +1,81 @@
+import time
+from fastapi.testclient import TestClient
+import main
+import config
+from deadlines import Deadline, FileBudget, client_limit
+
+client = TestClient(main.app)
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def test_budget_predicts_next_pass():
+    clock = FakeClock()
+    budget = FileBudget(10, Deadline(None, clock), clock)
+    assert budget.allows('original')
+    clock.now = 3
+    budget.record('original', 3)
+    # 3s per pass, 7s left
+    assert budget.allows('enhanced')
+    # 'resized' costs 4 passes
+    assert not budget.allows('resized')
+
+def test_request_deadline_caps_file_budget():
+    clock = FakeClock()
+    request_deadline = Deadline(2, clock)
+    budget = FileBudget(10, request_deadline, clock)
+    clock.now = 2
+    assert not budget.allows('original')
+
+def test_extract_cuts_slow_file_short():
+    calls = []
+
+    def mock_process(content, strategy='original'):
+        calls.append((content.decode('utf-8'), strategy))
+        time.sleep(0.2)
+        # A low-confidence read below the quality threshold, so every strategy would normally be tried
+        return [([[0, 30], [100, 30], [100, 50], [0, 50]], "(212) 555-1234", 0.3)]
+
+    original_method = main.ocr_engine.process_image_with_strategy
+    main.ocr_engine.process_image_with_strategy = mock_process
+    try:
+        response = client.post("/extract?file_budget=0.3",
+                               files=[('files', ('slow.png', b'slow', 'image/png'))])
+        assert response.status_code == 200
+        data = response.json()
+        # The second pass would have overrun the 0.3s budget, so it never started
+        assert calls == [('slow', 'original')]
+        assert data['cut_short'] == ['slow.png']
+        assert data['results'][0]['phone'] == '12125551234'
+        assert data['results'][0]['cut_short'] is True
+    finally:
+        main.ocr_engine.process_image_with_strategy = original_method
+
+def test_clients_cannot_raise_server_limits(monkeypatch):
+    assert client_limit(1e9, 30) == 30
+    assert client_limit(5, 30) == 5
+    assert client_limit(None, 30) == 30
+    assert client_limit(1e9, 0) == 1e9
+    assert client_limit(None, 0) is None
+
+    calls = []
+
+    def mock_process(content, strategy='original'):
+        calls.append(strategy)
+        time.sleep(0.2)
+        return []
+
+    monkeypatch.setattr(config, "EXTRACT_FILE_BUDGET", 0.3)
+    original_method = main.ocr_engine.process_image_with_strategy
+    main.ocr_engine.process_image_with_strategy = mock_process
+    try:
+        data = client.post("/extract?file_budget=1000000000",
+                           files=[('files', ('slow.png', b'slow', 'image/png'))]).json()
+    finally:
+        main.ocr_engine.process_image_with_strategy = original_method
+    assert calls == ['original']
+    assert data['cut_short'] == ['slow.png']
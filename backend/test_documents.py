@@ -0,0 +1,108 @@
+from fastapi.testclient import TestClient
+import main
+import config
+from documents import document_kind, document_pages, document_boxes
+from extractor import extractor
+
+client = TestClient(main.app)
+
+VCARD = (b"BEGIN:VCARD\r\nVERSION:3.0\r\nN:Moore;Alice;;;\r\nFN:Alice Moore\r\n"
+         b"TEL;TYPE=CELL:+1 212 555 0001\r\nitem1.TEL;TYPE=WORK:(212) 555-0009\r\nEND:VCARD\r\n"
+         b"BEGIN:VCARD\r\nVERSION:2.1\r\nN;ENCODING=QUOTED-PRINTABLE;CHARSET=UTF-8:M=C3=BCller;J=\r\n"
+         b"=C3=BCrgen;;;\r\nTEL;CELL:212-555-0004\r\nEND:VCARD\r\n")
+
+HTML = (b"<!DOCTYPE html><html><head><title>Call 212-555-0000</title></head><body><h1>Our team</h1>"
+        b"<table><tr><th>Name</th><th>Phone</th></tr>"
+        b"<tr><td>Alice Moore</td><td>212-555-0001</td></tr>"
+        b"<tr><td>Bob Stone</td><td><a href='tel:%2B12125550002'>Call</a></td></tr></table>"
+        b"<p>Carol King<br>Tel: 212.555.0003</p></body></html>")
+
+TEXT = b"Contacts\n\nAlice Moore 212-555-0001\nBob Stone\t\t(212) 555-0002\nCarol King\nMobile: +1 212 555 0003\n"
+
+def make_pdf(pages):
+    """
+    Minimal PDF with a text layer: one page per list of (x, y, text), Helvetica 12pt.
+    """
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None, "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for lines in pages:
+        stream = "".join(f"BT /F1 12 Tf {x} {y} Td ({text}) Tj ET\n" for x, y, text in lines)
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}endstream")
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents {len(objects)} 0 R "
+                       f"/Resources << /Font << /F1 3 0 R >> >> >>")
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>"
+    out = "%PDF-1.4\n"
+    offsets = []
+    for i, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += f"{i} 0 obj\n{body}\nendobj\n"
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n" + "".join(f"{o:010d} 00000 n \n" for o in offsets)
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n"
+    return out.encode()
+
+PDF = make_pdf([[(72, 720, "Alice Moore"), (300, 720, "212-555-0001"), (72, 700, "Bob Stone"), (300, 700, "212-555-0002")],
+                [(72, 720, "Carol King"), (72, 705, "Mobile: 212 555 0003")]])
+
+def contacts(data, kind, page=0):
+    text = document_pages(data, kind)[page]
+    return [(c.name, c.phone) for c in extractor.extract_contacts(document_boxes(text, kind))]
+
+def test_document_kind():
+    assert document_kind("contacts.vcf", b"") == "vcard"
+    assert document_kind("export", VCARD) == "vcard"
+    assert document_kind("page", HTML) == "html"
+    assert document_kind("notes.txt", TEXT) == "text"
+    assert document_kind("scan", PDF) == "pdf"
+    # Images and unknown files go to OCR
+    assert document_kind("card.png", b"BEGIN:VCARD") is None
+    assert document_kind("card", b"\x89PNG\r\n") is None
+
+def test_formats_yield_named_contacts():
+    assert contacts(VCARD, "vcard") == [("Alice Moore", "12125550001"), ("Alice Moore", "12125550009"),
+                                        ("Jürgen Müller", "12125550004")]
+    expected = [("Alice Moore", "12125550001"), ("Bob Stone", "12125550002"), ("Carol King", "12125550003")]
+    assert contacts(HTML, "html") == expected
+    assert contacts(TEXT, "text") == expected
+    assert len(document_pages(PDF, "pdf")) == 2
+    assert contacts(PDF, "pdf", 0) + contacts(PDF, "pdf", 1) == expected
+
+def test_extract_skips_ocr_for_documents():
+    def no_ocr(content, strategy='original', **kwargs):
+        raise AssertionError("OCR called for a text document")
+
+    original_method = main.ocr_engine.process_image_with_strategy
+    main.ocr_engine.process_image_with_strategy = no_ocr
+    try:
+        files = [('files', ('contacts.vcf', VCARD, 'text/vcard')),
+                 ('files', ('team.html', HTML, 'text/html')),
+                 ('files', ('team.pdf', PDF, 'application/pdf'))]
+        data = client.post("/extract", files=files).json()
+    finally:
+        main.ocr_engine.process_image_with_strategy = original_method
+
+    rows = [(r['filename'], r['name'], r['phone'], r['strategy']) for r in data['results']]
+    # Duplicates across files are dropped as usual
+    assert rows == [
+        ("contacts.vcf", "Alice Moore", "12125550001", "text:vcard"),
+        ("contacts.vcf", "Alice Moore", "12125550009", "text:vcard"),
+        ("contacts.vcf", "Jürgen Müller", "12125550004", "text:vcard"),
+        ("team.html", "Bob Stone", "12125550002", "text:html"),
+        ("team.html", "Carol King", "12125550003", "text:html"),
+    ]
+    assert [(p['filename'], p['page'], p['contacts']) for p in data['pages']] == [("team.pdf", 1, 2), ("team.pdf", 2, 1)]
+
+def test_scanned_pdf_is_reported():
+    files = [('files', ('scan.pdf', make_pdf([[]]), 'application/pdf'))]
+    row = client.post("/extract", files=files).json()['results'][0]
+    assert "No text layer" in row['error']
+
+def test_spooled_pdf(monkeypatch):
+    # Above the spool threshold the upload is a memory map, closed once the file is done
+    monkeypatch.setattr(config, "UPLOAD_SPOOL_THRESHOLD", 100)
+    files = [('files', ('team.pdf', PDF, 'application/pdf')), ('files', ('contacts.vcf', VCARD, 'text/vcard'))]
+    response = client.post("/extract", files=files)
+    assert response.status_code == 200
+    assert [r['phone'] for r in response.json()['results']] == ["12125550001", "12125550002", "12125550003",
+                                                                "12125550009", "12125550004"]
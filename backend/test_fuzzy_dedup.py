@@ -0,0 +1,115 @@
+import io
+import pandas as pd
+from fastapi.testclient import TestClient
+import main
+from fuzzy_dedup import soundex, name_key, phone_difference, edit_distance, fuzzy_duplicates
+
+client = TestClient(main.app)
+
+def test_soundex_and_name_key():
+    assert soundex("Robert") == "R163"
+    assert soundex("Rupert") == "R163"
+    assert soundex("Ashcraft") == "A261"
+    # A dropped letter doesn't change how the name sounds here; word order is ignored
+    assert name_key("Smith John") == name_key("Jon Smith")
+    assert name_key("Unknown") is None
+    assert name_key("") is None
+
+def test_phone_difference():
+    assert phone_difference("12125551234", "12125551284") == "digit 10 read as 8 instead of 3"
+    assert phone_difference("12125551234", "2125551234") == "digit 1 (1) missing"
+    assert phone_difference("2125551234", "12125551234") == "extra digit 1 at position 1"
+    assert phone_difference("12125551234", "12125551324") == "digits 9-10 swapped"
+    assert phone_difference("12125551234", "12125559934") is None
+
+def test_edit_distance():
+    assert edit_distance("12125551234", "12125551234", 2) == 0
+    assert edit_distance("12125551234", "12125551324", 2) == 1
+    assert edit_distance("12125551234", "125551234", 2) == 2
+    assert edit_distance("12125551234", "19995551234", 2) == 3
+
+def test_fuzzy_duplicates_needs_agreeing_names():
+    phones = ["12125551234", "12125551284", "2125551234", "19175550000", "19175550001", "12125559934"]
+    names = ["John Smith", "Jon Smith", "John Smith", "Alice Moore", "Bob Stone", "John Smith"]
+    keep, merges = fuzzy_duplicates(phones, names)
+    # Different people one digit apart (3, 4) stay; two edits within one half with the same name merge
+    assert keep == [True, False, False, True, True, False]
+    assert {m["merged"]: m["kept"] for m in merges} == {1: 0, 2: 0, 5: 0}
+    assert all(m["dropped"] for m in merges)
+    reasons = {m["merged"]: m["reason"] for m in merges}
+    assert reasons[1] == "phone digit 10 read as 8 instead of 3, same name sound"
+    assert reasons[2] == "phone digit 1 (1) missing, same name sound"
+    assert reasons[5] == "same name, phone within 2 digit edits"
+
+    # Without names, one-edit matches are only reported; require_name=False merges them
+    keep, merges = fuzzy_duplicates(["12125551234", "12125551284", "19175550000"])
+    assert keep == [True, True, True]
+    assert merges == [{"kept": 0, "merged": 1, "reason": "phone digit 10 read as 8 instead of 3", "dropped": False}]
+    keep, merges = fuzzy_duplicates(["12125551234", "12125551284", "19175550000"], require_name=False)
+    assert keep == [True, False, True] and merges[0]["dropped"]
+
+def test_sequential_numbers_do_not_chain():
+    # A DID block: every number is one edit from the next, but only records one edit from
+    # their group's kept record may be merged into it
+    phones = [f"1212555{n:03d}" for n in range(1000)]
+    for names in (None, ["Reception"] * 1000):
+        keep, merges = fuzzy_duplicates(phones, names, require_name=False)
+        assert sum(keep) == 100
+        assert all(keep[m["kept"]] for m in merges)
+        assert all(phone_difference(phones[m["kept"]], phones[m["merged"]]) for m in merges)
+
+def test_oversized_blocks_are_skipped():
+    phones = [f"1212555123{d}" for d in range(10)]
+    keep, merges = fuzzy_duplicates(phones, max_block=5)
+    assert all(keep) and merges == []
+
+def test_process_dataset_fuzzy_dedup():
+    csv_content = """Name,Phone
+John Smith,+1 212 555 1234
+Jon Smith,+1 212 555 1284
+Alice Moore,+1 917 555 0000
+Bob Stone,+1 917 555 0001
+"""
+    response = client.post("/process-dataset?fuzzy_dedup=true",
+                           files={'file': ('contacts.csv', csv_content, 'text/csv')})
+    assert response.status_code == 200
+    with io.BytesIO(response.content) as f:
+        sheets = pd.read_excel(f, sheet_name=None, dtype=str)
+    assert sheets["Sheet1"]["Name"].tolist() == ["John Smith", "Alice Moore", "Bob Stone"]
+    merged = sheets["Merged"]
+    assert merged["Kept Phone"].tolist() == ["12125551234"]
+    assert merged["Merged Name"].tolist() == ["Jon Smith"]
+    assert merged["Action"].tolist() == ["merged"]
+
+def test_process_dataset_fuzzy_dedup_without_names():
+    csv_content = "Phone\n+1 212 555 0001\n+1 212 555 0007\n+1 212 555 0008\n"
+    response = client.post("/process-dataset?fuzzy_dedup=true",
+                           files={'file': ('numbers.csv', csv_content, 'text/csv')})
+    with io.BytesIO(response.content) as f:
+        sheets = pd.read_excel(f, sheet_name=None, dtype=str)
+    # Nothing is dropped without a name to confirm the match; the candidates are listed for review
+    assert sheets["Sheet1"]["Normalized Phone"].tolist() == ["12125550001", "12125550007", "12125550008"]
+    merged = sheets["Merged"]
+    assert merged["Merged Phone"].tolist() == ["12125550007", "12125550008"]
+    assert merged["Action"].tolist() == ["review", "review"]
+
+def test_extract_fuzzy_dedup():
+    def mock_process(content, strategy='original'):
+        phone = {b'a': "+1 212 555 1234", b'b': "+1 212 555 1284"}[content]
+        return [([[0, 0], [100, 0], [100, 20], [0, 20]], "John Smith", 0.9),
+                ([[0, 30], [100, 30], [100, 50], [0, 50]], phone, 0.9)]
+
+    original_method = main.ocr_engine.process_image_with_strategy
+    main.ocr_engine.process_image_with_strategy = mock_process
+    try:
+        files = [('files', ('a.png', b'a', 'image/png')), ('files', ('b.png', b'b', 'image/png'))]
+        data = client.post("/extract?fuzzy_dedup=true", files=files).json()
+        assert [r["filename"] for r in data["results"]] == ["a.png"]
+        assert data["merged"][0]["merged"]["filename"] == "b.png"
+        assert data["merged"][0]["reason"].startswith("phone digit 10 read as 8")
+
+        # Off by default
+        data = client.post("/extract", files=files).json()
+        assert len(data["results"]) == 2 and "merged" not in data
+    finally:
+        main.ocr_engine.process_image_with_strategy = original_method
@@ -0,0 +1,79 @@
+import io
+from PIL import Image, ImageDraw, ImageFont
+from fastapi.testclient import TestClient
+from main import app
+import main
+from image_hash import fingerprint, changed_pixels, ImageHashIndex
+
+client = TestClient(app)
+
+def make_screenshot(lines, clock="12:00", size=(540, 1200), fmt='PNG'):
+    image = Image.new('RGB', size, color=(255, 255, 255))
+    d = ImageDraw.Draw(image)
+    # Status bar
+    d.rectangle([0, 0, size[0], 40], fill=(30, 30, 30))
+    d.text((20, 8), clock, fill=(255, 255, 255), font=ImageFont.load_default(size=20))
+    font = ImageFont.load_default(size=32)
+    y = 200
+    for line in lines:
+        d.text((40, y), line, fill=(0, 0, 0), font=font)
+        y += 80
+    buf = io.BytesIO()
+    image.save(buf, format=fmt)
+    return buf.getvalue()
+
+def test_fingerprint_near_duplicate_and_distinct():
+    a = fingerprint(make_screenshot(["Alice Smith", "212-555-0001"], clock="12:00"))
+    # Same capture: different clock, recompressed
+    b = fingerprint(make_screenshot(["Alice Smith", "212-555-0001"], clock="12:01", fmt='JPEG'))
+    # Same layout, one digit different
+    c = fingerprint(make_screenshot(["Alice Smith", "212-555-0007"], clock="12:00"))
+
+    assert changed_pixels(a, b) == 0
+    assert changed_pixels(a, c) > 0
+    assert fingerprint(b'not an image') is None
+
+def test_index_lookup_and_lru_eviction():
+    index = ImageHashIndex(threshold=0, max_size=2)
+    first = fingerprint(make_screenshot(["Alice Smith", "212-555-0001"]))
+    second = fingerprint(make_screenshot(["Bob Jones", "415-555-9999"]))
+    third = fingerprint(make_screenshot(["Carol", "+91 99999 88888"]))
+
+    index.add(first, "first")
+    index.add(second, "second")
+    assert index.find(fingerprint(make_screenshot(["Alice Smith", "212-555-0001"], clock="9:41"))) == ("first", 0)
+    assert index.find(third) is None
+
+    # "first" was just used, so adding a third entry evicts "second"
+    index.add(third, "third")
+    assert len(index) == 2
+    assert index.find(second) is None
+    assert index.find(first) == ("first", 0)
+
+def test_extract_skips_ocr_for_near_duplicate_upload():
+    shot = make_screenshot(["Alice Smith", "212-555-0001"], clock="12:00")
+    shot_again = make_screenshot(["Alice Smith", "212-555-0001"], clock="12:01")
+    calls = []
+
+    def mock_process(content, strategy='original'):
+        calls.append(content)
+        return [ ( [[0,0],[100,0],[100,20],[0,20]], "Alice Smith", 0.9 ),
+                 ( [[0,30],[100,30],[100,50],[0,50]], "212-555-0001", 0.9 ) ]
+
+    original_method = main.ocr_engine.process_image_with_strategy
+    main.ocr_engine.process_image_with_strategy = mock_process
+    try:
+        files = [
+            ('files', ('first.png', shot, 'image/png')),
+            ('files', ('second.png', shot_again, 'image/png')),
+        ]
+        response = client.post("/extract", files=files)
+        assert response.status_code == 200
+        results = response.json()['results']
+
+        # OCR ran once (first strategy succeeded) and the duplicate reused it
+        assert len(calls) == 1
+        assert [r['phone'] for r in results] == ['12125550001']
+        assert results[0]['filename'] == 'first.png'
+    finally:
+        main.ocr_engine.process_image_with_strategy = original_method
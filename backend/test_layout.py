@@ -0,0 +1,66 @@
+import time
+import random
+from layout import Layout
+from extractor import extractor
+
+def box(x, y, text, w=200, h=20, prob=0.9):
+    return ([[x, y], [x + w, y], [x + w, y + h], [x, y + h]], text, prob)
+
+def contacts(ocr_results):
+    return [(c.name, c.phone) for c in extractor.extract_contacts(ocr_results)]
+
+def test_columns_and_lines():
+    layout = Layout([
+        box(0, 0, "Alice Moore"), box(400, 2, "Bob Stone"),
+        box(0, 30, "212-555-0001"), box(400, 31, "212-555-0002"),
+    ])
+    assert len(layout.columns) == 2
+    assert [[b.text for b in line.boxes] for line in layout.lines] == [
+        ["Alice Moore"], ["212-555-0001"], ["Bob Stone"], ["212-555-0002"]]
+
+def test_two_column_layout():
+    # Rows of the two columns don't line up; each number takes the name above it in its own column
+    results = [
+        box(0, 0, "Alice Moore"), box(0, 30, "212-555-0001"),
+        box(0, 80, "Carol King"), box(0, 110, "212-555-0003"),
+        box(400, 15, "Bob Stone"), box(400, 45, "212-555-0002"),
+    ]
+    assert contacts(results) == [("Alice Moore", "12125550001"), ("Carol King", "12125550003"),
+                                 ("Bob Stone", "12125550002")]
+
+def test_name_left_of_number_and_labels():
+    results = [
+        box(0, 0, "Alice Moore", w=150), box(300, 0, "212-555-0001", w=150),
+        box(0, 30, "Bob Stone", w=150), box(300, 30, "Mobile:", w=60), box(370, 30, "212-555-0002", w=150),
+    ]
+    assert contacts(results) == [("Alice Moore", "12125550001"), ("Bob Stone", "12125550002")]
+
+def test_all_numbers_on_a_line_and_split_numbers():
+    results = [
+        box(0, 0, "Alice Moore"),
+        box(0, 30, "212-555-0001 / 212-555-0009", w=300),
+        box(0, 80, "Asha Rao"),
+        # One number split over two boxes by OCR
+        box(0, 110, "+91 99999", w=90), box(100, 110, "88888", w=50),
+    ]
+    assert contacts(results) == [("Alice Moore", "12125550001"), ("Alice Moore", "12125550009"),
+                                 ("Asha Rao", "919999988888")]
+
+def test_far_away_text_is_not_a_name():
+    assert contacts([box(0, 0, "Welcome"), box(0, 400, "212-555-0001")]) == [("Unknown", "12125550001")]
+
+def test_thousands_of_boxes():
+    results = []
+    expected = {}
+    for column in range(3):
+        for row in range(1000):
+            x, y = column * 400, row * 60
+            name = f"Person {chr(65 + row // 26 % 26)}{chr(65 + row % 26)} {chr(65 + column)}"
+            results.append(box(x, y, name))
+            results.append(box(x, y + 25, f"212-{200 + column}-{row:04d}"))
+            expected[f"1212{200 + column}{row:04d}"] = name
+    random.Random(0).shuffle(results)
+    start = time.perf_counter()
+    found = extractor.extract_contacts(results)
+    assert time.perf_counter() - start < 5
+    assert {c.phone: c.name for c in found} == expected
@@ -0,0 +1,60 @@
+import io
+from PIL import Image
+from fastapi.testclient import TestClient
+import main
+from image_hash import fingerprint
+
+client = TestClient(main.app)
+
+COLORS = ['white', 'black', 'gray']
+
+def multipage_tiff():
+    # Three pages of different sizes and colors, like a scanned fax
+    pages = [Image.new('RGB', (200 + 100 * i, 300), color=color) for i, color in enumerate(COLORS)]
+    buffer = io.BytesIO()
+    pages[0].save(buffer, format='TIFF', save_all=True, append_images=pages[1:])
+    return buffer.getvalue()
+
+def contact(name, phone):
+    return [([[0, 0], [100, 0], [100, 20], [0, 20]], name, 0.9),
+            ([[0, 30], [100, 30], [100, 50], [0, 50]], phone, 0.9)]
+
+PAGES = [contact("Alice Moore", "212-555-0001"),
+         contact("Bob Stone", "212-555-0002"),
+         contact("Alice Moore", "(212) 555-0001")] # Same number as page 1
+
+def test_frames_are_read_lazily():
+    data = multipage_tiff()
+    assert main.ocr_engine.frame_count(data) == 3
+    assert main.ocr_engine.frame_count(b"not an image") == 1
+    assert fingerprint(data, 1).hash == fingerprint(data, 2).hash # Both single-color
+    assert fingerprint(data, 0).thumb.mean() != fingerprint(data, 1).thumb.mean()
+
+def test_extract_processes_every_page():
+    frames = []
+
+    def mock_process(content, strategy='original', frame=0):
+        frames.append(frame)
+        return PAGES[frame]
+
+    original_method = main.ocr_engine.process_image_with_strategy
+    main.ocr_engine.process_image_with_strategy = mock_process
+    try:
+        response = client.post("/extract", files=[('files', ('fax.tiff', multipage_tiff(), 'image/tiff'))])
+        assert response.status_code == 200
+        data = response.json()
+        assert frames == [0, 1, 2]
+        # Page 3's number was already found on page 1
+        assert [(r['page'], r['name'], r['phone']) for r in data['results']] == [
+            (1, "Alice Moore", "12125550001"),
+            (2, "Bob Stone", "12125550002"),
+        ]
+        assert [(p['filename'], p['page'], p['contacts']) for p in data['pages']] == [
+            ("fax.tiff", 1, 1), ("fax.tiff", 2, 1), ("fax.tiff", 3, 1)]
+        assert all(p['seconds'] >= 0 for p in data['pages'])
+
+        response = client.post("/extract?format=columnar",
+                               files=[('files', ('fax.tiff', multipage_tiff(), 'image/tiff'))])
+        assert response.json()['rows']['page'] == [1, 2]
+    finally:
+        main.ocr_engine.process_image_with_strategy = original_method
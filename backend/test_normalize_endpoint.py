@@ -0,0 +1,57 @@
+import json
+import asyncio
+import pytest
+from fastapi.testclient import TestClient
+import main
+from bulk_normalize import iter_json_array
+
+client = TestClient(main.app)
+
+def collect(body, chunk_size):
+    async def chunks():
+        for i in range(0, len(body), chunk_size):
+            yield body[i:i + chunk_size]
+
+    async def run():
+        return [value async for value in iter_json_array(chunks())]
+    return asyncio.run(run())
+
+def test_json_array_parsed_across_chunk_boundaries():
+    body = json.dumps(["(212) 555-1234", 2125551234, "café", None, 5551234.0]).encode()
+    expected = ["(212) 555-1234", "2125551234", "café", "", "5551234"]
+    for chunk_size in (1, 3, 7, len(body)):
+        assert collect(body, chunk_size) == expected
+
+@pytest.mark.parametrize("body", [b'{"a": 1}', b'["1" "2"]', b'["1", ', b'["1"] x', b'[{"a": 1}]'])
+def test_malformed_json_rejected(body):
+    with pytest.raises(ValueError):
+        collect(body, 4)
+
+def test_normalize_json_keeps_order_and_groups():
+    numbers = ["(212) 555-1234", "+91 99999 88888", "", "212-555-1234", "+1 212 555 1234"]
+    response = client.post("/normalize", json=numbers)
+    assert response.status_code == 200
+    assert response.json() == [
+        {"normalized": "12125551234", "group": 0},
+        {"normalized": "919999988888", "group": 1},
+        {"normalized": "", "group": None},
+        {"normalized": "12125551234", "group": 0},
+        {"normalized": "12125551234", "group": 0},
+    ]
+
+def test_normalize_ndjson_with_region():
+    body = '"020 7946 0018"\n"+44 20 7946 0018"\n\n"07911 123456"\n'
+    response = client.post("/normalize?region=gb", content=body,
+                           headers={"content-type": "application/x-ndjson"})
+    assert response.status_code == 200
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert rows == [
+        {"normalized": "442079460018", "group": 0},
+        {"normalized": "442079460018", "group": 0},
+        {"normalized": "447911123456", "group": 1},
+    ]
+
+def test_normalize_rejects_bad_input():
+    assert client.post("/normalize", content=b'{"numbers": []}',
+                       headers={"content-type": "application/json"}).status_code == 400
+    assert client.post("/normalize?region=XX", json=["1"]).status_code == 400
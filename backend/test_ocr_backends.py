@@ -0,0 +1,112 @@
+import io
+import os
+import sys
+import subprocess
+import pytest
+from PIL import Image
+from ocr_backends import OCRBackend, ONNXBackend, create_backend, onnx_model_paths
+from ocr_engine import OCREngine
+import ocr_backends
+
+class FakeBackend(OCRBackend):
+    name = "fake"
+
+    def __init__(self, languages):
+        self.languages = languages
+        self.shapes = []
+
+    def detect(self, image_np):
+        return [[0, 10, 0, 10]], []
+
+    def recognize(self, image_np, horizontal_list, free_list):
+        return self.readtext(image_np)
+
+    def readtext(self, image_np):
+        self.shapes.append(image_np.shape)
+        return [([[0, 0], [10, 0], [10, 10], [0, 10]], "John Doe", 0.9)]
+
+def png_bytes():
+    buf = io.BytesIO()
+    Image.new('RGB', (40, 20), color='white').save(buf, format='PNG')
+    return buf.getvalue()
+
+def test_unknown_backend_rejected():
+    with pytest.raises(ValueError, match="Unknown OCR backend"):
+        create_backend("nope")
+
+def test_engine_uses_configured_backend(monkeypatch):
+    monkeypatch.setitem(ocr_backends.BACKENDS, "fake", FakeBackend)
+    engine = OCREngine(languages=['en'], backend="fake")
+    assert isinstance(engine.reader, FakeBackend)
+
+    results = engine.process_image_with_strategy(png_bytes(), 'resized')
+    assert results[0][1] == "John Doe"
+    # Preprocessing still happens in the engine, before the backend sees the image
+    assert engine.reader.shapes == [(40, 80, 3)]
+
+def test_incomplete_backend_fails_at_creation():
+    class ReadOnlyBackend(OCRBackend):
+        def readtext(self, image_np):
+            return []
+
+    with pytest.raises(TypeError, match="detect"):
+        ReadOnlyBackend()
+
+def test_onnx_backend_requires_exported_models(tmp_path):
+    with pytest.raises(FileNotFoundError, match="export_onnx.py"):
+        ONNXBackend(['en'], model_dir=str(tmp_path))
+
+def test_onnx_model_paths():
+    assert onnx_model_paths("m", "english") == ("m/craft.onnx", "m/english.onnx")
+    assert onnx_model_paths("m", "english", int8=True) == ("m/craft.int8.onnx", "m/english.int8.onnx")
+
+# Loads a torch model the way the gunicorn master does (OCREngine at import), forks a worker
+# and runs parallel ops in it. Exits non-zero if the worker hangs.
+FORK_SCRIPT = """
+import os, sys, time, torch
+import ocr_backends
+from ocr_engine import OCREngine
+
+class TorchBackend(ocr_backends.OCRBackend):
+    name = "torch"
+
+    def __init__(self, languages):
+        self.net = torch.nn.Linear(2048, 2048)
+        # Weight copies run in parallel unless loading is single-threaded
+        self.net.load_state_dict({k: torch.randn_like(v) for k, v in self.net.state_dict().items()})
+
+    def detect(self, image_np):
+        return [], []
+
+    def recognize(self, image_np, horizontal_list, free_list):
+        return []
+
+    def readtext(self, image_np):
+        return []
+
+ocr_backends.BACKENDS["torch"] = TorchBackend
+engine = OCREngine(backend="torch")
+pid = os.fork()
+if pid == 0:
+    with torch.no_grad():
+        x = torch.randn(512, 2048)
+        engine.reader.net(x + x).sum()
+    os._exit(0)
+deadline = time.monotonic() + 30
+while time.monotonic() < deadline:
+    if os.waitpid(pid, os.WNOHANG)[0]:
+        sys.exit(0)
+    time.sleep(0.05)
+os.kill(pid, 9)
+sys.exit("forked worker hung")
+"""
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs fork()")
+def test_preloaded_model_is_fork_safe():
+    pytest.importorskip("torch")
+    # ocr_engine's own module-level engine fails fast on the backend not registered yet, instead
+    # of trying to download the EasyOCR models
+    env = dict(os.environ, ACE_OCR_THREADS="4", ACE_OCR_BACKEND="torch")
+    result = subprocess.run([sys.executable, "-c", FORK_SCRIPT], cwd=os.path.dirname(os.path.abspath(__file__)),
+                            env=env, capture_output=True, text=True, timeout=120)
+    assert result.returncode == 0, result.stderr
@@ -0,0 +1,60 @@
+import io
+import random
+import pytest
+import pandas as pd
+from fastapi.testclient import TestClient
+import main
+from phone_normalizer import PhoneNormalizer, get_normalizer
+from analyze_screenshots import custom_normalize
+
+client = TestClient(main.app)
+
+def test_policies():
+    international = get_normalizer("US", "international")
+    national = get_normalizer("US", "national")
+    assert international.normalize("(212) 555-1234") == "12125551234"
+    assert national.normalize("(212) 555-1234") == "2125551234"
+    # Country code written out: kept by both
+    assert national.normalize("+1 212 555 1234") == "12125551234"
+    assert national.normalize("001 212 555 1234") == "12125551234"
+    assert national.normalize("+91 99999 88888") == "919999988888"
+    # Invalid: raw digits
+    assert international.normalize("12-34") == "1234"
+    assert custom_normalize("(212) 555-1234") == "2125551234"
+
+def test_indian_local_numbers_valid_with_region():
+    assert get_normalizer("US").normalize("99999 88888") == "9999988888"
+    india = get_normalizer("IN")
+    assert india.normalize("99999 88888") == "919999988888"
+    assert india.normalize("099999 88888") == "919999988888"
+    assert india.normalize("+91 99999 88888") == "919999988888"
+    assert get_normalizer("IN", "national").normalize("99999 88888") == "9999988888"
+
+def test_unknown_region_or_policy():
+    with pytest.raises(ValueError):
+        get_normalizer("XX")
+    with pytest.raises(ValueError):
+        get_normalizer("US", "e164")
+
+@pytest.mark.parametrize("region", ["US", "IN", "GB", "IT"])
+def test_fast_path_matches_phonenumbers(region):
+    rng = random.Random(region)
+    fast = PhoneNormalizer(region)
+    slow = PhoneNormalizer(region)
+    slow.fast_path = False
+    for _ in range(3000):
+        digits = "".join(rng.choice("0123456789") for _ in range(rng.randint(7, 12)))
+        text = "".join(d + rng.choice(["", "", " ", "-", ".", ")"]) for d in digits)
+        assert fast.normalize(text) == slow.normalize(text), text
+
+def test_process_dataset_region():
+    csv = "Name,Phone\nAsha,99999 88888\nRavi,+91 99999 88888\nMeena,98765 43210\n"
+    response = client.post("/process-dataset?region=IN",
+                           files={'file': ('contacts.csv', csv.encode(), 'text/csv')})
+    assert response.status_code == 200
+    df = pd.read_excel(io.BytesIO(response.content))
+    assert df['Normalized Phone'].astype(str).tolist() == ["919999988888", "919876543210"]
+
+    response = client.post("/process-dataset?region=XX",
+                           files={'file': ('contacts.csv', csv.encode(), 'text/csv')})
+    assert response.status_code == 400
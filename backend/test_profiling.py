@@ -0,0 +1,83 @@
+import time
+import threading
+import tracemalloc
+from fastapi.testclient import TestClient
+import main
+import config
+import profiling
+
+client = TestClient(main.app)
+
+ADMIN = {"X-Admin-Token": "secret"}
+
+def in_background(fn):
+    result = {}
+    thread = threading.Thread(target=lambda: result.setdefault("response", fn()))
+    thread.start()
+    return thread, result
+
+def test_admin_endpoints_need_token(monkeypatch):
+    monkeypatch.setattr(config, "ADMIN_TOKEN", "")
+    assert client.post("/admin/profile/cpu?seconds=0.1", headers=ADMIN).status_code == 404
+    monkeypatch.setattr(config, "ADMIN_TOKEN", "secret")
+    assert client.post("/admin/profile/cpu?seconds=0.1", headers={"X-Admin-Token": "wrong"}).status_code == 403
+    assert client.post("/admin/profile/memory?seconds=600", headers=ADMIN).status_code == 400
+
+def test_cpu_samples_are_tagged_with_the_request(monkeypatch):
+    monkeypatch.setattr(config, "ADMIN_TOKEN", "secret")
+
+    def slow_ocr(content, strategy='original'):
+        deadline = time.monotonic() + 0.3
+        while time.monotonic() < deadline:
+            pass
+        return [([[0, 0], [100, 0], [100, 20], [0, 20]], "212-555-0001", 0.9)]
+
+    original_method = main.ocr_engine.process_image_with_strategy
+    main.ocr_engine.process_image_with_strategy = slow_ocr
+    try:
+        thread, result = in_background(lambda: client.post(
+            "/admin/profile/cpu?seconds=1&interval_ms=5&format=json", headers=ADMIN))
+        while not profiling.profiler.active:
+            time.sleep(0.01)
+        assert client.post("/admin/profile/cpu?seconds=0.1", headers=ADMIN).status_code == 409
+        client.post("/extract", files=[('files', ('card.png', b'card', 'image/png'))])
+        thread.join()
+    finally:
+        main.ocr_engine.process_image_with_strategy = original_method
+
+    profile = result["response"].json()
+    assert "POST /extract" in profile["tags"]
+    ocr_samples = [s for s in profile["stacks"] if "test_profiling.py:slow_ocr" in s["frames"]]
+    assert ocr_samples and all(s["tag"] == "POST /extract" for s in ocr_samples)
+    # Nothing is left tagged once the window ends
+    assert not profiling.profiler.active and not profiling.profiler._thread_tags
+
+def test_folded_output():
+    counts = profiling.Counter({("POST /extract", ("main.py:extract_contacts", "ocr_engine.py:run")): 3,
+                                ("MainThread", ("threading.py:wait",)): 1})
+    assert profiling.folded(counts) == "POST /extract;main.py:extract_contacts;ocr_engine.py:run 3\nMainThread;threading.py:wait 1\n"
+    assert profiling.folded(counts, tag="MainThread") == "MainThread;threading.py:wait 1\n"
+    top = profiling.top_functions(counts, tag="POST /extract")
+    assert {"function": "ocr_engine.py:run", "self": 3, "total": 3} in top
+
+kept = []
+
+def allocate():
+    kept.append([bytearray(1024) for _ in range(200)])
+
+def test_memory_trace_reports_allocation_sites(monkeypatch):
+    monkeypatch.setattr(config, "ADMIN_TOKEN", "secret")
+    thread, result = in_background(lambda: client.post(
+        "/admin/profile/memory?seconds=0.5&files=test_profiling.py", headers=ADMIN))
+    while not tracemalloc.is_tracing():
+        time.sleep(0.01)
+    time.sleep(0.05)
+    allocate()
+    thread.join()
+    kept.clear()
+
+    sites = result["response"].json()["sites"]
+    assert sites[0]["file"] == "test_profiling.py"
+    assert sites[0]["size_diff"] >= 200 * 1024
+    # Off again after the window
+    assert not tracemalloc.is_tracing()
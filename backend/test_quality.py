@@ -0,0 +1,80 @@
+import io
+from PIL import Image
+from fastapi.testclient import TestClient
+import main
+from records import Contact
+from quality import phone_validity, name_plausibility, contact_score, result_score
+
+client = TestClient(main.app)
+
+def test_scores():
+    assert phone_validity("12125550001") == 1.0
+    assert phone_validity("1234567") == 0.5
+    assert phone_validity("") == 0.0
+    assert name_plausibility("Alice Moore") == 1.0
+    assert name_plausibility("alice") == 0.5
+    assert name_plausibility("आशा राव") == 1.0
+    assert name_plausibility("Unknown") == 0.0
+
+    good = Contact("Alice Moore", "12125550001", 0.9)
+    unnamed = Contact("Unknown", "12125550001", 0.9)
+    assert round(contact_score(good), 2) == 0.96
+    assert round(contact_score(unnamed), 2) == 0.66
+    # Unnamed numbers next to a named contact don't lower the score
+    assert round(result_score([good, unnamed, unnamed]), 2) == 0.96
+    # Without any names, the name weight is left out
+    assert round(result_score([unnamed, unnamed]), 2) == 0.94
+    assert result_score([]) == 0.0
+
+def large_image():
+    buffer = io.BytesIO()
+    Image.new('RGB', (1080, 2400), color='white').save(buffer, format='PNG')
+    return buffer.getvalue()
+
+GOOD = [([[0, 0], [100, 0], [100, 20], [0, 20]], "Alice Moore", 0.9),
+        ([[0, 30], [100, 30], [100, 50], [0, 50]], "212-555-0001", 0.9)]
+BLURRY = [([[0, 0], [100, 0], [100, 20], [0, 20]], "alice", 0.3),
+          ([[0, 30], [100, 30], [100, 50], [0, 50]], "212-555-0001", 0.3)]
+
+def run_extract(passes, query=""):
+    calls = []
+
+    def mock_process(content, strategy='original'):
+        calls.append(strategy)
+        return passes.get(strategy, passes.get('*', []))
+
+    original_method = main.ocr_engine.process_image_with_strategy
+    main.ocr_engine.process_image_with_strategy = mock_process
+    try:
+        response = client.post(f"/extract{query}", files=[('files', ('big.png', large_image(), 'image/png'))])
+        assert response.status_code == 200
+        return calls, response.json()['results']
+    finally:
+        main.ocr_engine.process_image_with_strategy = original_method
+
+def test_good_thumbnail_skips_full_resolution():
+    calls, results = run_extract({'*': GOOD})
+    assert calls == ['thumbnail']
+    assert results[0]['strategy'] == 'thumbnail'
+    assert results[0]['quality'] >= 0.8
+
+def test_unnamed_numbers_do_not_force_more_passes():
+    page = GOOD + [([[0, 300], [100, 300], [100, 320], [0, 320]], "212-555-0008", 0.9),
+                   ([[0, 600], [100, 600], [100, 620], [0, 620]], "212-555-0009", 0.9)]
+    calls, results = run_extract({'*': page})
+    assert calls == ['thumbnail']
+
+def test_blurry_thumbnail_falls_through_to_full_resolution():
+    calls, results = run_extract({'thumbnail': BLURRY, '*': GOOD})
+    assert calls == ['thumbnail', 'original']
+    assert results[0]['name'] == 'Alice Moore'
+
+def test_best_pass_wins_below_threshold():
+    calls, results = run_extract({'thumbnail': BLURRY, 'enhanced': GOOD, '*': BLURRY}, "?min_quality=1")
+    assert calls == ['thumbnail', 'original', 'enhanced', 'binarized', 'grayscale', 'resized']
+    assert results[0]['strategy'] == 'enhanced'
+
+def test_no_text_skips_remaining_strategies():
+    calls, results = run_extract({})
+    assert calls == ['thumbnail', 'original']
+    assert results[0]['strategy'] == 'all_failed'
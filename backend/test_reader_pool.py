@@ -0,0 +1,80 @@
+import time
+import threading
+from fastapi.testclient import TestClient
+import main
+from reader_pool import ReaderPool, language_key
+
+client = TestClient(main.app)
+
+class FakeReader:
+    def __init__(self, languages):
+        self.languages = languages
+
+    def model_bytes(self):
+        return 1024 * 1024
+
+def make_pool(max_readers, loads):
+    def factory(languages):
+        loads.append(tuple(languages))
+        if 'xx' in languages:
+            raise ValueError({'xx'}, 'is not supported')
+        time.sleep(0.05)
+        return FakeReader(languages)
+    return ReaderPool(factory, max_readers, pinned=[('en',)])
+
+def test_language_key():
+    assert language_key(['hi']) == ('hi',)
+    assert language_key(['hi', 'en', 'hi'], ['en']) == ('en', 'hi')
+
+def test_lru_eviction_keeps_pinned_reader():
+    loads = []
+    pool = make_pool(2, loads)
+    pool.get(('en',))
+    pool.get(('en', 'hi'))
+    pool.get(('en',))
+    # Over the limit: 'hi' is the least recently used unpinned reader
+    pool.get(('ar', 'en'))
+    resident = [r['languages'] for r in pool.stats()['readers']]
+    assert resident == [['en'], ['ar', 'en']]
+    pool.get(('en', 'hi'))
+    assert loads == [('en',), ('en', 'hi'), ('ar', 'en'), ('en', 'hi')]
+
+def test_concurrent_requests_load_once():
+    loads = []
+    pool = make_pool(2, loads)
+    threads = [threading.Thread(target=pool.get, args=(('en', 'hi'),)) for _ in range(5)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert loads == [('en', 'hi')]
+    stats = pool.stats()['readers'][0]
+    assert stats['uses'] == 5
+    assert stats['model_mb'] == 1.0
+    assert stats['load_seconds'] >= 0.05
+
+def test_extract_language_hint(monkeypatch):
+    loads = []
+    monkeypatch.setattr(main.ocr_engine, "pool", make_pool(2, loads))
+    seen = []
+
+    def mock_process(content, strategy='original', languages=None):
+        seen.append(languages)
+        return [([[0, 0], [100, 0], [100, 20], [0, 20]], "Asha Rao", 0.9),
+                ([[0, 30], [100, 30], [100, 50], [0, 50]], "+91 99999 88888", 0.9)]
+
+    original_method = main.ocr_engine.process_image_with_strategy
+    main.ocr_engine.process_image_with_strategy = mock_process
+    try:
+        response = client.post("/extract?languages=hi", files=[('files', ('a.png', b'a', 'image/png'))])
+        assert response.status_code == 200
+        assert seen == [['hi']]
+        assert loads == [('en', 'hi')]
+
+        response = client.post("/extract?languages=xx", files=[('files', ('a.png', b'a', 'image/png'))])
+        assert response.status_code == 400
+
+        stats = client.get("/ocr/stats").json()
+        assert [r['languages'] for r in stats['readers']['readers']] == [['en', 'hi']]
+    finally:
+        main.ocr_engine.process_image_with_strategy = original_method
@@ -0,0 +1,53 @@
+import numpy as np
+from fastapi.testclient import TestClient
+import main
+from records import Contact, ResultRow, columnar_payload, dumps
+
+client = TestClient(main.app)
+
+def test_contact_reads_like_a_dict():
+    contact = Contact("Alice Moore", "12125550001", 0.9, "212-555-0001", "212-555-0001")
+    assert contact['phone'] == contact.phone == "12125550001"
+    assert contact.get('name') == "Alice Moore"
+    assert contact.get('missing', 'x') == 'x'
+    assert not hasattr(contact, '__dict__')
+
+def test_columnar_payload():
+    rows = [
+        ResultRow("a.png", Contact("Alice Moore", "12125550001", 0.9), "original"),
+        ResultRow("a.png", Contact("Bob Stone", "12125550002", 0.8), "original"),
+        ResultRow("b.png", None, "all_failed"),
+        ResultRow("c.png", error="broken image"),
+    ]
+    filenames, columns, errors = columnar_payload(rows)
+    assert filenames == ["a.png", "b.png", "c.png"]
+    assert columns["file"] == [0, 0, 1]
+    assert columns["name"] == ["Alice Moore", "Bob Stone", "No contact found"]
+    assert columns["phone"] == ["12125550001", "12125550002", ""]
+    assert errors == [{"file": 2, "error": "broken image"}]
+
+def test_dumps_numpy_confidence():
+    assert dumps({"confidence": np.float32(0.5)}) == b'{"confidence":0.5}'
+
+def test_extract_columnar_matches_rows():
+    def mock_process(content, strategy='original'):
+        return [([[0, 0], [100, 0], [100, 20], [0, 20]], "Alice Moore", 0.9),
+                ([[0, 30], [100, 30], [100, 50], [0, 50]], "212-555-0001 / 212-555-0002", 0.8)]
+
+    original_method = main.ocr_engine.process_image_with_strategy
+    main.ocr_engine.process_image_with_strategy = mock_process
+    try:
+        files = [('files', ('a.png', b'a', 'image/png'))]
+        rows = client.post("/extract", files=files).json()["results"]
+        data = client.post("/extract?format=columnar", files=files).json()
+        assert data["format"] == "columnar"
+        columns = data["rows"]
+        rebuilt = [{"filename": data["filenames"][columns["file"][i]],
+                    **{field: columns[field][i] for field in ("name", "phone", "confidence", "strategy", "quality", "cut_short")}}
+                   for i in range(len(columns["file"]))]
+        assert rebuilt == rows
+        assert [r["phone"] for r in rows] == ["12125550001", "12125550002"]
+
+        assert client.post("/extract?format=xml", files=files).status_code == 422
+    finally:
+        main.ocr_engine.process_image_with_strategy = original_method
@@ -0,0 +1,72 @@
+import os
+import time
+import io
+import pandas as pd
+from fastapi.testclient import TestClient
+import main
+from result_cache import ResultCache, cache_key, etag_matches
+
+client = TestClient(main.app)
+
+CSV = "Name,Phone,Office\nAlice,212-555-0001,212-555-0100\nBob,212-555-0002,212-555-0100\n"
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    cache = ResultCache(str(tmp_path), max_size=250)
+    cache.put("a", b"x" * 100)
+    cache.put("b", b"y" * 100)
+    # Reading "a" makes "b" the least recently used
+    past = time.time() - 60
+    os.utime(tmp_path / "a.bin", (past, past))
+    os.utime(tmp_path / "b.bin", (past + 1, past + 1))
+    assert cache.get("a") == b"x" * 100
+    cache.put("c", b"z" * 100)
+    assert cache.get("b") is None
+    assert cache.get("a") == b"x" * 100
+    assert cache.get("c") == b"z" * 100
+    # Larger than the whole cache: not stored
+    cache.put("d", b"!" * 300)
+    assert cache.get("d") is None
+    assert cache.stats()["entries"] == 2
+
+def test_key_covers_content_and_options():
+    key = cache_key(b"data", {"region": "US"})
+    assert key == cache_key(memoryview(b"data"), {"region": "US"})
+    assert key != cache_key(b"data", {"region": "IN"})
+    assert key != cache_key(b"Data", {"region": "US"})
+
+def test_etag_matching():
+    assert etag_matches('"abc"', '"abc"')
+    assert etag_matches('"x", W/"abc"', '"abc"')
+    assert not etag_matches('*', '"abc"')
+    assert not etag_matches('"x"', '"abc"')
+    assert not etag_matches(None, '"abc"')
+
+def test_process_dataset_is_cached(tmp_path, monkeypatch):
+    monkeypatch.setattr(main, "dataset_cache", ResultCache(str(tmp_path), 10 * 1024 * 1024))
+    files = {'file': ('contacts.csv', CSV, 'text/csv')}
+
+    first = client.post("/process-dataset", files=files)
+    assert first.status_code == 200
+    assert first.headers["X-Cache"] == "miss"
+    etag = first.headers["ETag"]
+
+    second = client.post("/process-dataset", files=files)
+    assert second.headers["X-Cache"] == "hit"
+    assert second.headers["ETag"] == etag
+    assert second.content == first.content
+    assert second.headers["Content-Disposition"] == "attachment; filename=processed_contacts.csv.xlsx"
+
+    not_modified = client.post("/process-dataset", files=files, headers={"If-None-Match": etag})
+    assert not_modified.status_code == 304
+    assert not_modified.content == b""
+
+    # Other options are another result
+    other = client.post("/process-dataset?policy=national&phone_column=Office", files=files)
+    assert other.headers["X-Cache"] == "miss"
+    assert other.headers["ETag"] != etag
+    df = pd.read_excel(io.BytesIO(other.content))
+    assert df['Normalized Phone'].astype(str).tolist() == ["2125550100"]
+
+def test_unknown_phone_column():
+    response = client.post("/process-dataset?phone_column=Fax", files={'file': ('contacts.csv', CSV, 'text/csv')})
+    assert response.status_code == 400
@@ -0,0 +1,96 @@
+import time
+import threading
+from types import SimpleNamespace
+from fastapi.testclient import TestClient
+import main
+import config
+from test_multipage import multipage_tiff
+from scheduler import FairScheduler, Job, parse_weights, INTERACTIVE, BATCH
+
+client = TestClient(main.app)
+
+def served_order(scheduler, jobs):
+    """
+    Queues one call per job (in list order) behind a blocker, then returns the order they ran in.
+    Every call is charged 1 second.
+    """
+    blocker = scheduler.acquire(Job("blocker"))
+    order = []
+
+    def call(name, job):
+        grant = scheduler.acquire(job)
+        order.append(name)
+        scheduler.release(grant, 1.0)
+
+    threads = []
+    for i, (name, job) in enumerate(jobs):
+        thread = threading.Thread(target=call, args=(name, job))
+        thread.start()
+        threads.append(thread)
+        while sum(lane["waiting"] for lane in scheduler.stats()["lanes"].values()) < i + 1:
+            time.sleep(0.001)
+    scheduler.release(blocker, 1.0)
+    for thread in threads:
+        thread.join()
+    return order
+
+def test_small_client_is_not_stuck_behind_a_batch():
+    big, small = Job("big"), Job("small")
+    order = served_order(FairScheduler(1), [("big", big)] * 5 + [("small", small)])
+    assert order.index("small") <= 1
+
+def test_weights_share_the_slots():
+    heavy, light = Job("heavy", weight=2), Job("light")
+    order = served_order(FairScheduler(1), [("heavy", heavy)] * 6 + [("light", light)] * 6)
+    assert order[:6].count("heavy") == 4
+
+def test_priority_lane_with_bounded_burst():
+    card, batch = Job("card", INTERACTIVE), Job("batch", BATCH)
+    order = served_order(FairScheduler(1, priority_burst=2), [("batch", batch)] * 2 + [("card", card)] * 4)
+    assert order == ["card", "card", "batch", "card", "card", "batch"]
+
+def test_parse_weights():
+    assert parse_weights("tenant-a=4, tenant-b=0.5,bad=x,zero=0") == {"tenant-a": 4.0, "tenant-b": 0.5}
+
+def test_extract_reports_queue_and_ocr_time():
+    def mock_process(content, strategy='original'):
+        time.sleep(0.01)
+        return [([[0, 0], [100, 0], [100, 20], [0, 20]], "Alice Moore", 0.9),
+                ([[0, 30], [100, 30], [100, 50], [0, 50]], "212-555-0001", 0.9)]
+
+    original_method = main.ocr_engine.process_image_with_strategy
+    main.ocr_engine.process_image_with_strategy = mock_process
+    try:
+        response = client.post("/extract", files=[('files', ('card.png', b'card', 'image/png'))],
+                               headers={"X-Client-Id": "tenant-a"})
+        timing = response.json()['timing']
+        assert timing['lane'] == "interactive"
+        assert timing['ocr_calls'] == 1
+        assert timing['ocr_seconds'] >= 0.01
+        assert timing['queue_seconds'] >= 0
+
+        files = [('files', (f'{i}.png', b'card', 'image/png')) for i in range(5)]
+        assert client.post("/extract", files=files).json()['timing']['lane'] == "batch"
+    finally:
+        main.ocr_engine.process_image_with_strategy = original_method
+
+def test_multipage_upload_uses_batch_lane(monkeypatch):
+    monkeypatch.setattr(config, "SCHEDULER_INTERACTIVE_FILES", 2)
+
+    def mock_process(content, strategy='original', frame=0):
+        return []
+
+    original_method = main.ocr_engine.process_image_with_strategy
+    main.ocr_engine.process_image_with_strategy = mock_process
+    try:
+        # One file, three pages
+        files = [('files', ('fax.tiff', multipage_tiff(), 'image/tiff'))]
+        assert client.post("/extract", files=files).json()['timing']['lane'] == "batch"
+    finally:
+        main.ocr_engine.process_image_with_strategy = original_method
+
+def test_client_id_header_needs_trust(monkeypatch):
+    request = SimpleNamespace(headers={"x-client-id": "tenant-a"}, client=SimpleNamespace(host="10.0.0.7"))
+    assert main.ocr_job(request, []).key == "10.0.0.7"
+    monkeypatch.setattr(config, "SCHEDULER_TRUST_CLIENT_ID", True)
+    assert main.ocr_job(request, []).key == "tenant-a"
@@ -0,0 +1,110 @@
+import time
+import threading
+from fastapi.testclient import TestClient
+import main
+import config
+import speculation
+from concurrency import OCRConcurrency
+from scheduler import FairScheduler, Job
+from uploads import BufferFile
+
+client = TestClient(main.app)
+
+GOOD = [([[0, 0], [100, 0], [100, 20], [0, 20]], "Alice Moore", 0.95),
+        ([[0, 30], [100, 30], [100, 50], [0, 50]], "212-555-0001", 0.95)]
+NOISE = [([[0, 0], [100, 0], [100, 20], [0, 20]], "~~ 1l|", 0.2)]
+
+def test_speculative_grants_only_use_spare_slots():
+    scheduler = FairScheduler(2)
+    regular = scheduler.acquire(Job("a"))
+    # One slot free, but another request may need it
+    assert scheduler.try_acquire(Job("a"), keep_free=1) is None
+    spare = scheduler.try_acquire(Job("a"))
+    assert spare is not None and not spare.cancel.is_set()
+
+    # A regular call that has to wait takes the slot back from the speculative one
+    waiter = threading.Thread(target=lambda: scheduler.release(scheduler.acquire(Job("b")), 0.1))
+    waiter.start()
+    assert spare.cancel.wait(1)
+    assert scheduler.try_acquire(Job("a")) is None
+    scheduler.release(spare, 0.05)
+    waiter.join(1)
+    assert not waiter.is_alive()
+    scheduler.release(regular, 0.1)
+    assert scheduler.stats()["lanes"]["batch"]["preempted"] == 1
+
+def test_queued_call_can_be_withdrawn():
+    scheduler = FairScheduler(1)
+    regular = scheduler.acquire(Job("a"))
+    abandon = threading.Event()
+    result = {}
+    waiter = threading.Thread(target=lambda: result.setdefault("grant", scheduler.acquire(Job("b"), abandon)))
+    waiter.start()
+    while not any(lane["waiting"] for lane in scheduler.stats()["lanes"].values()):
+        time.sleep(0.01)
+    scheduler.withdraw(abandon)
+    waiter.join(1)
+    assert result["grant"] is None
+    # The withdrawn call never takes the slot
+    scheduler.release(regular, 0.1)
+    assert scheduler.try_acquire(Job("a")) is not None
+
+def run_extract(monkeypatch, slots, speculative, content=b'card'):
+    """
+    'original' and 'enhanced' are slow and unreadable, 'binarized' is quick and good.
+    Returns (response json, seconds, strategies cancelled before finishing).
+    """
+    concurrency = OCRConcurrency(slots, 16)
+    monkeypatch.setattr(main, "ocr_concurrency", concurrency)
+    monkeypatch.setattr(speculation, "ocr_concurrency", concurrency)
+    monkeypatch.setattr(config, "SPECULATIVE_MAX_LOAD", 0)
+    cancelled = []
+
+    def mock_process(content, strategy='original', cancel=None, **kwargs):
+        if strategy == 'binarized':
+            time.sleep(0.05)
+            return GOOD
+        # Reads the upload the whole time, like preprocessing does
+        with BufferFile(content):
+            deadline = time.monotonic() + 0.4
+            while time.monotonic() < deadline:
+                if cancel is not None and cancel.is_set():
+                    cancelled.append(strategy)
+                    return []
+                time.sleep(0.01)
+            return NOISE
+
+    original_method = main.ocr_engine.process_image_with_strategy
+    main.ocr_engine.process_image_with_strategy = mock_process
+    try:
+        started = time.monotonic()
+        response = client.post(f"/extract?speculative={speculative}&min_quality=0.5",
+                               files=[('files', ('card.png', content, 'image/png'))])
+        assert response.status_code == 200
+        return response.json(), time.monotonic() - started, cancelled
+    finally:
+        main.ocr_engine.process_image_with_strategy = original_method
+
+def test_first_good_pass_ahead_wins(monkeypatch):
+    data, seconds, cancelled = run_extract(monkeypatch, slots=4, speculative=2)
+    row = data['results'][0]
+    assert (row['name'], row['phone'], row['strategy']) == ("Alice Moore", "12125550001", "binarized")
+    assert data['timing']['speculative_calls'] == 2
+    # Won while 'original' and 'enhanced' were still running, which were then cancelled
+    assert seconds < 0.4
+    # Stopped before the response
+    assert sorted(cancelled) == ["enhanced", "original"]
+
+def test_cancelled_passes_finish_before_the_upload_closes(monkeypatch):
+    # Spooled upload: a memory map, which cannot be closed while a pass still reads it
+    monkeypatch.setattr(config, "UPLOAD_SPOOL_THRESHOLD", 100)
+    data, seconds, cancelled = run_extract(monkeypatch, slots=4, speculative=2, content=b'card' * 100)
+    assert data['results'][0]['strategy'] == "binarized"
+    assert sorted(cancelled) == ["enhanced", "original"]
+
+def test_no_speculation_without_spare_slots(monkeypatch):
+    # The only slot is this request's own: strategies run one after another as usual
+    data, seconds, cancelled = run_extract(monkeypatch, slots=1, speculative=2)
+    assert data['results'][0]['strategy'] == "binarized"
+    assert data['timing']['speculative_calls'] == 0
+    assert seconds >= 0.8 and not cancelled
@@ -0,0 +1,68 @@
+import io
+import pandas as pd
+import pytest
+from openpyxl import Workbook
+from fastapi.testclient import TestClient
+import main
+import config
+from spreadsheets import iter_xlsx_chunks, detect_header, column_names
+
+client = TestClient(main.app)
+
+def make_workbook():
+    workbook = Workbook()
+    notes = workbook.active
+    notes.title = "Notes"
+    notes.append(["Exported contacts"])
+    contacts = workbook.create_sheet("Contacts")
+    contacts.append(["CRM export, March"])
+    contacts.append([])
+    contacts.append(["Name", "Phone", "Office"])
+    contacts.append(["Alice Moore", 2125550001, "NY"])
+    contacts.append(["Bob Stone", "212-555-0002", "NY"])
+    contacts.append([])
+    contacts.append(["Alice M.", "(212) 555-0001", "NY"]) # Same number as Alice
+    contacts.append(["Carol King", 2125550003.0, None])
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    return buffer.getvalue()
+
+def test_detect_header_skips_title_rows():
+    rows = [("Export",), (None, None), ("Name", "Phone"), ("Alice", 2125550001)]
+    assert detect_header(rows) == 2
+    assert detect_header([("Alice", 2125550001), ("Bob", 2125550002)]) == 0
+    assert column_names(["Phone", None, "Phone"]) == ["Phone", "Unnamed: 1", "Phone.1"]
+
+def test_streams_sheet_in_chunks():
+    chunks = list(iter_xlsx_chunks(io.BytesIO(make_workbook()), sheet="Contacts", chunk_rows=2))
+    assert [len(c) for c in chunks] == [2, 2]
+    df = pd.concat(chunks)
+    assert list(df.columns) == ["Name", "Phone", "Office"]
+    assert df["Name"].tolist() == ["Alice Moore", "Bob Stone", "Alice M.", "Carol King"]
+
+    by_index = list(iter_xlsx_chunks(io.BytesIO(make_workbook()), sheet="1", header_row=3))
+    assert len(by_index[0]) == 4
+    with pytest.raises(ValueError, match="Contacts"):
+        list(iter_xlsx_chunks(io.BytesIO(make_workbook()), sheet="Missing"))
+
+def test_process_dataset_xlsx(monkeypatch):
+    monkeypatch.setattr(main, "dataset_cache", None)
+    monkeypatch.setattr(config, "DATASET_CHUNK_ROWS", 2)
+    files = {'file': ('contacts.xlsx', make_workbook(), 'application/octet-stream')}
+    response = client.post("/process-dataset?sheet=Contacts&policy=national", files=files)
+    assert response.status_code == 200
+    df = pd.read_excel(io.BytesIO(response.content))
+    # Numeric cells keep their digits, duplicates across chunks are dropped
+    assert df["Normalized Phone"].astype(str).tolist() == ["2125550001", "2125550002", "2125550003"]
+    assert df["Name"].tolist() == ["Alice Moore", "Bob Stone", "Carol King"]
+
+    response = client.post("/process-dataset?sheet=Missing", files=files)
+    assert response.status_code == 400
+
+def test_process_dataset_csv_chunks(monkeypatch):
+    monkeypatch.setattr(main, "dataset_cache", None)
+    monkeypatch.setattr(config, "DATASET_CHUNK_ROWS", 2)
+    csv = "Name,Phone\nAlice,212-555-0001\nBob,212-555-0002\nAlice M.,(212) 555-0001\nCarol,\n"
+    response = client.post("/process-dataset?policy=national", files={'file': ('contacts.csv', csv, 'text/csv')})
+    df = pd.read_excel(io.BytesIO(response.content))
+    assert df["Normalized Phone"].astype(str).tolist() == ["2125550001", "2125550002"]
@@ -0,0 +1,100 @@
+import io
+import mmap
+from typing import List
+from fastapi import FastAPI, UploadFile, File
+from fastapi.testclient import TestClient
+from PIL import Image
+import starlette.formparsers
+import main
+from uploads import UploadLimitRoute, upload_limits, open_upload, BufferFile, format_size
+
+# Small app with tiny limits so the tests don't need to send megabytes
+limits_app = FastAPI()
+limits_app.router.route_class = UploadLimitRoute
+
+@limits_app.post("/upload")
+@upload_limits(max_file_size=1000, max_request_size=5000)
+async def upload(files: List[UploadFile] = File(...)):
+    sizes = []
+    for f in files:
+        source = open_upload(f)
+        sizes.append(len(source))
+    return {"sizes": sizes}
+
+limits_client = TestClient(limits_app)
+client = TestClient(main.app)
+
+def test_upload_within_limits():
+    files = [('files', ('a.bin', b'x' * 900, 'application/octet-stream')),
+             ('files', ('b.bin', b'y' * 10, 'application/octet-stream'))]
+    response = limits_client.post("/upload", files=files)
+    assert response.status_code == 200
+    assert response.json() == {"sizes": [900, 10]}
+
+def test_file_over_limit_rejected_with_413():
+    files = [('files', ('big.bin', b'x' * 1001, 'application/octet-stream'))]
+    response = limits_client.post("/upload", files=files)
+    assert response.status_code == 413
+    assert "big.bin" in response.json()['detail']
+
+def test_limit_messages_show_small_sizes():
+    assert format_size(1000) == "1000 bytes"
+    assert format_size(100 * 1024) == "100KB"
+    assert format_size(1536 * 1024) == "1.5MB"
+    assert format_size(1000 * 1024 * 1024) == "1000MB"
+    assert format_size(1024 * 1024 * 1024) == "1GB"
+    files = [('files', ('big.bin', b'x' * 1001, 'application/octet-stream'))]
+    assert "1000 bytes" in limits_client.post("/upload", files=files).json()['detail']
+
+def test_spooled_files_closed_when_limit_crossed(monkeypatch):
+    created = []
+
+    class RecordingFile(starlette.formparsers.SpooledTemporaryFile):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            created.append(self)
+
+    monkeypatch.setattr(starlette.formparsers, "SpooledTemporaryFile", RecordingFile)
+    files = [('files', ('a.bin', b'x' * 900, 'application/octet-stream')),
+             ('files', ('big.bin', b'x' * 1001, 'application/octet-stream'))]
+    assert limits_client.post("/upload", files=files).status_code == 413
+    assert created and all(f.closed for f in created)
+
+def test_request_over_limit_rejected_with_413():
+    files = [('files', (f'{i}.bin', b'x' * 900, 'application/octet-stream')) for i in range(6)]
+    response = limits_client.post("/upload", files=files)
+    assert response.status_code == 413
+    assert "Request exceeds" in response.json()['detail']
+
+def test_buffer_file_decodes_image_without_copy():
+    buf = io.BytesIO()
+    Image.new('RGB', (20, 10), color=(255, 0, 0)).save(buf, format='PNG')
+    data = buf.getvalue()
+    # Two independent readers over the same buffer
+    with BufferFile(data) as a, BufferFile(data) as b:
+        a.seek(8)
+        assert Image.open(b).size == (20, 10)
+        assert a.tell() == 8
+
+def test_large_image_upload_is_memory_mapped():
+    # Noise doesn't compress, so this PNG is well above the 1MB spool threshold
+    image = Image.effect_noise((1200, 1200), 100)
+    buf = io.BytesIO()
+    image.save(buf, format='PNG')
+    assert len(buf.getvalue()) > 1024 * 1024
+    seen = []
+
+    def mock_process(content, strategy='original'):
+        seen.append(isinstance(content, mmap.mmap))
+        with BufferFile(content) as fp:
+            assert Image.open(fp).size == (1200, 1200)
+        return []
+
+    original_method = main.ocr_engine.process_image_with_strategy
+    main.ocr_engine.process_image_with_strategy = mock_process
+    try:
+        response = client.post("/extract", files=[('files', ('noise.png', buf.getvalue(), 'image/png'))])
+        assert response.status_code == 200
+        assert seen and all(seen)
+    finally:
+        main.ocr_engine.process_image_with_strategy = original_method
@@ -0,0 +1,198 @@
+import io
+import mmap
+from tempfile import SpooledTemporaryFile
+from fastapi import HTTPException, UploadFile, Request
+from fastapi.routing import APIRoute
+from starlette.formparsers import MultiPartParser
+
+import config
+
+# Size-bounded, spooled upload handling.
+#
+# Starlette already spools multipart files to a SpooledTemporaryFile, but enforces no size limits,
+# and the endpoints used to `await file.read()` everything into Python memory anyway.
+# Here limits are enforced WHILE the body streams in (the request is rejected with 413 as soon as
+# a limit is crossed), and decoders read large uploads from their spooled file directly instead of
+# a copied `bytes`.
+
+def format_size(size):
+    """
+    Byte count for limit messages: "512 bytes", "1.95KB", "1.5MB", "1GB".
+    """
+    for unit, scale in (("GB", 1024 ** 3), ("MB", 1024 ** 2), ("KB", 1024)):
+        if size >= scale:
+            return f"{round(size / scale, 2):g}{unit}"
+    return f"{size} bytes"
+
+def upload_limits(max_file_size=None, max_request_size=None, max_archive_size=None):
+    """
+    Endpoint decorator overriding the default upload limits (applied by UploadLimitRoute).
+    max_archive_size applies to ZIP/TAR files (by name) instead of max_file_size, for endpoints
+    that expand archives (see archives.py).
+    Must be placed below the @app.post(...) decorator.
+    """
+    def decorator(endpoint):
+        endpoint.max_file_size = max_file_size
+        endpoint.max_request_size = max_request_size
+        endpoint.max_archive_size = max_archive_size
+        return endpoint
+    return decorator
+
+class LimitedMultiPartParser(MultiPartParser):
+    def __init__(self, headers, stream, max_file_size, max_archive_size=None, **kwargs):
+        super().__init__(headers, stream, **kwargs)
+        self.spool_max_size = config.UPLOAD_SPOOL_THRESHOLD
+        self.max_file_size = max_file_size
+        self.max_archive_size = max_archive_size
+        self._current_file_size = 0
+        self._current_limit = None
+
+    def on_part_begin(self):
+        super().on_part_begin()
+        self._current_file_size = 0
+        self._current_limit = None
+
+    def _file_limit(self, filename):
+        if self.max_archive_size:
+            # Imported here: archives.py builds on this module
+            from archives import is_archive_name
+            if is_archive_name(filename):
+                return self.max_archive_size
+        return self.max_file_size
+
+    async def parse(self):
+        try:
+            return await super().parse()
+        except HTTPException:
+            # A limit was crossed: close the files spooled so far (Starlette only does this itself
+            # for its own errors in older versions)
+            for file in getattr(self, '_files_to_close_on_error', ()):
+                file.close()
+            raise
+
+    def on_part_data(self, data, start, end):
+        if self._current_part.file is not None:
+            if self._current_limit is None:
+                self._current_limit = self._file_limit(self._current_part.file.filename)
+            self._current_file_size += end - start
+            if self._current_file_size > self._current_limit:
+                raise HTTPException(
+                    status_code=413,
+                    detail=f"File '{self._current_part.file.filename}' exceeds the maximum size of {format_size(self._current_limit)}."
+                )
+        super().on_part_data(data, start, end)
+
+async def limited_stream(request, max_request_size):
+    received = 0
+    async for chunk in request.stream():
+        received += len(chunk)
+        if received > max_request_size:
+            raise HTTPException(
+                status_code=413,
+                detail=f"Request exceeds the maximum upload size of {format_size(max_request_size)}."
+            )
+        yield chunk
+
+class LimitedUploadRequest(Request):
+    """
+    Request whose form() parses the multipart body with LimitedMultiPartParser, once.
+    """
+    def __init__(self, scope, receive, max_file_size, max_request_size, max_archive_size=None):
+        super().__init__(scope, receive)
+        self.max_file_size = max_file_size
+        self.max_request_size = max_request_size
+        self.max_archive_size = max_archive_size
+        self._limited_form = None
+
+    async def form(self, **kwargs):
+        if self._limited_form is None:
+            parser = LimitedMultiPartParser(self.headers, limited_stream(self, self.max_request_size),
+                                            max_file_size=self.max_file_size, max_archive_size=self.max_archive_size)
+            self._limited_form = await parser.parse()
+        return self._limited_form
+
+class UploadLimitRoute(APIRoute):
+    """
+    Route class handing multipart requests to the endpoint as LimitedUploadRequest, with per-file
+    and per-request limits. FastAPI binds UploadFile parameters from its form() as usual.
+    """
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+        max_file_size = getattr(self.endpoint, 'max_file_size', None) or config.UPLOAD_MAX_FILE_SIZE
+        max_request_size = getattr(self.endpoint, 'max_request_size', None) or config.UPLOAD_MAX_REQUEST_SIZE
+        max_archive_size = getattr(self.endpoint, 'max_archive_size', None)
+
+        async def limited_handler(request):
+            if request.headers.get('content-type', '').startswith('multipart/form-data'):
+                # Cheap early rejection when the client announces the size up front
+                content_length = request.headers.get('content-length')
+                if content_length and content_length.isdigit() and int(content_length) > max_request_size:
+                    raise HTTPException(
+                        status_code=413,
+                        detail=f"Request exceeds the maximum upload size of {format_size(max_request_size)}."
+                    )
+                request = LimitedUploadRequest(request.scope, request.receive, max_file_size,
+                                               max_request_size, max_archive_size)
+            return await handler(request)
+
+        return limited_handler
+
+def open_upload(upload: UploadFile):
+    """
+    Returns the upload's content without copying large uploads into a new bytes object:
+    - uploads still held in memory (up to the spool threshold): their bytes
+    - uploads spooled to disk: a read-only memory map of the temp file (close it when done)
+    """
+    f = upload.file
+    f.seek(0, io.SEEK_END)
+    size = f.tell()
+    if size == 0:
+        return b""
+    # SpooledTemporaryFile rolls over to disk once it grows past the threshold
+    if isinstance(f, SpooledTemporaryFile) and size <= config.UPLOAD_SPOOL_THRESHOLD:
+        f.seek(0)
+        return f.read()
+    return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+def close_upload_source(source):
+    if isinstance(source, mmap.mmap):
+        source.close()
+
+class BufferFile(io.RawIOBase):
+    """
+    Read-only, seekable file over a buffer (bytes or mmap) with its own position, without copying.
+    Several can be open over the same buffer at once (e.g. one per OCR strategy).
+    """
+    def __init__(self, buffer):
+        self._view = memoryview(buffer)
+        self._pos = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, b):
+        n = max(0, min(len(b), len(self._view) - self._pos))
+        b[:n] = self._view[self._pos:self._pos + n]
+        self._pos += n
+        return n
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            self._pos = offset
+        elif whence == io.SEEK_CUR:
+            self._pos += offset
+        else:
+            self._pos = len(self._view) + offset
+        return self._pos
+
+    def tell(self):
+        return self._pos
+
+    def close(self):
+        # Release the buffer export so an underlying mmap can be closed
+        if not self.closed:
+            self._view.release()
+        super().close()
@@ -0,0 +1,112 @@
+import os
+import sys
+import time
+import errno
+import select
+import struct
+import ctypes
+import ctypes.util
+
+# Directory watchers used by analyze_screenshots.py --watch.
+# Both expose poll(timeout) -> list of changed file paths (may contain repeats).
+# On Linux we use inotify through libc directly (no extra dependency);
+# everywhere else, or if inotify is unavailable, we fall back to polling the directory.
+
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = 0o2000000
+
+_EVENT_HEADER = struct.Struct('iIII') # wd, mask, cookie, len
+
+class InotifyWatcher:
+    def __init__(self, folder):
+        if not sys.platform.startswith('linux'):
+            raise OSError(errno.ENOSYS, "inotify is only available on Linux")
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        self.folder = folder
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        mask = IN_CREATE | IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO
+        if libc.inotify_add_watch(self.fd, os.fsencode(folder), mask) < 0:
+            err = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(err, f"inotify_add_watch failed for {folder}")
+
+    def poll(self, timeout):
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+
+        paths = []
+        offset = 0
+        while offset < len(data):
+            _, mask, _, name_len = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = data[offset:offset + name_len].rstrip(b'\0')
+            offset += name_len
+            if mask & IN_Q_OVERFLOW:
+                # Kernel queue overflowed and events were lost: report every file
+                return list_files(self.folder)
+            if name and not mask & IN_ISDIR:
+                paths.append(os.path.join(self.folder, os.fsdecode(name)))
+        return paths
+
+    def close(self):
+        os.close(self.fd)
+
+class PollingWatcher:
+    def __init__(self, folder, interval=2.0):
+        self.folder = folder
+        self.interval = interval
+        self._snapshot = {}
+        self._last_scan = 0.0
+
+    def poll(self, timeout):
+        wait = self._last_scan + self.interval - time.monotonic()
+        if wait > 0:
+            time.sleep(min(wait, timeout))
+            if wait > timeout:
+                return []
+        self._last_scan = time.monotonic()
+
+        changed = []
+        snapshot = {}
+        with os.scandir(self.folder) as it:
+            for entry in it:
+                if not entry.is_file():
+                    continue
+                st = entry.stat()
+                snapshot[entry.path] = (st.st_size, st.st_mtime_ns)
+                if self._snapshot.get(entry.path) != snapshot[entry.path]:
+                    changed.append(entry.path)
+        self._snapshot = snapshot
+        return changed
+
+    def close(self):
+        pass
+
+def list_files(folder):
+    with os.scandir(folder) as it:
+        return [entry.path for entry in it if entry.is_file()]
+
+def make_watcher(folder, polling=False, interval=2.0):
+    """
+    Returns an inotify watcher when possible, otherwise a polling watcher.
+    """
+    if not polling:
+        try:
+            return InotifyWatcher(folder)
+        except (OSError, AttributeError) as e:
+            # AttributeError: libc without inotify symbols
+            print(f"inotify unavailable ({e}), falling back to polling every {interval}s")
+    return PollingWatcher(folder, interval)
@@ -40,7 +40,7 @@ const UploadZone = ({ onFilesSelected, isProcessing }) => {
         type="file" 
         id="fileInput" 
         multiple 
-        accept="image/*" 
+        accept="image/*,.vcf,.txt,.html,.htm,.pdf" 
         onChange={handleChange} 
         style={{ display: 'none' }} 
         disabled={isProcessing}
@@ -49,7 +49,7 @@ const UploadZone = ({ onFilesSelected, isProcessing }) => {
       <div className="upload-content">
         <Upload size={48} className="upload-icon" />
         <h3>{isProcessing ? 'Processing Images...' : 'Drag & Drop Screenshots here'}</h3>
-        <p>or click to browse checks (PNG, JPG, WEBP)</p>
+        <p>or click to browse checks (PNG, JPG, WEBP, or vCard, TXT, HTML, PDF)</p>
         {isProcessing && <div className="spinner"></div>}
       </div>
     </div>